@@ -1,42 +1,254 @@
 """API endpoint routes for the PromptSafe application."""
+import json
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Optional
+
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
-from fastapi.responses import JSONResponse
+from starlette.background import BackgroundTask
+from starlette.responses import StreamingResponse
 
 from app import __version__
+from app.core.audit import audit_log
 from app.core.config import settings
+from app.core.health import health_monitor
+from app.core.policy_registry import policy_registry
 from app.core.prompt_service import prompt_service
+from app.core.rate_limit import RateLimitExceeded, admission_controller, request_rate_limiter, user_limit_key
+from app.core.request_limits import read_json
+from app.core.token_budget import ContextLengthExceeded, token_usage
+from app.filters.model_pool import model_pool
+from app.proxy.browser_extension import browser_extension_manager
 from app.proxy.proxy_server import proxy_server
-from app.proxy.system_proxy import system_proxy
 from app.schemas.request import PromptRequest
 from app.schemas.response import HealthResponse, PromptResponse
-from app.services.llm_service import (
-    OpenAIService,
-    GoogleAIService,
-    AnthropicService,
-)
+from app.services.prompt_cache import prompt_cache
+from app.services.resilience import CircuitOpenError, ProviderError, provider_resilience
+from app.services.router import model_router
+from app.services.tokenizer import token_counter
+from app.utils.json_utils import FastJSONResponse
+
+router = APIRouter(default_response_class=FastJSONResponse)
+
+
+def resolve_policy(http_request: Request, user_id: str = None) -> str:
+    """
+    Resolve the policy profile for a request from its header, API key or user ID.
+    
+    Raises:
+        HTTPException: If the requested profile does not exist
+    """
+    try:
+        return policy_registry.resolve(
+            profile_name=http_request.headers.get(settings.POLICY_HEADER),
+            api_key=http_request.headers.get(settings.API_KEY_HEADER),
+            user_id=user_id,
+        )
+    except KeyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Geçersiz politika profili: {e.args[0]}"
+        )
+
+
+def too_many_requests(error: RateLimitExceeded) -> HTTPException:
+    """Build the 429 response for a rejected request."""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=f"İstek sınırı aşıldı: {error.scope}",
+        headers={"Retry-After": error.retry_after_header},
+    )
+
+
+async def enforce_rate_limit(http_request: Request, user_id: Optional[str] = None, provider: Optional[str] = None):
+    """
+    Apply the user, API key and provider rate limits to a request.
+    
+    Requests with neither a user ID nor an API key are limited per client address.
+    
+    Raises:
+        HTTPException: 429 with Retry-After if a limit is exceeded
+    """
+    api_key = http_request.headers.get(settings.API_KEY_HEADER)
+    client_host = http_request.client.host if http_request.client is not None else None
+    try:
+        await request_rate_limiter.check(
+            user=user_limit_key(user_id, api_key, client_host),
+            api_key=api_key,
+            provider=provider,
+        )
+    except RateLimitExceeded as e:
+        raise too_many_requests(e)
+
+
+def context_too_long(error: ContextLengthExceeded) -> HTTPException:
+    """Build the 413 response for a prompt that does not fit the model's context window."""
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Prompt bağlam penceresini aşıyor: {error.tokens} > {error.limit} token",
+    )
+
+
+def provider_failed(error: ProviderError) -> HTTPException:
+    """Build the 502/503 response for a provider call that failed after retries."""
+    headers = None
+    if isinstance(error, CircuitOpenError) or error.retryable:
+        code = status.HTTP_503_SERVICE_UNAVAILABLE
+        headers = {"Retry-After": str(max(1, int(error.retry_after or 1)))}
+    else:
+        code = status.HTTP_502_BAD_GATEWAY
+    return HTTPException(status_code=code, detail=str(error), headers=headers)
+
+
+async def read_proxy_body(request: Request) -> Any:
+    """
+    Parse a proxy request body once, for the rate limit key and the proxy itself.
+    
+    Raises:
+        HTTPException: 400 if the body is not valid JSON, 413 if it is over a size limit
+    """
+    try:
+        return await read_json(request)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Geçersiz JSON formatı")
+
+
+def body_user(body: Any) -> Optional[str]:
+    """The ``user`` field of an MCP or provider API request body, if any."""
+    user = body.get("user") if isinstance(body, dict) else None
+    return user if isinstance(user, str) else None
+
+
+async def handle_proxy_request(request: Request, body: Any = None):
+    """
+    Run a proxy request, mapping prompt errors to the same statuses as /prompt.
+    
+    Raises:
+        HTTPException: 413 for prompts over the context window, 429 for an exhausted
+            token budget and 502/503 for failed provider calls
+    """
+    try:
+        return await proxy_server.handle_request(request, body)
+    except ContextLengthExceeded as e:
+        raise context_too_long(e)
+    except RateLimitExceeded as e:
+        raise too_many_requests(e)
+    except ProviderError as e:
+        raise provider_failed(e)
+
+
+@asynccontextmanager
+async def admitted():
+    """
+    Hold an admission slot while the request is processed.
+    
+    Raises:
+        HTTPException: 429 with Retry-After if the request queue is full
+    """
+    try:
+        async with admission_controller.slot():
+            yield
+    except RateLimitExceeded as e:
+        raise too_many_requests(e)
 
-router = APIRouter()
+
+def release_after_stream(response: StreamingResponse, release: Callable[[], None]) -> StreamingResponse:
+    """
+    Run ``release`` once the response body has been sent (or the client went away).
+    
+    The endpoint returns before a streamed body is sent, so a slot held by an
+    ``async with`` around the handler would be freed while the stream still runs.
+    """
+    released = False
+    
+    def release_once():
+        nonlocal released
+        if not released:
+            released = True
+            release()
+    
+    body = response.body_iterator
+    
+    async def guarded_body():
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            release_once()
+    
+    background = response.background
+    
+    async def after_body():
+        try:
+            if background is not None:
+                await background()
+        finally:
+            release_once()
+    
+    response.body_iterator = guarded_body()
+    response.background = BackgroundTask(after_body)
+    return response
+
+
+async def admitted_proxy_request(request: Request, body: Any):
+    """
+    Run a proxy request in an admission slot, held until a streamed response is sent.
+    
+    Raises:
+        HTTPException: 429 with Retry-After if the request queue is full
+    """
+    try:
+        await admission_controller.acquire()
+    except RateLimitExceeded as e:
+        raise too_many_requests(e)
+    try:
+        result = await handle_proxy_request(request, body)
+    except BaseException:
+        admission_controller.release()
+        raise
+    if isinstance(result, StreamingResponse):
+        return release_after_stream(result, admission_controller.release)
+    admission_controller.release()
+    return result
 
 
 @router.post("/prompt", response_model=PromptResponse)
-async def process_prompt(request: PromptRequest):
+async def process_prompt(request: PromptRequest, http_request: Request):
     """
     Process user prompt through security filters and LLM.
     
+    ``detail_level`` selects how much filtering detail is returned; only
+    ``full`` echoes the original and filtered texts.
+    
+    - Rejects requests over the rate limit, admission capacity or token budget (429)
+    - Rejects prompts over the model's context window (413) unless truncation is configured
+    - Fails with 502/503 instead of returning provider errors as answers
     - Filters sensitive information from input
     - Sends cleaned prompt to selected LLM
     - Filters sensitive information from LLM response
     - Returns processed output with metadata
     """
-    try:
-        response = await prompt_service.process_prompt(request)
-        return response
-    except Exception as e:
-        # Log error properly in production
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"İşleme hatası: {str(e)}"
-        )
+    policy = resolve_policy(http_request, request.user_id)
+    await enforce_rate_limit(http_request, request.user_id, request.provider.value)
+    async with admitted():
+        try:
+            response = await prompt_service.process_prompt(request, policy=policy)
+            # Serialized by pydantic directly, skipping FastAPI's re-validation of the response
+            return Response(
+                content=response.model_dump_json(),
+                media_type="application/json",
+            )
+        except ContextLengthExceeded as e:
+            raise context_too_long(e)
+        except RateLimitExceeded as e:
+            raise too_many_requests(e)
+        except ProviderError as e:
+            raise provider_failed(e)
+        except Exception as e:
+            # Log error properly in production
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"İşleme hatası: {str(e)}"
+            )
 
 
 @router.get("/health", response_model=HealthResponse)
@@ -44,27 +256,124 @@ async def health_check():
     """
     Service health check endpoint.
     
-    Checks API connectivity status to all LLM providers.
+    Returns cached provider status from the background probes; no provider
+    is contacted while serving this request.
     """
-    # Check provider availability
-    openai_service = OpenAIService()
-    google_service = GoogleAIService()
-    anthropic_service = AnthropicService()
-    
-    provider_status = {
-        "openai": openai_service.is_available(),
-        "google": google_service.is_available(),
-        "anthropic": anthropic_service.is_available(),
-    }
-    
     return HealthResponse(
         status="active",
         version=__version__,
         environment=settings.ENVIRONMENT,
-        providers=provider_status
+        providers=health_monitor.provider_availability(),
+        provider_status=health_monitor.provider_status(),
     )
 
 
+@router.get("/health/live")
+async def liveness():
+    """
+    Liveness probe: the process is running and its event loop responds.
+    """
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe: warm-up finished and not draining, NER model loaded,
+    filter executor and admission queue not saturated.
+    
+    Returns 503 while the worker should not receive new requests.
+    """
+    ready, checks = health_monitor.readiness()
+    return FastJSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ready" if ready else "not_ready", "checks": checks},
+    )
+
+
+@router.get("/stats/filters")
+async def filter_stats():
+    """
+    Filter engine statistics.
+    
+    Returns the NER pre-screen skip rate per policy profile and the spaCy model pool state.
+    """
+    return {
+        "profiles": policy_registry.stats(),
+        "model_pool": model_pool.stats(),
+    }
+
+
+@router.get("/stats/connections")
+async def connection_stats():
+    """
+    Browser extension WebSocket statistics for this worker.
+    
+    Returns connection counts, shed/evicted totals, per-connection throughput
+    and the connection counts of all workers from the shared directory.
+    """
+    return await browser_extension_manager.stats()
+
+
+@router.get("/stats/limits")
+async def limit_stats():
+    """
+    Rate limiter and admission control statistics for this worker.
+    """
+    return {
+        "rate_limits": request_rate_limiter.stats(),
+        "admission": admission_controller.stats(),
+    }
+
+
+@router.get("/stats/providers")
+async def provider_stats():
+    """
+    Provider call statistics: retries, hedged requests, circuit state and latency.
+    """
+    return provider_resilience.stats()
+
+
+@router.get("/stats/routes")
+async def route_stats():
+    """
+    Model routing statistics: per-target EWMA latency, error rate, load and circuit state.
+    """
+    return model_router.stats()
+
+
+@router.get("/stats/audit")
+async def audit_stats():
+    """
+    Audit pipeline statistics: buffer occupancy, written, dropped and failed events.
+    """
+    return audit_log.stats()
+
+
+@router.get("/stats/coalescing")
+async def coalescing_stats():
+    """
+    Request coalescing statistics: in-flight, started and joined filter runs and provider calls.
+    """
+    return prompt_service.coalescing_stats()
+
+
+@router.get("/stats/prompt-cache")
+async def prompt_cache_stats():
+    """
+    Provider prompt caching statistics: tracked prefixes, marked requests and cache hit rate per provider.
+    """
+    return prompt_cache.stats()
+
+
+@router.get("/stats/tokens")
+async def token_stats():
+    """
+    Token accounting statistics: tokenizer cache, token totals and budget rejections.
+    """
+    return {"tokenizer": token_counter.stats(), "usage": token_usage.stats()}
+
+
 # Yeni proxy endpoint'leri
 @router.post("/proxy/mcp")
 async def proxy_mcp_request(request: Request):
@@ -74,10 +383,12 @@ async def proxy_mcp_request(request: Request):
     Bu endpoint, Model-Context-Protocol formatındaki istekleri alır,
     hassas verileri filtreler ve sonucu döndürür.
     """
-    result = await proxy_server.handle_request(request)
+    body = await read_proxy_body(request)
+    await enforce_rate_limit(request, body_user(body))
+    result = await admitted_proxy_request(request, body)
     if isinstance(result, Response):
         return result
-    return JSONResponse(content=result)
+    return FastJSONResponse(content=result)
 
 
 @router.post("/proxy/{provider}/{path:path}")
@@ -92,7 +403,9 @@ async def proxy_api_request(request: Request, provider: str, path: str):
         provider: LLM sağlayıcısı (openai, anthropic, google)
         path: API yolu
     """
-    return await proxy_server.handle_request(request)
+    body = await read_proxy_body(request)
+    await enforce_rate_limit(request, body_user(body), provider=provider)
+    return await admitted_proxy_request(request, body)
 
 
 # Sistem proxy endpoint'leri
@@ -103,6 +416,8 @@ async def enable_system_proxy():
     
     Bu endpoint, işletim sisteminin proxy ayarlarını PromptSafe'e yönlendirecek şekilde yapılandırır.
     """
+    from app.proxy.system_proxy import system_proxy
+
     success = system_proxy.enable()
     if not success:
         raise HTTPException(
@@ -120,6 +435,8 @@ async def disable_system_proxy():
     
     Bu endpoint, işletim sisteminin proxy ayarlarını normal haline döndürür.
     """
+    from app.proxy.system_proxy import system_proxy
+
     success = system_proxy.disable()
     if not success:
         raise HTTPException(
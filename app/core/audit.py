@@ -0,0 +1,312 @@
+"""Asynchronous audit trail of masking decisions.
+
+Requests push detection events (who, which entity types, how many, under
+which policy version - never the masked values) onto an in-memory ring
+buffer. A background task batches them to a sink in a worker thread, so
+recording an event is a deque append on the request path.
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.shared_state import worker_id
+
+if TYPE_CHECKING:
+    import sqlite3
+
+logger = logging.getLogger(__name__)
+
+# Event fields, in SQLite column order
+EVENT_FIELDS = ("ts", "request_id", "user_id", "policy", "policy_version", "direction", "entities", "total")
+
+
+class AuditSink(ABC):
+    """Destination of flushed audit batches (called from a worker thread)."""
+
+    @abstractmethod
+    def write(self, events: List[Dict[str, Any]]) -> None:
+        """Persist a batch of events."""
+
+    def close(self) -> None:
+        """Release sink resources."""
+
+
+class NDJSONSink(AuditSink):
+    """
+    Gzip-compressed NDJSON files with size-based rotation.
+
+    Each batch is appended as its own gzip member, which ``gzip.open``
+    reads back as one continuous stream. When the active file grows past
+    ``max_bytes`` it is renamed to ``<name>.1`` and older files shift up,
+    keeping at most ``backups`` of them. Every worker process writes and
+    rotates its own ``audit-<host>-<pid>.ndjson.gz``, so prefork workers
+    never append to or rename each other's files.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 50 * 1024 * 1024, backups: int = 5):
+        """
+        Initialize the sink.
+
+        Args:
+            directory: Directory for the audit files
+            max_bytes: Compressed size at which the active file is rotated
+            backups: Rotated files to keep
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+    @property
+    def path(self) -> str:
+        """Active file of this worker (evaluated per call so forked workers differ)."""
+        return os.path.join(self.directory, f"audit-{worker_id().replace(':', '-')}.ndjson.gz")
+
+    def write(self, events: List[Dict[str, Any]]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        data = "".join(json.dumps(event, separators=(",", ":")) + "\n" for event in events)
+        path = self.path
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            f.write(data)
+        if os.path.getsize(path) >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self) -> None:
+        path = self.path
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(path, f"{path}.1")
+        else:
+            os.remove(path)
+
+
+class SQLiteSink(AuditSink):
+    """Audit events in a SQLite table (one transaction per batch)."""
+
+    def __init__(self, path: str):
+        """
+        Initialize the sink.
+
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        self._conn: Optional["sqlite3.Connection"] = None
+
+    def _connect(self) -> "sqlite3.Connection":
+        if self._conn is None:
+            import sqlite3
+
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Batches are written one at a time, but not always from the same thread
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS audit_events ("
+                "ts REAL, request_id TEXT, user_id TEXT, policy TEXT, policy_version INTEGER, "
+                "direction TEXT, entities TEXT, total INTEGER)"
+            )
+        return self._conn
+
+    def write(self, events: List[Dict[str, Any]]) -> None:
+        conn = self._connect()
+        rows = [
+            tuple(json.dumps(event[name]) if name == "entities" else event[name] for name in EVENT_FIELDS)
+            for event in events
+        ]
+        with conn:
+            conn.executemany(f"INSERT INTO audit_events VALUES ({', '.join('?' * len(EVENT_FIELDS))})", rows)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def create_sink() -> AuditSink:
+    """Build the sink selected by AUDIT_BACKEND ("ndjson" or "sqlite")."""
+    backend = settings.AUDIT_BACKEND.lower()
+    if backend == "sqlite":
+        return SQLiteSink(os.path.join(settings.AUDIT_PATH, "audit.db"))
+    if backend == "ndjson":
+        return NDJSONSink(settings.AUDIT_PATH, settings.AUDIT_MAX_FILE_BYTES, settings.AUDIT_BACKUP_COUNT)
+    raise ValueError(f"Unknown audit backend: {settings.AUDIT_BACKEND}")
+
+
+class AuditLog:
+    """
+    Bounded in-memory buffer of audit events with a background batch writer.
+
+    When the buffer is full the ``drop_oldest`` policy overwrites the oldest
+    unflushed event (ring buffer) and ``drop_newest`` discards the incoming
+    one; either way the request never waits and the loss is counted.
+    """
+
+    def __init__(
+        self,
+        sink: Optional[AuditSink] = None,
+        capacity: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        drop_policy: str = "drop_oldest",
+    ):
+        """
+        Initialize the audit log.
+
+        Args:
+            sink: Batch destination (built from settings on start if omitted)
+            capacity: Maximum events held in memory
+            batch_size: Events per sink write; a full batch triggers an early flush
+            flush_interval: Maximum seconds an event waits before being flushed
+            drop_policy: "drop_oldest" or "drop_newest"
+        """
+        if drop_policy not in ("drop_oldest", "drop_newest"):
+            raise ValueError(f"Unknown audit drop policy: {drop_policy}")
+        self.sink = sink
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.drop_policy = drop_policy
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=capacity if drop_policy == "drop_oldest" else None)
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+        self.high_water = 0
+        self.last_flush_ms = 0.0
+
+    def record(
+        self,
+        request_id: str,
+        user_id: Optional[str],
+        policy: Optional[str],
+        policy_version: Optional[int],
+        direction: str,
+        entities: Dict[str, int],
+    ):
+        """
+        Queue a detection event (counts per entity type only, never the values).
+
+        Args:
+            request_id: Request the detections belong to
+            user_id: Caller user ID
+            policy: Policy profile name
+            policy_version: Policy profile version
+            direction: "request" (prompt) or "response" (LLM output)
+            entities: Entity type -> masked count
+        """
+        if not settings.AUDIT_ENABLED:
+            return
+        buffer = self._buffer
+        if len(buffer) >= self.capacity:
+            self.dropped += 1
+            if self.drop_policy == "drop_newest":
+                return
+        buffer.append({
+            "ts": time.time(),
+            "request_id": request_id,
+            "user_id": user_id,
+            "policy": policy,
+            "policy_version": policy_version,
+            "direction": direction,
+            "entities": entities,
+            "total": sum(entities.values()),
+        })
+        self.recorded += 1
+        if len(buffer) > self.high_water:
+            self.high_water = len(buffer)
+        if self._wakeup is not None and len(buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    def start(self):
+        """Start the background writer (events are only buffered until then)."""
+        if self._task is not None and not self._task.done():
+            return
+        if self.sink is None:
+            self.sink = create_sink()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the writer after flushing what is buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.sink is None:
+            return
+        while self._buffer:
+            await self.flush()
+        self.sink.close()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._buffer:
+                await self.flush()
+                if len(self._buffer) < self.batch_size:
+                    break
+
+    async def flush(self):
+        """Write up to one batch to the sink in a worker thread."""
+        if not self._buffer:
+            return
+        count = min(len(self._buffer), self.batch_size)
+        batch = [self._buffer.popleft() for _ in range(count)]
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(self.sink.write, batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Audit batch of {len(batch)} events could not be written: {e}")
+            return
+        self.written += len(batch)
+        self.flushes += 1
+        self.last_flush_ms = round((time.perf_counter() - start) * 1000, 2)
+
+    def stats(self) -> Dict[str, Any]:
+        """Buffer occupancy and backpressure counters."""
+        return {
+            "enabled": settings.AUDIT_ENABLED,
+            "backend": settings.AUDIT_BACKEND,
+            "drop_policy": self.drop_policy,
+            "capacity": self.capacity,
+            "queued": len(self._buffer),
+            "high_water": self.high_water,
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "flushes": self.flushes,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+
+# Singleton instance
+audit_log = AuditLog(
+    capacity=settings.AUDIT_BUFFER_SIZE,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    flush_interval=settings.AUDIT_FLUSH_INTERVAL,
+    drop_policy=settings.AUDIT_DROP_POLICY,
+)
@@ -0,0 +1,72 @@
+"""Single-flight coalescing of identical concurrent calls.
+
+While a call for a key is in flight, later callers with the same key wait
+for its result instead of starting their own. Nothing is cached: the key
+is forgotten as soon as the call finishes, so only truly concurrent
+duplicates are merged.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    """A shared in-flight call and the number of callers waiting on it."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time and fans its result out to every waiter.
+
+    Exceptions are shared like results. A waiter being cancelled does not
+    cancel the shared call; the call is cancelled only when every waiter
+    has gone.
+    """
+
+    def __init__(self):
+        """Initialize the group."""
+        self._calls: Dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``fn`` or join the identical call already in flight.
+
+        Args:
+            key: Identity of the call (equal keys share one call)
+            fn: Starts the call; invoked only by the first caller
+
+        Returns:
+            Any: The shared call's result
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.leaders += 1
+        else:
+            self.followers += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Calls in flight, calls started and callers that joined an existing call."""
+        return {"in_flight": len(self._calls), "leaders": self.leaders, "followers": self.followers}
@@ -1,5 +1,6 @@
 """Application configuration module."""
 import os
+from enum import Enum
 from typing import Any, Dict, List, Optional
 
 from dotenv import load_dotenv
@@ -10,6 +11,15 @@ from pydantic_settings import BaseSettings
 load_dotenv()
 
 
+class DetailLevel(str, Enum):
+    """How much filtering detail a prompt response carries."""
+
+    NONE = "none"  # Yalnızca hassas içerik bayrağı
+    SUMMARY = "summary"  # Varlık tipi başına maskelenen öğe sayısı
+    SPANS = "spans"  # Maskelenen öğelerin konumları
+    FULL = "full"  # Konumlar ile orijinal ve filtrelenmiş metinler
+
+
 class Settings(BaseSettings):
     """Application settings."""
 
@@ -22,6 +32,15 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "PromptSafe"
     API_V1_STR: str = "/api/v1"
     LOG_LEVEL: str = Field(default="INFO", env="LOG_LEVEL")
+    # "json" (one JSON object per line) or "text"
+    LOG_FORMAT: str = Field(default="json", env="LOG_FORMAT")
+    # Write logs from a background thread instead of the request path
+    LOG_ENQUEUE: bool = Field(default=True, env="LOG_ENQUEUE")
+    # Above this many requests per second only a sample of successful requests is logged
+    LOG_SAMPLE_THRESHOLD_RPS: float = Field(default=200.0, env="LOG_SAMPLE_THRESHOLD_RPS")
+    LOG_SUCCESS_SAMPLE_RATE: float = Field(default=0.01, env="LOG_SUCCESS_SAMPLE_RATE")
+    # Requests slower than this are always logged (milliseconds)
+    LOG_SLOW_REQUEST_MS: float = Field(default=1000.0, env="LOG_SLOW_REQUEST_MS")
     ENVIRONMENT: str = Field(default="development", env="ENVIRONMENT")
     
     # Security
@@ -33,9 +52,163 @@ class Settings(BaseSettings):
     # Features
     ENABLE_REGEX_FILTERS: bool = Field(default=True, env="ENABLE_REGEX_FILTERS")
     ENABLE_NER_FILTERS: bool = Field(default=True, env="ENABLE_NER_FILTERS")
+    ENABLE_ENTROPY_FILTERS: bool = Field(default=True, env="ENABLE_ENTROPY_FILTERS")
+    ENTROPY_THRESHOLD: float = Field(default=3.5, env="ENTROPY_THRESHOLD")
+    
+    # NER models
+    NER_MODEL: str = Field(default="en_core_web_sm", env="NER_MODEL")
+    # Dil kodu -> SpaCy modeli; Türkçe için turkish-nlp-suite modelleri kullanılabilir
+    NER_LANGUAGE_MODELS: Dict[str, str] = Field(
+        default={"en": "en_core_web_sm", "tr": "tr_core_news_md"}, env="NER_LANGUAGE_MODELS"
+    )
+    NER_MODEL_POOL_SIZE: int = Field(default=2, env="NER_MODEL_POOL_SIZE")
+    NER_MODEL_POOL_MAX_MEMORY_MB: int = Field(default=1024, env="NER_MODEL_POOL_MAX_MEMORY_MB")
+    FILTER_WORKER_THREADS: int = Field(default=4, env="FILTER_WORKER_THREADS")
+    # Filtre motorları, NER modelleri, numpy ve sağlayıcı SDK'ları açılışta arka planda yüklenir
+    STARTUP_WARM_UP: bool = Field(default=True, env="STARTUP_WARM_UP")
+    # Kapanışta devam eden WebSocket prompt'ları/akışları için bekleme süresi (saniye)
+    SHUTDOWN_DRAIN_TIMEOUT: float = Field(default=30.0, env="SHUTDOWN_DRAIN_TIMEOUT")
+    # Aday varlık içermeyen metinlerde NER'i atlayan ön eleme
+    ENABLE_NER_PRESCREEN: bool = Field(default=True, env="ENABLE_NER_PRESCREEN")
+    NER_PRESCREEN_RECALL: float = Field(default=0.99, env="NER_PRESCREEN_RECALL")
     
     # Text configs
     MAX_TEXT_LENGTH: int = Field(default=8192, env="MAX_TEXT_LENGTH")
+    
+    # Prompt yanıtlarındaki filtre ayrıntısı: none, summary, spans, full
+    RESPONSE_DETAIL_LEVEL: DetailLevel = Field(default=DetailLevel.SUMMARY, env="RESPONSE_DETAIL_LEVEL")
+    # Aynı anda gelen özdeş prompt'lar tek filtreleme ve (temperature=0 ise) tek sağlayıcı çağrısı paylaşır
+    PROMPT_COALESCING_ENABLED: bool = Field(default=True, env="PROMPT_COALESCING_ENABLED")
+    
+    # Request body limits (bytes); longest matching path prefix wins, 0 disables
+    MAX_REQUEST_BODY_BYTES: int = Field(default=1024 * 1024, env="MAX_REQUEST_BODY_BYTES")
+    MAX_REQUEST_BODY_BYTES_ROUTES: Dict[str, int] = Field(
+        default={"/api/v1/proxy": 4 * 1024 * 1024},
+        env="MAX_REQUEST_BODY_BYTES_ROUTES",
+    )
+    
+    # Browser extension WebSocket
+    WS_MAX_CONCURRENT_PROMPTS: int = Field(default=4, env="WS_MAX_CONCURRENT_PROMPTS")
+    WS_MAX_CONNECTIONS: int = Field(default=10000, env="WS_MAX_CONNECTIONS")
+    # Protocol-level WebSocket pings detect dead peers without any client changes
+    WS_HEARTBEAT_INTERVAL: float = Field(default=30.0, env="WS_HEARTBEAT_INTERVAL")
+    WS_PING_TIMEOUT: float = Field(default=30.0, env="WS_PING_TIMEOUT")
+    # Close connections that send no message for this long (0 keeps quiet clients open)
+    WS_IDLE_TIMEOUT: float = Field(default=0.0, env="WS_IDLE_TIMEOUT")
+    # Shared connection directory entries expire unless the worker's heartbeat refreshes them
+    WS_DIRECTORY_TTL: float = Field(default=120.0, env="WS_DIRECTORY_TTL")
+    
+    # Provider calls: timeouts, retries, hedging and circuit breaking
+    LLM_REQUEST_TIMEOUT: float = Field(default=60.0, env="LLM_REQUEST_TIMEOUT")
+    LLM_CONNECT_TIMEOUT: float = Field(default=5.0, env="LLM_CONNECT_TIMEOUT")
+    LLM_MAX_RETRIES: int = Field(default=2, env="LLM_MAX_RETRIES")
+    LLM_RETRY_BASE_DELAY: float = Field(default=0.5, env="LLM_RETRY_BASE_DELAY")
+    LLM_RETRY_MAX_DELAY: float = Field(default=8.0, env="LLM_RETRY_MAX_DELAY")
+    # Retry-After değeri bundan uzunsa beklemeden hata döndürülür
+    LLM_RETRY_AFTER_MAX: float = Field(default=30.0, env="LLM_RETRY_AFTER_MAX")
+    # p95 gecikmesi aşıldığında ikinci bir istek gönder (maliyeti artırır)
+    LLM_HEDGING_ENABLED: bool = Field(default=False, env="LLM_HEDGING_ENABLED")
+    LLM_HEDGE_MIN_SAMPLES: int = Field(default=20, env="LLM_HEDGE_MIN_SAMPLES")
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = Field(default=5, env="LLM_CIRCUIT_FAILURE_THRESHOLD")
+    LLM_CIRCUIT_RECOVERY_TIME: float = Field(default=30.0, env="LLM_CIRCUIT_RECOVERY_TIME")
+    
+    # Provider prompt caching: prefixes repeated within the TTL are marked cacheable
+    # (~4 characters per token; providers do not cache prefixes under ~1024 tokens)
+    PROMPT_CACHE_ENABLED: bool = Field(default=True, env="PROMPT_CACHE_ENABLED")
+    PROMPT_CACHE_MIN_CHARS: int = Field(default=4096, env="PROMPT_CACHE_MIN_CHARS")
+    PROMPT_CACHE_BLOCK_CHARS: int = Field(default=2048, env="PROMPT_CACHE_BLOCK_CHARS")
+    PROMPT_CACHE_MIN_REPEATS: int = Field(default=2, env="PROMPT_CACHE_MIN_REPEATS")
+    PROMPT_CACHE_TRACKER_SIZE: int = Field(default=4096, env="PROMPT_CACHE_TRACKER_SIZE")
+    PROMPT_CACHE_TTL: float = Field(default=300.0, env="PROMPT_CACHE_TTL")
+    
+    # Token counting before dispatch: prompts over the context window are rejected or truncated
+    TOKEN_LIMITS_ENABLED: bool = Field(default=True, env="TOKEN_LIMITS_ENABLED")
+    TOKEN_LIMIT_ACTION: str = Field(default="reject", env="TOKEN_LIMIT_ACTION")  # reject or truncate
+    # Truncation keeps at least this much room for the answer
+    TOKEN_MIN_OUTPUT: int = Field(default=256, env="TOKEN_MIN_OUTPUT")
+    TOKEN_ESTIMATE_CHARS_PER_TOKEN: float = Field(default=3.5, env="TOKEN_ESTIMATE_CHARS_PER_TOKEN")
+    TOKEN_COUNT_CACHE_SIZE: int = Field(default=2048, env="TOKEN_COUNT_CACHE_SIZE")
+    # Model name prefix -> context window (longest prefix wins)
+    MODEL_CONTEXT_WINDOWS: Dict[str, int] = Field(
+        default={
+            "gpt-3.5-turbo": 16385,
+            "gpt-4": 8192,
+            "gpt-4-32k": 32768,
+            "gpt-4-turbo": 128000,
+            "gpt-4o": 128000,
+            "claude-": 200000,
+            "gemini-pro": 30720,
+            "gemini-1.5": 1000000,
+        },
+        env="MODEL_CONTEXT_WINDOWS",
+    )
+    DEFAULT_CONTEXT_WINDOW: int = Field(default=8192, env="DEFAULT_CONTEXT_WINDOW")
+    # Per-user token budget (prompt + completion) per window; 0 disables
+    TOKEN_BUDGET_PER_USER: int = Field(default=0, env="TOKEN_BUDGET_PER_USER")
+    TOKEN_BUDGET_WINDOW: float = Field(default=86400.0, env="TOKEN_BUDGET_WINDOW")
+    TOKEN_USAGE_FLUSH_INTERVAL: float = Field(default=10.0, env="TOKEN_USAGE_FLUSH_INTERVAL")
+    
+    # Model routing: logical model -> targets, e.g.
+    # {"fast": [{"provider": "openai", "model": "gpt-4o-mini", "cost": 0.15},
+    #           {"provider": "anthropic", "model": "claude-3-haiku-20240307", "cost": 0.25}]}
+    # Targets may set base_url (regional endpoint) and api_key_env
+    LLM_ROUTES: Dict[str, List[Dict[str, Any]]] = Field(default={}, env="LLM_ROUTES")
+    LLM_ROUTER_EWMA_ALPHA: float = Field(default=0.3, env="LLM_ROUTER_EWMA_ALPHA")
+    # Skor: gecikme (s) * (1 + aktif istek) + ceza * hata oranı + ağırlık * maliyet
+    LLM_ROUTER_ERROR_PENALTY: float = Field(default=10.0, env="LLM_ROUTER_ERROR_PENALTY")
+    LLM_ROUTER_COST_WEIGHT: float = Field(default=1.0, env="LLM_ROUTER_COST_WEIGHT")
+    
+    # Health checks: background provider probing and readiness limits
+    HEALTH_PROBE_ENABLED: bool = Field(default=True, env="HEALTH_PROBE_ENABLED")
+    HEALTH_PROBE_INTERVAL: float = Field(default=30.0, env="HEALTH_PROBE_INTERVAL")
+    HEALTH_PROBE_TIMEOUT: float = Field(default=5.0, env="HEALTH_PROBE_TIMEOUT")
+    HEALTH_MAX_FILTER_QUEUE: int = Field(default=64, env="HEALTH_MAX_FILTER_QUEUE")
+    
+    # Rate limiting (token bucket per key and worker, 0 disables a limit)
+    RATE_LIMIT_ENABLED: bool = Field(default=True, env="RATE_LIMIT_ENABLED")
+    # Cluster-wide window counters in the shared state backend (rate per window plus burst; 0 disables)
+    RATE_LIMIT_WINDOW: float = Field(default=60.0, env="RATE_LIMIT_WINDOW")
+    RATE_LIMIT_USER_PER_MINUTE: float = Field(default=60.0, env="RATE_LIMIT_USER_PER_MINUTE")
+    RATE_LIMIT_USER_BURST: int = Field(default=20, env="RATE_LIMIT_USER_BURST")
+    RATE_LIMIT_API_KEY_PER_MINUTE: float = Field(default=600.0, env="RATE_LIMIT_API_KEY_PER_MINUTE")
+    RATE_LIMIT_API_KEY_BURST: int = Field(default=100, env="RATE_LIMIT_API_KEY_BURST")
+    RATE_LIMIT_PROVIDER_PER_MINUTE: float = Field(default=3000.0, env="RATE_LIMIT_PROVIDER_PER_MINUTE")
+    RATE_LIMIT_PROVIDER_BURST: int = Field(default=200, env="RATE_LIMIT_PROVIDER_BURST")
+    RATE_LIMIT_IDLE_TTL: float = Field(default=600.0, env="RATE_LIMIT_IDLE_TTL")
+    RATE_LIMIT_MAX_KEYS: int = Field(default=100000, env="RATE_LIMIT_MAX_KEYS")
+    
+    # Admission control: concurrent requests, queue length and queue wait (seconds)
+    ADMISSION_MAX_CONCURRENT: int = Field(default=64, env="ADMISSION_MAX_CONCURRENT")
+    ADMISSION_MAX_QUEUE: int = Field(default=256, env="ADMISSION_MAX_QUEUE")
+    ADMISSION_QUEUE_TIMEOUT: float = Field(default=5.0, env="ADMISSION_QUEUE_TIMEOUT")
+    
+    # Audit trail of masking decisions ("ndjson" gzip files or "sqlite")
+    AUDIT_ENABLED: bool = Field(default=True, env="AUDIT_ENABLED")
+    AUDIT_BACKEND: str = Field(default="ndjson", env="AUDIT_BACKEND")
+    AUDIT_PATH: str = Field(default="logs/audit", env="AUDIT_PATH")
+    AUDIT_MAX_FILE_BYTES: int = Field(default=50 * 1024 * 1024, env="AUDIT_MAX_FILE_BYTES")
+    AUDIT_BACKUP_COUNT: int = Field(default=5, env="AUDIT_BACKUP_COUNT")
+    AUDIT_BUFFER_SIZE: int = Field(default=10000, env="AUDIT_BUFFER_SIZE")
+    AUDIT_BATCH_SIZE: int = Field(default=500, env="AUDIT_BATCH_SIZE")
+    AUDIT_FLUSH_INTERVAL: float = Field(default=1.0, env="AUDIT_FLUSH_INTERVAL")
+    # Buffer full: "drop_oldest" (ring buffer) or "drop_newest"
+    AUDIT_DROP_POLICY: str = Field(default="drop_oldest", env="AUDIT_DROP_POLICY")
+    
+    # Shared state across workers ("memory" or "redis")
+    SHARED_STATE_BACKEND: str = Field(default="memory", env="SHARED_STATE_BACKEND")
+    REDIS_URL: str = Field(default="redis://localhost:6379/0", env="REDIS_URL")
+    SHARED_STATE_PREFIX: str = Field(default="promptsafe:", env="SHARED_STATE_PREFIX")
+    
+    # Policy profiles
+    DEFAULT_POLICY_PROFILE: str = Field(default="default", env="DEFAULT_POLICY_PROFILE")
+    POLICY_HEADER: str = Field(default="X-PromptSafe-Policy", env="POLICY_HEADER")
+    API_KEY_HEADER: str = Field(default="X-API-Key", env="API_KEY_HEADER")
+    # Ek/ezici profil tanımları: {"finance": {"entities_to_mask": [...], ...}}
+    POLICY_PROFILES: Dict[str, Dict[str, Any]] = Field(default_factory=dict, env="POLICY_PROFILES")
+    # API anahtarı -> profil adı
+    POLICY_API_KEY_MAP: Dict[str, str] = Field(default_factory=dict, env="POLICY_API_KEY_MAP")
+    # Kullanıcı ID'si -> profil adı
+    POLICY_USER_MAP: Dict[str, str] = Field(default_factory=dict, env="POLICY_USER_MAP")
 
     class Config:
         """Pydantic configuration."""
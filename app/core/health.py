@@ -0,0 +1,203 @@
+"""Background provider probing and cheap liveness/readiness checks."""
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.rate_limit import admission_controller
+from app.core.shared_state import shared_state
+from app.filters.filter_manager import filter_queue_depth
+from app.filters.model_pool import model_pool
+from app.services.resilience import provider_resilience
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+# Lightweight authenticated endpoints (model listings) used as probes
+PROBE_ENDPOINTS = {
+    "openai": "https://api.openai.com/v1/models",
+    "anthropic": "https://api.anthropic.com/v1/models",
+    "google": "https://generativelanguage.googleapis.com/v1beta/models",
+}
+
+# Shared cache key so only one worker per interval probes the providers
+CACHE_KEY = "health:providers"
+
+
+def _api_key(provider: str) -> Optional[str]:
+    return {
+        "openai": settings.OPENAI_API_KEY,
+        "anthropic": settings.ANTHROPIC_API_KEY,
+        "google": settings.GOOGLE_API_KEY,
+    }.get(provider)
+
+
+class HealthMonitor:
+    """
+    Probes providers in the background and answers health checks from cache.
+
+    Provider status is one of ``up``, ``degraded`` (rate limited),
+    ``down`` (errors, timeouts, rejected key), ``unconfigured`` (no API key)
+    or ``unknown`` (not probed yet).
+    """
+
+    def __init__(self, interval: float = 30.0, timeout: float = 5.0, max_filter_queue: int = 64):
+        """
+        Initialize the monitor.
+
+        Args:
+            interval: Seconds between provider probes
+            timeout: Probe request timeout (seconds)
+            max_filter_queue: Waiting filter jobs above which the worker is not ready
+        """
+        self.interval = interval
+        self.timeout = timeout
+        self.max_filter_queue = max_filter_queue
+        self.providers: Dict[str, Dict[str, Any]] = {
+            name: {"status": "unknown" if _api_key(name) else "unconfigured"} for name in PROBE_ENDPOINTS
+        }
+        self.model_error: Optional[str] = None
+        # Lifecycle phase set by the application lifespan: starting, ready or draining
+        self.phase = "starting"
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start background provider probing."""
+        if settings.HEALTH_PROBE_ENABLED and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stop background probing."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Provider probe failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self, force: bool = False):
+        """
+        Update provider status, reusing another worker's recent probe if there is one.
+
+        Args:
+            force: Probe even if a fresh shared result exists
+        """
+        if not force:
+            try:
+                cached = await shared_state.get_json(CACHE_KEY)
+            except Exception as e:
+                logger.warning(f"Shared health cache unavailable: {e}")
+                cached = None
+            if cached and time.time() - cached["checked_at"] < self.interval:
+                self.providers = cached["providers"]
+                return
+
+        import httpx
+
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            results = await asyncio.gather(*(self._probe(client, name) for name in PROBE_ENDPOINTS))
+        self.providers = dict(results)
+        try:
+            await shared_state.set_json(
+                CACHE_KEY, {"checked_at": time.time(), "providers": self.providers}, ttl=self.interval * 3
+            )
+        except Exception as e:
+            logger.warning(f"Shared health cache unavailable: {e}")
+
+    async def _probe(self, client: "httpx.AsyncClient", provider: str) -> Tuple[str, Dict[str, Any]]:
+        """Probe one provider and classify the result."""
+        import httpx
+
+        api_key = _api_key(provider)
+        if not api_key:
+            return provider, {"status": "unconfigured"}
+
+        url, params, headers = PROBE_ENDPOINTS[provider], None, {}
+        if provider == "openai":
+            headers["Authorization"] = f"Bearer {api_key}"
+        elif provider == "anthropic":
+            headers.update({"x-api-key": api_key, "anthropic-version": "2023-06-01"})
+        else:
+            params = {"key": api_key}
+
+        start = time.monotonic()
+        try:
+            response = await client.get(url, params=params, headers=headers)
+        except httpx.HTTPError as e:
+            return provider, {"status": "down", "error": type(e).__name__, "checked_at": time.time()}
+
+        if response.status_code == 429:
+            status = "degraded"
+        elif response.status_code < 400:
+            status = "up"
+        else:
+            status = "down"
+        return provider, {
+            "status": status,
+            "http_status": response.status_code,
+            "latency_ms": round((time.monotonic() - start) * 1000, 1),
+            "checked_at": time.time(),
+        }
+
+    def provider_availability(self) -> Dict[str, bool]:
+        """Provider -> usable (configured and not known to be down or circuit-open)."""
+        breakers = {policy["provider"]: policy["circuit"] for policy in provider_resilience.stats()}
+        return {
+            name: info["status"] in ("up", "degraded", "unknown") and breakers.get(name) != "open"
+            for name, info in self.providers.items()
+        }
+
+    def provider_status(self) -> Dict[str, Dict[str, Any]]:
+        """Cached probe results with the provider's circuit state."""
+        breakers = {policy["provider"]: policy["circuit"] for policy in provider_resilience.stats()}
+        return {
+            name: {**info, "circuit": breakers.get(name, "closed")}
+            for name, info in self.providers.items()
+        }
+
+    def readiness(self) -> Tuple[bool, Dict[str, Dict[str, Any]]]:
+        """
+        Can this worker take new requests?
+
+        Returns:
+            Tuple[bool, Dict]: Overall readiness and the individual checks
+        """
+        checks: Dict[str, Dict[str, Any]] = {"lifecycle": {"ok": self.phase == "ready", "phase": self.phase}}
+
+        if settings.ENABLE_NER_FILTERS:
+            loaded = model_pool.is_loaded(settings.NER_MODEL)
+            checks["ner_model"] = {"ok": loaded, "model": settings.NER_MODEL}
+            if self.model_error:
+                checks["ner_model"]["error"] = self.model_error
+
+        queued = filter_queue_depth()
+        checks["filter_executor"] = {"ok": queued < self.max_filter_queue, "queued": queued}
+
+        admission = admission_controller.stats()
+        checks["admission"] = {
+            "ok": admission["waiting"] < admission["max_queue"],
+            "active": admission["active"],
+            "waiting": admission["waiting"],
+        }
+
+        return all(check["ok"] for check in checks.values()), checks
+
+
+# Singleton instance
+health_monitor = HealthMonitor(
+    interval=settings.HEALTH_PROBE_INTERVAL,
+    timeout=settings.HEALTH_PROBE_TIMEOUT,
+    max_filter_queue=settings.HEALTH_MAX_FILTER_QUEUE,
+)
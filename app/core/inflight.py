@@ -0,0 +1,66 @@
+"""Tracking of in-flight work that outlives the HTTP request cycle (WebSocket prompts and streams)."""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict
+
+
+class InFlightTracker:
+    """
+    Counts running units of work so shutdown can wait for them.
+
+    Once ``start_draining`` is called, ``accepting`` turns false so callers
+    can refuse new work, and ``wait_idle`` returns when the last tracked
+    unit finishes (or the timeout expires).
+    """
+
+    def __init__(self):
+        """Initialize the tracker."""
+        self.active = 0
+        self.draining = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def accepting(self) -> bool:
+        """Whether new work should be started."""
+        return not self.draining
+
+    @asynccontextmanager
+    async def track(self) -> AsyncIterator[None]:
+        """Mark one unit of work as running for the duration of the block."""
+        self.active += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            if self.active == 0:
+                self._idle.set()
+
+    def start_draining(self):
+        """Stop accepting new work."""
+        self.draining = True
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """
+        Wait until no tracked work is running.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            bool: True if everything finished, False if the timeout expired
+        """
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def stats(self) -> Dict[str, object]:
+        """Running work and drain state."""
+        return {"active": self.active, "draining": self.draining}
+
+
+# Singleton instance
+inflight = InFlightTracker()
@@ -0,0 +1,122 @@
+"""Application lifespan: start and warm up shared resources, then drain and close them.
+
+Startup returns immediately so the process answers liveness probes, while
+filter engines, NER models, HTTP pools and provider SDKs are loaded
+concurrently in the background; readiness reports ``starting`` until that
+finishes. On shutdown readiness switches to ``draining``, in-flight
+WebSocket prompts and streams get ``SHUTDOWN_DRAIN_TIMEOUT`` seconds to
+finish, and only then are token usage and audit events flushed and
+connection pools and clients closed.
+
+uvicorn closes its sockets before the lifespan shutdown runs, so
+``app.server.DrainingServer`` drains on the exit signal instead; the
+lifespan shutdown then skips the drain.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI
+from loguru import logger
+
+from app.core.audit import audit_log
+from app.core.config import settings
+from app.core.health import health_monitor
+from app.core.inflight import inflight
+from app.core.preload import warm_up
+from app.core.shared_state import shared_state
+from app.core.token_budget import token_usage
+from app.proxy.proxy_server import proxy_server
+from app.services.llm_service import LLMServiceFactory
+
+
+class AppResources:
+    """Owns the startup and shutdown order of the process-wide singletons."""
+
+    def __init__(self, drain_timeout: float = 30.0):
+        """
+        Initialize the container.
+
+        Args:
+            drain_timeout: Seconds shutdown waits for in-flight prompts and streams
+        """
+        self.drain_timeout = drain_timeout
+        self.warm_up_summary: Optional[Dict[str, Any]] = None
+        self._warm_up_task: Optional[asyncio.Task] = None
+
+    async def startup(self):
+        """Start background services and the warm-up phase."""
+        inflight.draining = False
+        health_monitor.phase = "starting"
+        health_monitor.start()
+        if settings.AUDIT_ENABLED:
+            audit_log.start()
+        token_usage.start()
+        if settings.STARTUP_WARM_UP:
+            self._warm_up_task = asyncio.create_task(self._warm_up())
+        else:
+            health_monitor.phase = "ready"
+
+    async def _warm_up(self):
+        try:
+            summary = await warm_up()
+        except Exception as e:
+            # Dependencies then load on first use; readiness is not held back
+            logger.warning(f"Warm-up failed, dependencies will load on first use: {e}")
+        else:
+            self.warm_up_summary = summary
+            if settings.ENABLE_NER_FILTERS and settings.NER_MODEL not in summary["models"]:
+                health_monitor.model_error = f"NER model {settings.NER_MODEL} could not be loaded"
+            logger.info(
+                f"Warmed up profiles={summary['profiles']} models={summary['models']} "
+                f"providers={summary['providers']} in {summary['seconds']}s"
+            )
+        if health_monitor.phase == "starting":
+            health_monitor.phase = "ready"
+
+    async def drain(self):
+        """Stop taking work and wait for in-flight prompts and streams."""
+        health_monitor.phase = "draining"
+        inflight.start_draining()
+        if not await inflight.wait_idle(self.drain_timeout):
+            logger.warning(f"Shutdown drain timed out with {inflight.active} prompts in flight")
+
+    async def shutdown(self):
+        """Drain in-flight prompts (unless already drained) and close every resource."""
+        if not inflight.draining:
+            await self.drain()
+
+        if self._warm_up_task is not None:
+            self._warm_up_task.cancel()
+            await asyncio.gather(self._warm_up_task, return_exceptions=True)
+            self._warm_up_task = None
+
+        await health_monitor.stop()
+        # Pending token usage is flushed before the shared state connection closes
+        await token_usage.stop()
+        results = await asyncio.gather(
+            proxy_server.close(),
+            LLMServiceFactory.close_all(),
+            shared_state.close(),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"Resource could not be closed: {result}")
+        await audit_log.stop()
+        # Wait for queued log records to be written
+        await logger.complete()
+
+
+# Singleton instance
+resources = AppResources(drain_timeout=settings.SHUTDOWN_DRAIN_TIMEOUT)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """FastAPI lifespan handler running the resource container."""
+    await resources.startup()
+    try:
+        yield
+    finally:
+        await resources.shutdown()
@@ -0,0 +1,184 @@
+"""Structured logging: one loguru pipeline, request-id correlation and sampled access logs.
+
+stdlib ``logging`` records (proxy, filter and core modules) are routed into
+loguru, so every module ends up in the same sink and format. The sink writes
+from a background thread (``enqueue``), and every record carries the id of
+the request that produced it.
+"""
+import inspect
+import logging
+import random
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+from loguru import logger
+
+from app.core.config import settings
+
+# Id of the request being handled (same id as PromptResponse.request_id); always server generated
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Caller's own X-Request-ID, kept only for log correlation (never used in responses or audit events)
+client_request_id_var: ContextVar[Optional[str]] = ContextVar("client_request_id", default=None)
+
+# Accepted X-Request-ID format; other values are ignored
+CLIENT_REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9-]{1,64}")
+
+TEXT_FORMAT = (
+    "{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {extra[request_id]} | "
+    "{name}:{function}:{line} - {message}"
+)
+
+
+def current_request_id() -> Optional[str]:
+    """Id of the request being handled, if any."""
+    return request_id_var.get()
+
+
+def _add_request_id(record):
+    record["extra"].setdefault("request_id", request_id_var.get() or "-")
+    client_request_id = client_request_id_var.get()
+    if client_request_id:
+        record["extra"].setdefault("client_request_id", client_request_id)
+
+
+class InterceptHandler(logging.Handler):
+    """Forwards stdlib logging records to loguru, keeping level and call site."""
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+        # Skip the logging module's own frames so the original caller is reported
+        frame, depth = inspect.currentframe(), 0
+        while frame is not None and (depth == 0 or frame.f_code.co_filename == logging.__file__):
+            frame = frame.f_back
+            depth += 1
+        logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
+
+
+def configure_logging():
+    """Install the single loguru sink and route stdlib logging into it."""
+    logger.remove()
+    logger.configure(patcher=_add_request_id)
+    logger.add(
+        sys.stderr,
+        level=settings.LOG_LEVEL,
+        serialize=settings.LOG_FORMAT == "json",
+        format=TEXT_FORMAT,
+        enqueue=settings.LOG_ENQUEUE,
+        backtrace=False,
+        diagnose=False,
+    )
+    logging.basicConfig(handlers=[InterceptHandler()], level=settings.LOG_LEVEL, force=True)
+
+
+class SuccessSampler:
+    """
+    Decides which successful requests get an access log line.
+
+    Below ``threshold_rps`` every request is logged; above it only a
+    ``sample_rate`` fraction is, so log volume stops growing with traffic.
+    Errors and slow requests are always logged by the caller.
+    """
+
+    def __init__(self, threshold_rps: float = 200.0, sample_rate: float = 0.01):
+        """
+        Initialize the sampler.
+
+        Args:
+            threshold_rps: Requests per second above which success logs are sampled
+            sample_rate: Fraction of successful requests logged while sampling
+        """
+        self.threshold_rps = threshold_rps
+        self.sample_rate = sample_rate
+        self._window = int(time.monotonic())
+        self._count = 0
+        self._last_rate = 0
+
+    def should_log(self) -> bool:
+        """Count a successful request and decide whether to log it."""
+        now = int(time.monotonic())
+        if now != self._window:
+            self._last_rate = self._count if now == self._window + 1 else 0
+            self._window = now
+            self._count = 0
+        self._count += 1
+        if max(self._count, self._last_rate) <= self.threshold_rps:
+            return True
+        return random.random() < self.sample_rate
+
+
+class RequestLoggingMiddleware:
+    """
+    ASGI middleware assigning request ids and writing one structured access log per request.
+
+    The id is always generated here, so callers cannot forge or collide
+    the ids in responses and audit events. It is visible to handlers
+    through ``current_request_id()`` and returned in the ``X-Request-ID``
+    response header along with ``X-Process-Time``. A well-formed
+    ``X-Request-ID`` sent by the caller is only attached to the log
+    records as ``client_request_id``.
+    """
+
+    def __init__(self, app, sampler: Optional[SuccessSampler] = None, slow_ms: float = 1000.0):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: Wrapped ASGI application
+            sampler: Success log sampler
+            slow_ms: Requests slower than this are always logged
+        """
+        self.app = app
+        self.sampler = sampler or SuccessSampler()
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        client_request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                value = value.decode("latin-1")
+                if CLIENT_REQUEST_ID_PATTERN.fullmatch(value):
+                    client_request_id = value
+                break
+        request_id = str(uuid.uuid4())
+        token = request_id_var.set(request_id)
+        client_token = client_request_id_var.set(client_request_id)
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_headers(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                process_time = (time.perf_counter() - start) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                headers.append((b"x-process-time", f"{process_time:.2f}ms".encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if status_code >= 400 or duration_ms >= self.slow_ms or self.sampler.should_log():
+                logger.bind(
+                    method=scope["method"],
+                    path=scope["path"],
+                    status=status_code,
+                    duration_ms=round(duration_ms, 2),
+                ).log("WARNING" if status_code >= 500 else "INFO", "request")
+            request_id_var.reset(token)
+            client_request_id_var.reset(client_token)
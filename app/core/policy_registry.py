@@ -0,0 +1,101 @@
+"""Policy profile registry with cached, shared filter engines."""
+import threading
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.filters.filter_manager import FilterManager, filter_manager
+from app.filters.policies import BUILTIN_PROFILES, PolicyProfile
+
+
+class PolicyRegistry:
+    """Resolves policy profiles per request and caches one FilterManager per profile."""
+
+    def __init__(self):
+        """Load built-in profiles and apply configured overrides."""
+        self.profiles: Dict[str, PolicyProfile] = dict(BUILTIN_PROFILES)
+        for name, data in settings.POLICY_PROFILES.items():
+            self.profiles[name] = PolicyProfile.from_dict(name, data)
+
+        self.default_profile = settings.DEFAULT_POLICY_PROFILE
+        if self.default_profile not in self.profiles:
+            raise ValueError(f"Unknown default policy profile: {self.default_profile}")
+        for setting, mapping in (
+            ("POLICY_API_KEY_MAP", settings.POLICY_API_KEY_MAP),
+            ("POLICY_USER_MAP", settings.POLICY_USER_MAP),
+        ):
+            unknown = sorted(set(mapping.values()) - set(self.profiles))
+            if unknown:
+                raise ValueError(f"Unknown policy profiles in {setting}: {', '.join(unknown)}")
+
+        self._managers: Dict[str, FilterManager] = {}
+        self._lock = threading.Lock()
+
+        # The global singleton already holds the default engines; reuse it
+        if self.profiles[self.default_profile] == filter_manager.profile:
+            self._managers[self.default_profile] = filter_manager
+
+    def resolve(
+        self,
+        profile_name: Optional[str] = None,
+        api_key: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> str:
+        """
+        Pick the profile for a request.
+
+        Precedence: explicit header value, API key mapping, user mapping, default.
+
+        Args:
+            profile_name: Profile requested explicitly (e.g. via header)
+            api_key: Caller API key
+            user_id: Caller user ID
+
+        Returns:
+            str: Name of the selected profile
+
+        Raises:
+            KeyError: If an explicitly requested profile does not exist
+        """
+        if profile_name:
+            if profile_name not in self.profiles:
+                raise KeyError(f"Unknown policy profile: {profile_name}")
+            return profile_name
+        if api_key and api_key in settings.POLICY_API_KEY_MAP:
+            return settings.POLICY_API_KEY_MAP[api_key]
+        if user_id and user_id in settings.POLICY_USER_MAP:
+            return settings.POLICY_USER_MAP[user_id]
+        return self.default_profile
+
+    def get_profile(self, name: Optional[str] = None) -> PolicyProfile:
+        """Return the profile definition for a name (default if omitted)."""
+        return self.profiles[name or self.default_profile]
+
+    def get_manager(self, name: Optional[str] = None) -> FilterManager:
+        """
+        Return the cached FilterManager for a profile, building it on first use.
+
+        Args:
+            name: Profile name (default if omitted)
+
+        Returns:
+            FilterManager: Shared filter engine for the profile
+        """
+        name = name or self.default_profile
+        manager = self._managers.get(name)
+        if manager is not None:
+            return manager
+
+        with self._lock:
+            manager = self._managers.get(name)
+            if manager is None:
+                manager = FilterManager(self.profiles[name])
+                self._managers[name] = manager
+        return manager
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Return statistics of every filter engine built so far."""
+        return [manager.stats() for manager in list(self._managers.values())]
+
+
+# Singleton instance
+policy_registry = PolicyRegistry()
@@ -0,0 +1,143 @@
+"""
+Load filter engines and heavy dependencies ahead of the first request.
+
+In prefork mode this runs in the master process so forked workers share
+the results copy-on-write; under plain uvicorn the same warm-up runs as a
+background task after startup, so importing the app stays cheap.
+"""
+import asyncio
+import gc
+import logging
+import time
+from typing import Any, Dict, List
+
+from app.core.config import settings
+from app.core.policy_registry import policy_registry
+from app.filters.entropy_filters import load_numpy
+from app.filters.model_pool import model_pool
+from app.proxy.proxy_server import proxy_server
+from app.schemas.request import ModelProvider
+from app.services.llm_service import LLMServiceFactory
+from app.services.resilience import ProviderError
+from app.services.tokenizer import DEFAULT_ENCODING, token_counter
+
+logger = logging.getLogger(__name__)
+
+# Exercises regex, entropy and NER paths so lazily built structures exist before fork
+WARMUP_TEXT = (
+    "John Smith from Acme Corp wrote to john.smith@example.com on Monday about "
+    "the 5,000 dollar invoice. Ahmet Yılmaz yarın İstanbul ofisinde olacak."
+)
+
+
+def _preload_models() -> List[str]:
+    """Load the default and language-specific NER models, up to the pool size."""
+    names = [settings.NER_MODEL]
+    names += [name for name in settings.NER_LANGUAGE_MODELS.values() if name not in names]
+
+    loaded = []
+    for name in names[:model_pool.max_models]:
+        try:
+            model_pool.get(name)
+            loaded.append(name)
+        except ImportError as e:
+            logger.warning(f"NER model not preloaded: {e}")
+    return loaded
+
+
+def preload_filters() -> Dict[str, Any]:
+    """
+    Build every policy profile's filter engine and load the NER models.
+
+    Returns:
+        Dict[str, Any]: Preloaded profiles, models and elapsed time
+    """
+    start = time.perf_counter()
+
+    models = _preload_models() if settings.ENABLE_NER_FILTERS else []
+    profiles = []
+    for name in policy_registry.profiles:
+        manager = policy_registry.get_manager(name)
+        try:
+            manager.filter_text(WARMUP_TEXT)
+        except ImportError as e:
+            # NER model missing; the engine is still built and shared
+            logger.warning(f"Warm-up of profile {name} skipped NER: {e}")
+        profiles.append(name)
+
+    return {
+        "profiles": profiles,
+        "models": models,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def _warm_up_provider(provider: ModelProvider) -> bool:
+    """Import a configured provider's SDK and build its client."""
+    service = LLMServiceFactory.get_service(provider)
+    if not service.is_available():
+        return False
+    try:
+        service.warm_up()
+    except ProviderError as e:
+        logger.warning(f"Provider {provider.value} not warmed up: {e}")
+        return False
+    return True
+
+
+def _warm_up_numpy() -> bool:
+    """Import numpy for the vectorized entropy scorer."""
+    return load_numpy() is not None
+
+
+def _warm_up_tokenizer() -> bool:
+    """Load the tokenizer used for pre-dispatch token counts."""
+    return token_counter.warm_up([DEFAULT_ENCODING])
+
+
+def _warm_up_http() -> bool:
+    """Import httpx and build the proxy's connection pool."""
+    return proxy_server.client is not None
+
+
+async def warm_up() -> Dict[str, Any]:
+    """
+    Load filter engines, numpy, httpx, the tokenizer and provider SDKs concurrently in worker threads.
+
+    Returns:
+        Dict[str, Any]: Warmed-up profiles, models, providers and elapsed time
+    """
+    start = time.perf_counter()
+    providers = list(ModelProvider)
+    results = await asyncio.gather(
+        asyncio.to_thread(preload_filters),
+        asyncio.to_thread(_warm_up_numpy),
+        asyncio.to_thread(_warm_up_http),
+        asyncio.to_thread(_warm_up_tokenizer),
+        *(asyncio.to_thread(_warm_up_provider, provider) for provider in providers),
+    )
+    filters, numpy_loaded, http_ready, tokenizer_loaded = results[:4]
+    return {
+        "profiles": filters["profiles"],
+        "models": filters["models"],
+        "numpy": numpy_loaded,
+        "http": http_ready,
+        "tokenizer": tokenizer_loaded,
+        "providers": [provider.value for provider, ok in zip(providers, results[4:]) if ok],
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def freeze_heap() -> int:
+    """
+    Move every live object into the GC's permanent generation.
+
+    Collections in the workers then never touch the preloaded objects'
+    headers, so their pages stay shared with the master after fork.
+
+    Returns:
+        int: Number of frozen objects
+    """
+    gc.collect()
+    gc.freeze()
+    return gc.get_freeze_count()
@@ -1,64 +1,82 @@
 """Core prompt service to handle user requests and responses."""
+import json
 import uuid
 import time
-from typing import Dict, Optional
+from typing import Any, AsyncIterator, Dict, Optional, Tuple, Union
 
-from app.filters.filter_manager import filter_manager
-from app.schemas.request import PromptRequest
+from app.core.audit import audit_log
+from app.core.coalescing import SingleFlight
+from app.core.config import settings
+from app.core.log import current_request_id
+from app.core.policy_registry import policy_registry
+from app.core.token_budget import ContextLengthExceeded, token_usage
+from app.filters.filter_manager import FilterManager
+from app.filters.spans import SpanBuffer
+from app.filters.streaming import StreamSegmenter
+from app.schemas.request import DetailLevel, PromptRequest
 from app.schemas.response import FilteredContent, PromptResponse
-from app.services.llm_service import LLMServiceFactory
+from app.services.router import model_router
+from app.services.tokenizer import token_counter
 
 
 class PromptService:
     """Core service to handle user prompt requests."""
     
-    async def process_prompt(self, request: PromptRequest) -> PromptResponse:
+    def __init__(self):
+        """Initialize the service."""
+        # Identical concurrent filter runs and deterministic provider calls are shared
+        self._filter_flight = SingleFlight()
+        self._llm_flight = SingleFlight()
+    
+    async def process_prompt(self, request: PromptRequest, policy: Optional[str] = None) -> PromptResponse:
         """
         Process a user prompt request through the filtering and LLM pipeline.
         
         Args:
             request: The prompt request data
+            policy: Policy profile name (resolved from the user ID if omitted)
             
         Returns:
             PromptResponse: The processed response with filtering information
         """
-        request_id = str(uuid.uuid4())
+        # Same id as the request's log records and X-Request-ID header
+        request_id = current_request_id() or str(uuid.uuid4())
         start_time = time.time()
         
+        policy = policy or policy_registry.resolve(user_id=request.user_id)
+        filter_manager = policy_registry.get_manager(policy)
+        detail = self._detail_level(request)
+        
         # 1. Filter the input prompt
-        filtered_input, input_masked_elements, input_has_sensitive = filter_manager.filter_text(request.content)
+        filtered_input, input_masked_elements, input_has_sensitive = await self._filter(
+            policy, filter_manager, request.content
+        )
         
         # Create request filtered content object
-        request_filtered = FilteredContent(
-            original_text=request.content,
-            filtered_text=filtered_input,
-            has_sensitive_content=input_has_sensitive,
-            masked_elements=input_masked_elements
+        request_filtered = self._filtered_content(
+            request.content, filtered_input, input_has_sensitive, input_masked_elements, detail
         )
+        self._audit(request_id, request, policy, "request", input_masked_elements)
         
-        # 2. Get the appropriate LLM service
-        llm_service = LLMServiceFactory.get_service(request.provider)
+        # 2. Fit the prompt to the context window and the user's token budget
+        filtered_input, params, prompt_tokens = self._fit_to_context(request, filtered_input)
+        token_usage.check(request.user_id, prompt_tokens)
         
-        # 3. Generate response from LLM
-        response_text, response_metadata = await llm_service.generate_response(
-            prompt=filtered_input,
-            model=request.model,
-            temperature=request.temperature,
-            max_tokens=request.max_tokens,
-            system_prompt=request.system_prompt,
-            **(request.additional_params or {})
+        # 3. Generate response from the LLM (routed models may go to any of their targets)
+        response_text, response_metadata, tokens_used = await self._generate(
+            request, filtered_input, params, prompt_tokens
         )
         
         # 4. Filter the output response
-        filtered_output, output_masked_elements, output_has_sensitive = filter_manager.filter_text(response_text)
+        filtered_output, output_masked_elements, output_has_sensitive = await self._filter(
+            policy, filter_manager, response_text
+        )
         
         # Create response filtered content object
-        response_filtered = FilteredContent(
-            original_text=response_text,
-            filtered_text=filtered_output,
-            has_sensitive_content=output_has_sensitive,
-            masked_elements=output_masked_elements
+        response_filtered = self._filtered_content(
+            response_text, filtered_output, output_has_sensitive, output_masked_elements, detail
         )
+        self._audit(request_id, request, policy, "response", output_masked_elements)
         
         # 5. Calculate processing time
         processing_time_ms = (time.time() - start_time) * 1000
@@ -70,10 +88,266 @@ class PromptService:
             request_filtered=request_filtered,
             response_filtered=response_filtered,
             model_used=response_metadata.get("model", request.model),
-            provider=request.provider.value,
+            provider=response_metadata.get("provider", request.provider.value),
+            route=response_metadata.get("route"),
+            policy_profile=policy,
             processing_time_ms=processing_time_ms,
-            tokens_used=response_metadata.get("tokens")
+            tokens_used=tokens_used
+        )
+
+    
+    async def stream_prompt(
+        self, request: PromptRequest, policy: Optional[str] = None
+    ) -> AsyncIterator[Union[str, PromptResponse]]:
+        """
+        Process a prompt and stream the filtered LLM output as it arrives.
+        
+        Output is cut only at sentence/line boundaries before filtering, so masks
+        stay correct even when an entity spans provider chunks.
+        
+        Args:
+            request: The prompt request data
+            policy: Policy profile name (resolved from the user ID if omitted)
+            
+        Yields:
+            str: Filtered response text deltas
+            PromptResponse: Final response with metadata, yielded last
+        """
+        # Same id as the request's log records and X-Request-ID header
+        request_id = current_request_id() or str(uuid.uuid4())
+        start_time = time.time()
+        
+        policy = policy or policy_registry.resolve(user_id=request.user_id)
+        filter_manager = policy_registry.get_manager(policy)
+        detail = self._detail_level(request)
+        
+        # 1. Filter the input prompt
+        filtered_input, input_masked_elements, input_has_sensitive = await self._filter(
+            policy, filter_manager, request.content
+        )
+        request_filtered = self._filtered_content(
+            request.content, filtered_input, input_has_sensitive, input_masked_elements, detail
+        )
+        self._audit(request_id, request, policy, "request", input_masked_elements)
+        
+        # 2. Fit the prompt to the context window and the user's token budget
+        filtered_input, params, prompt_tokens = self._fit_to_context(request, filtered_input)
+        token_usage.check(request.user_id, prompt_tokens)
+        
+        # 3. Stream from the LLM, filtering each safe segment
+        response_metadata: Dict[str, Any] = {}
+        segmenter = StreamSegmenter()
+        raw_parts = []
+        original_parts = []
+        filtered_parts = []
+        output_masked_elements = SpanBuffer()
+        offset = 0
+        
+        async def filter_segment(segment: str) -> str:
+            nonlocal offset
+            filtered, masked_elements, _ = await filter_manager.filter_text_async(segment)
+            masked_elements.shift(offset)
+            output_masked_elements.extend(masked_elements)
+            if detail is DetailLevel.FULL:
+                original_parts.append(segment)
+            filtered_parts.append(filtered)
+            offset += len(segment)
+            return filtered
+        
+        async for chunk in model_router.stream(
+            request.provider, filtered_input, metadata=response_metadata, **params
+        ):
+            raw_parts.append(chunk)
+            segment = segmenter.push(chunk)
+            if segment:
+                yield await filter_segment(segment)
+        
+        segment = segmenter.flush()
+        if segment:
+            yield await filter_segment(segment)
+        
+        # 4. Final response with metadata
+        filtered_output = "".join(filtered_parts)
+        response_filtered = self._filtered_content(
+            "".join(original_parts), filtered_output, len(output_masked_elements) > 0, output_masked_elements, detail
+        )
+        self._audit(request_id, request, policy, "response", output_masked_elements)
+        
+        yield PromptResponse(
+            request_id=request_id,
+            response_content=filtered_output,
+            request_filtered=request_filtered,
+            response_filtered=response_filtered,
+            model_used=response_metadata.get("model", request.model),
+            provider=response_metadata.get("provider", request.provider.value),
+            route=response_metadata.get("route"),
+            policy_profile=policy,
+            processing_time_ms=(time.time() - start_time) * 1000,
+            # Masks change the text's length, so completion tokens are counted on what the provider sent
+            tokens_used=self._tokens_used(request, response_metadata, prompt_tokens, "".join(raw_parts))
+        )
+    
+    async def _filter(self, policy: str, filter_manager: FilterManager, text: str) -> Tuple[str, SpanBuffer, bool]:
+        """
+        Filter text, sharing the run with identical concurrent requests under the same policy.
+        
+        The returned SpanBuffer may be shared between requests and must not be modified.
+        """
+        if not settings.PROMPT_COALESCING_ENABLED:
+            return await filter_manager.filter_text_async(text)
+        return await self._filter_flight.do((policy, text), lambda: filter_manager.filter_text_async(text))
+    
+    async def _generate(
+        self, request: PromptRequest, filtered_input: str, params: Dict[str, Any], prompt_tokens: int
+    ) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+        """
+        Call the LLM, sharing the call with identical concurrent deterministic requests.
+        
+        Only temperature 0 requests are coalesced: sampled outputs are expected
+        to differ per request. The key is the filtered prompt plus every call
+        parameter, so requests only merge when the provider would see the same call.
+        The call's token usage is charged once, to the user whose request
+        started it; requests that joined it report the same usage but are not
+        charged, since no provider tokens were spent for them.
+        
+        Returns:
+            Tuple[str, Dict[str, Any], Dict[str, Any]]: Response text, response metadata and token usage
+        """
+        async def call() -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+            response_text, metadata = await model_router.generate(request.provider, filtered_input, **params)
+            return response_text, metadata, self._tokens_used(request, metadata, prompt_tokens, response_text)
+        
+        if not settings.PROMPT_COALESCING_ENABLED or request.temperature != 0:
+            return await call()
+        key = (request.provider.value, filtered_input, json.dumps(params, sort_keys=True, default=str))
+        return await self._llm_flight.do(key, call)
+    
+    @staticmethod
+    def _fit_to_context(request: PromptRequest, filtered_input: str) -> Tuple[str, Dict[str, Any], int]:
+        """
+        Count the filtered prompt's tokens and make the call fit the model's context window.
+        
+        Routed models are checked against the smallest window of their targets.
+        Over-long requests raise ContextLengthExceeded; with TOKEN_LIMIT_ACTION
+        "truncate" max_tokens is lowered first (down to TOKEN_MIN_OUTPUT) and
+        then the start of the prompt is dropped.
+        
+        Returns:
+            Tuple[str, Dict[str, Any], int]: Prompt to send, call parameters and prompt tokens
+        """
+        params = PromptService._llm_params(request)
+        if model_router.has_route(request.model):
+            models = [target.model for target in model_router.routes[request.model]]
+        else:
+            models = [request.model]
+        model = models[0]
+        system_tokens = token_counter.count(request.system_prompt or "", model)
+        prompt_tokens = system_tokens + token_counter.count(filtered_input, model)
+        if not settings.TOKEN_LIMITS_ENABLED:
+            return filtered_input, params, prompt_tokens
+        
+        window = token_counter.context_window(models)
+        max_tokens = params.get("max_tokens") or 0
+        if prompt_tokens + max_tokens <= window:
+            return filtered_input, params, prompt_tokens
+        if settings.TOKEN_LIMIT_ACTION != "truncate":
+            raise ContextLengthExceeded(prompt_tokens + max_tokens, window)
+        
+        reserve = min(max_tokens, settings.TOKEN_MIN_OUTPUT)
+        if prompt_tokens + reserve > window:
+            keep = window - reserve - system_tokens
+            if keep <= 0:
+                raise ContextLengthExceeded(prompt_tokens + reserve, window)
+            filtered_input = token_counter.truncate(filtered_input, keep, model)
+            prompt_tokens = system_tokens + token_counter.count(filtered_input, model)
+        if max_tokens:
+            params["max_tokens"] = max(1, min(max_tokens, window - prompt_tokens))
+        return filtered_input, params, prompt_tokens
+    
+    @staticmethod
+    def _tokens_used(
+        request: PromptRequest, response_metadata: Dict[str, Any], prompt_tokens: int, response_text: str
+    ) -> Dict[str, Any]:
+        """
+        Provider-reported token usage, or local counts for providers that report none.
+        
+        Either way the usage is charged to the user's token budget.
+        """
+        tokens = response_metadata.get("tokens")
+        if not tokens:
+            completion_tokens = token_counter.count(response_text, response_metadata.get("model", request.model))
+            tokens = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "estimated": 1,
+            }
+        token_usage.record(request.user_id, tokens["prompt_tokens"], tokens["completion_tokens"])
+        return tokens
+    
+    def coalescing_stats(self) -> Dict[str, Dict[str, int]]:
+        """Shared filter runs and provider calls."""
+        return {"filter": self._filter_flight.stats(), "llm": self._llm_flight.stats()}
+    
+    @staticmethod
+    def _detail_level(request: PromptRequest) -> DetailLevel:
+        """Detail level asked for by the request, else the configured default."""
+        return request.detail_level or settings.RESPONSE_DETAIL_LEVEL
+    
+    @staticmethod
+    def _filtered_content(
+        original_text: str,
+        filtered_text: str,
+        has_sensitive_content: bool,
+        masked_elements: SpanBuffer,
+        detail: DetailLevel,
+    ) -> FilteredContent:
+        """
+        Build the filtering report at the requested detail level.
+        
+        Only ``full`` carries the texts, so the unmasked prompt and response
+        are not sent back (or validated and serialized) unless asked for.
+        Spans become dicts only here, and the trusted internal values skip
+        pydantic validation.
+        """
+        if detail is DetailLevel.NONE:
+            return FilteredContent.model_construct(has_sensitive_content=has_sensitive_content)
+        
+        fields: Dict[str, Any] = {
+            "has_sensitive_content": has_sensitive_content,
+            "entity_counts": masked_elements.type_counts(),
+        }
+        if detail in (DetailLevel.SPANS, DetailLevel.FULL):
+            fields["masked_elements"] = masked_elements.to_dicts()
+        if detail is DetailLevel.FULL:
+            fields["original_text"] = original_text
+            fields["filtered_text"] = filtered_text
+        return FilteredContent.model_construct(**fields)
+    
+    @staticmethod
+    def _audit(request_id: str, request: PromptRequest, policy: str, direction: str, masked_elements: SpanBuffer):
+        """Queue a detection event for the audit trail (entity types and counts only)."""
+        if len(masked_elements):
+            audit_log.record(
+                request_id,
+                request.user_id,
+                policy,
+                policy_registry.get_profile(policy).version,
+                direction,
+                masked_elements.type_counts(),
+            )
+    
+    @staticmethod
+    def _llm_params(request: PromptRequest) -> Dict[str, Any]:
+        """Build provider call parameters; explicit request fields win over additional_params."""
+        params = dict(request.additional_params or {})
+        params.update(
+            model=request.model,
+            temperature=request.temperature,
+            max_tokens=request.max_tokens,
+            system_prompt=request.system_prompt,
         )
+        return params
 
 
 # Singleton instance
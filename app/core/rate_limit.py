@@ -0,0 +1,363 @@
+"""Token-bucket rate limiting and concurrency-limited admission control.
+
+Each worker smooths bursts with in-process token buckets; cluster-wide
+limits are enforced with fixed-window counters in the shared state
+backend, so N workers do not allow N times the configured rate. If the
+backend is unreachable the local buckets still apply. Checks run before
+any filtering CPU is spent.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+# Shared counter key prefix: ratelimit:<scope>:<window>:<key>
+KEY_PREFIX = "ratelimit"
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request is over its rate limit or cannot be admitted."""
+
+    def __init__(self, scope: str, retry_after: float):
+        """
+        Initialize the error.
+
+        Args:
+            scope: Limit that rejected the request (user, api_key, provider, admission)
+            retry_after: Seconds until a retry can succeed
+        """
+        super().__init__(f"Rate limit exceeded for {scope}")
+        self.scope = scope
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        """Retry-After header value (whole seconds, at least 1)."""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    """Token bucket refilled lazily on access (two floats per key)."""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, capacity: float, now: float):
+        """Start full."""
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, rate: float, capacity: float, now: float):
+        """Add the tokens earned since the last access."""
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter keyed by an arbitrary string.
+
+    Buckets are kept in least-recently-used order; buckets idle longer than
+    ``idle_ttl`` (by then they are full again, so dropping them changes
+    nothing) and the oldest ones beyond ``max_keys`` are evicted.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, idle_ttl: float = 600.0, max_keys: int = 100000):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate_per_minute: Sustained requests per minute per key (0 disables the limit)
+            burst: Bucket capacity (requests allowed at once)
+            idle_ttl: Seconds after which an unused bucket is dropped
+            max_keys: Maximum number of tracked keys
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(max(1, burst))
+        self.idle_ttl = max(idle_ttl, self.capacity / self.rate if self.rate else 0.0)
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Is the limit active?"""
+        return self.rate > 0
+
+    def _bucket(self, key: str, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.capacity, now)
+            self._buckets[key] = bucket
+            self._evict(now)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.refill(self.rate, self.capacity, now)
+        return bucket
+
+    def _evict(self, now: float):
+        """Drop idle buckets from the least recently used end."""
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if len(self._buckets) <= self.max_keys and now - bucket.updated < self.idle_ttl:
+                break
+            del self._buckets[key]
+
+    def wait_time(self, key: str, cost: float = 1.0, now: Optional[float] = None) -> float:
+        """
+        Seconds until ``cost`` tokens are available for a key (0 if available now).
+
+        Args:
+            key: Limiter key
+            cost: Tokens the request needs
+            now: Current monotonic time (for tests)
+        """
+        if not self.enabled:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        bucket = self._bucket(key, now)
+        missing = cost - bucket.tokens
+        return missing / self.rate if missing > 0 else 0.0
+
+    def window_limit(self, window: float) -> int:
+        """Requests a key may make per shared window (the sustained rate plus the burst)."""
+        return math.ceil(self.rate * window + self.capacity)
+
+    def consume(self, key: str, cost: float = 1.0, now: Optional[float] = None):
+        """Take tokens from a key's bucket (call after a successful wait_time check)."""
+        if not self.enabled:
+            return
+        now = time.monotonic() if now is None else now
+        self._bucket(key, now).tokens -= cost
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def stats(self) -> Dict[str, Any]:
+        """Limiter configuration and counters."""
+        return {
+            "rate_per_minute": self.rate * 60,
+            "burst": int(self.capacity),
+            "keys": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
+
+
+def user_limit_key(user: Optional[str], api_key: Optional[str], client_host: Optional[str]) -> Optional[str]:
+    """
+    Key for the user limit: the resolved user, else the client address.
+
+    Callers identified only by an API key are limited by the API key limit
+    alone, so clients sharing an address (NAT, proxies) do not share a limit.
+    """
+    if user:
+        return user
+    if api_key or not client_host:
+        return None
+    return f"ip:{client_host}"
+
+
+class RequestRateLimiter:
+    """Applies the user, API key and provider limits to a request together."""
+
+    def __init__(self, window: Optional[float] = None):
+        """
+        Build the limiters from settings.
+
+        Args:
+            window: Shared counter window in seconds (default RATE_LIMIT_WINDOW; 0 keeps limits per worker)
+        """
+        self.window = settings.RATE_LIMIT_WINDOW if window is None else window
+        self.shared_failures = 0
+        idle_ttl = settings.RATE_LIMIT_IDLE_TTL
+        max_keys = settings.RATE_LIMIT_MAX_KEYS
+        self.limiters: Dict[str, RateLimiter] = {
+            "user": RateLimiter(settings.RATE_LIMIT_USER_PER_MINUTE, settings.RATE_LIMIT_USER_BURST, idle_ttl, max_keys),
+            "api_key": RateLimiter(settings.RATE_LIMIT_API_KEY_PER_MINUTE, settings.RATE_LIMIT_API_KEY_BURST, idle_ttl, max_keys),
+            "provider": RateLimiter(settings.RATE_LIMIT_PROVIDER_PER_MINUTE, settings.RATE_LIMIT_PROVIDER_BURST, idle_ttl, max_keys),
+        }
+
+    async def check(self, user: Optional[str] = None, api_key: Optional[str] = None, provider: Optional[str] = None):
+        """
+        Admit a request against every applicable limit.
+
+        Tokens are taken only if all limits allow the request, so a request
+        rejected by one limit does not use up the others.
+
+        Raises:
+            RateLimitExceeded: With the scope and wait time of the tightest limit
+        """
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        now = time.monotonic()
+        checks = [
+            (scope, key)
+            for scope, key in (("user", user), ("api_key", api_key), ("provider", provider))
+            if key and self.limiters[scope].enabled
+        ]
+        if not checks:
+            return
+
+        worst_scope, worst_wait = None, 0.0
+        for scope, key in checks:
+            wait = self.limiters[scope].wait_time(key, now=now)
+            if wait > worst_wait:
+                worst_scope, worst_wait = scope, wait
+
+        if worst_scope is not None:
+            self.limiters[worst_scope].rejected += 1
+            raise RateLimitExceeded(worst_scope, worst_wait)
+
+        # Taken before the shared check so concurrent requests of this worker see them
+        for scope, key in checks:
+            self.limiters[scope].consume(key, now=now)
+        if self.window > 0:
+            try:
+                await self._check_shared(checks)
+            except RateLimitExceeded:
+                for scope, key in checks:
+                    self.limiters[scope].consume(key, cost=-1.0, now=now)
+                raise
+        for scope, _ in checks:
+            self.limiters[scope].allowed += 1
+
+    async def _check_shared(self, checks: List[Tuple[str, str]]):
+        """Count the request in the cluster-wide window counters, undoing the counts if any is over."""
+        now = time.time()
+        window_id = int(now // self.window)
+        keys = [f"{KEY_PREFIX}:{scope}:{window_id}:{key}" for scope, key in checks]
+        results = await asyncio.gather(
+            *(shared_state.incr(key, ttl=self.window) for key in keys), return_exceptions=True
+        )
+        failed = [result for result in results if isinstance(result, Exception)]
+        if failed:
+            # Backend unreachable: the per-worker buckets still apply
+            self.shared_failures += 1
+            logger.warning(f"Shared rate limit counters unavailable, using per-worker limits: {failed[0]}")
+            return
+
+        over = [
+            scope for (scope, _), count in zip(checks, results)
+            if count > self.limiters[scope].window_limit(self.window)
+        ]
+        if over:
+            # With the TTL, a key that expired meanwhile is not recreated at -1 forever
+            await asyncio.gather(
+                *(shared_state.incr(key, -1, ttl=self.window) for key in keys), return_exceptions=True
+            )
+            self.limiters[over[0]].rejected += 1
+            raise RateLimitExceeded(over[0], (window_id + 1) * self.window - now)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters of every limiter."""
+        stats: Dict[str, Any] = {scope: limiter.stats() for scope, limiter in self.limiters.items()}
+        stats["shared_window_seconds"] = self.window
+        stats["shared_failures"] = self.shared_failures
+        return stats
+
+
+class AdmissionController:
+    """
+    Bounds the number of requests processed at once.
+
+    Requests beyond ``max_concurrent`` wait in a bounded queue; when the
+    queue is full or the wait exceeds ``queue_timeout`` the request is
+    rejected instead of piling up.
+    """
+
+    def __init__(self, max_concurrent: int = 64, max_queue: int = 256, queue_timeout: float = 5.0):
+        """
+        Initialize the controller.
+
+        Args:
+            max_concurrent: Requests processed at once
+            max_queue: Requests allowed to wait for a slot
+            queue_timeout: Maximum seconds a request waits for a slot
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Created lazily inside the running event loop (a new loop gets a new semaphore)
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+            self._loop = loop
+        return self._semaphore
+
+    async def acquire(self):
+        """
+        Take a processing slot; pair with ``release`` once the response is sent.
+
+        Raises:
+            RateLimitExceeded: If the queue is full or the wait times out
+        """
+        semaphore = self._get_semaphore()
+        if semaphore.locked():
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise RateLimitExceeded("admission", self.queue_timeout)
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise RateLimitExceeded("admission", self.queue_timeout)
+            finally:
+                self.waiting -= 1
+        else:
+            await semaphore.acquire()
+        self.active += 1
+
+    def release(self):
+        """Return a slot taken with ``acquire``."""
+        self.active -= 1
+        self._get_semaphore().release()
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold a processing slot for the duration of the block.
+
+        Raises:
+            RateLimitExceeded: If the queue is full or the wait times out
+        """
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Current load and rejection count."""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+# Singleton instances
+request_rate_limiter = RequestRateLimiter()
+admission_controller = AdmissionController(
+    max_concurrent=settings.ADMISSION_MAX_CONCURRENT,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+)
@@ -0,0 +1,170 @@
+"""Request body size limits and length-checked JSON parsing.
+
+Oversized bodies are rejected with 413 from the Content-Length header, or
+as soon as the streamed body crosses the route's limit, so a request never
+buffers more than its limit. Text fields are length-checked while the JSON
+is decoded, before any filtering work is done on them.
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, Request
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+from app.utils import json_utils
+
+# Keys whose string values carry prompt text (OpenAI, Anthropic, Google and MCP payloads)
+TEXT_FIELDS = frozenset({"content", "text", "prompt", "system", "system_prompt", "input"})
+
+
+class RequestTooLarge(HTTPException):
+    """
+    Raised when a request body or one of its text fields is over its limit.
+
+    An HTTPException so FastAPI's own body parsing re-raises it as a 413
+    instead of wrapping it in a generic 400.
+    """
+
+    def __init__(self, detail: str):
+        """
+        Initialize the error.
+
+        Args:
+            detail: Which limit was exceeded
+        """
+        super().__init__(status_code=413, detail=detail)
+
+
+class BodySizeLimitMiddleware:
+    """
+    ASGI middleware bounding request body size per route.
+
+    Requests whose Content-Length is over the limit are rejected before the
+    body is read; chunked bodies are counted as they stream in.
+    """
+
+    def __init__(self, app, default_limit: int, route_limits: Optional[Dict[str, int]] = None):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: Wrapped ASGI application
+            default_limit: Body limit in bytes for routes without their own (0 disables)
+            route_limits: Path prefix -> body limit in bytes
+        """
+        self.app = app
+        self.default_limit = default_limit
+        # Longest prefix first so the most specific route wins
+        self.route_limits: List[Tuple[str, int]] = sorted(
+            (route_limits or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+
+    def limit_for(self, path: str) -> int:
+        """Body limit for a request path."""
+        for prefix, limit in self.route_limits:
+            if path.startswith(prefix):
+                return limit
+        return self.default_limit
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limit_for(scope["path"])
+        if limit <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > limit:
+                    await self._reject(scope, receive, send, limit)
+                    return
+                break
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise RequestTooLarge(f"Request body exceeds {limit} bytes")
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except RequestTooLarge:
+            # Raised outside FastAPI's handlers (e.g. by a raw ASGI route)
+            if response_started:
+                raise
+            await self._reject(scope, receive, send, limit)
+
+    @staticmethod
+    async def _reject(scope, receive, send, limit: int):
+        response = JSONResponse(
+            {"detail": f"Request body exceeds {limit} bytes"},
+            status_code=413,
+            headers={"Connection": "close"},
+        )
+        await response(scope, receive, send)
+
+
+def _check_text_fields(limit: int):
+    """object_pairs_hook rejecting over-long text fields as each object is decoded."""
+
+    def hook(pairs: List[Tuple[str, Any]]) -> Dict[str, Any]:
+        for key, value in pairs:
+            if key in TEXT_FIELDS and isinstance(value, str) and len(value) > limit:
+                raise RequestTooLarge(f"Field '{key}' exceeds {limit} characters")
+        return dict(pairs)
+
+    return hook
+
+
+def loads_limited(data: Union[str, bytes], max_text_length: Optional[int] = None) -> Any:
+    """
+    Decode JSON, enforcing the text field length limit during decoding.
+
+    Objects are checked as the decoder builds them, so decoding stops at
+    the first over-long field instead of producing the whole document.
+
+    Args:
+        data: JSON document
+        max_text_length: Maximum characters per text field (defaults to MAX_TEXT_LENGTH, 0 disables)
+
+    Raises:
+        json.JSONDecodeError: If the document is not valid JSON
+        RequestTooLarge: If a text field is over the limit
+    """
+    limit = settings.MAX_TEXT_LENGTH if max_text_length is None else max_text_length
+    # A string value cannot be longer than the document holding it, so
+    # documents within the limit take the fast decoder without checks
+    if limit <= 0 or len(data) <= limit:
+        return json_utils.loads(data)
+    return json.loads(data, object_pairs_hook=_check_text_fields(limit))
+
+
+async def read_json(request: Request, max_text_length: Optional[int] = None) -> Any:
+    """
+    Read a request body (bounded by BodySizeLimitMiddleware) and decode it with field limits.
+
+    Raises:
+        json.JSONDecodeError: If the body is not valid JSON
+        RequestTooLarge: If the body or a text field is over its limit
+    """
+    return loads_limited(await request.body(), max_text_length)
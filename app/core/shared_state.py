@@ -0,0 +1,215 @@
+"""Pluggable shared state for caches, counters and the connection directory.
+
+With ``uvicorn --workers N`` or several containers every worker is a separate
+process. State that must be consistent across them (rate-limit counters,
+cached health results, which worker holds a WebSocket client) goes through
+this layer instead of module-level dicts. The in-memory backend keeps the
+single-process behaviour; the Redis backend shares state between processes.
+"""
+import json
+import os
+import socket
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+
+def worker_id() -> str:
+    """Identify this worker process (evaluated per call so forked workers differ)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class SharedStateBackend(ABC):
+    """Base class for shared state backends. Values are strings."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        """Return the value for a key, or None if missing or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        """Set a value, optionally expiring after ttl seconds."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        """Delete a key."""
+
+    @abstractmethod
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        """
+        Atomically increment a counter and return the new value.
+
+        The ttl is applied only when the counter is created, so fixed windows
+        expire as a whole.
+        """
+
+    @abstractmethod
+    async def hset(self, name: str, key: str, value: str) -> None:
+        """Set a field in a hash."""
+
+    @abstractmethod
+    async def hdel(self, name: str, key: str) -> None:
+        """Delete a field from a hash."""
+
+    @abstractmethod
+    async def hget(self, name: str, key: str) -> Optional[str]:
+        """Return a field from a hash."""
+
+    @abstractmethod
+    async def hgetall(self, name: str) -> Dict[str, str]:
+        """Return all fields of a hash."""
+
+    async def close(self) -> None:
+        """Release backend resources."""
+
+    async def get_json(self, key: str) -> Any:
+        """Return a JSON-decoded value, or None."""
+        value = await self.get(key)
+        return json.loads(value) if value is not None else None
+
+    async def set_json(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """JSON-encode and store a value."""
+        await self.set(key, json.dumps(value), ttl)
+
+
+class InMemoryBackend(SharedStateBackend):
+    """Process-local backend with lazy TTL expiry (single worker deployments and tests)."""
+
+    # Expired keys are purged after this many writes
+    PURGE_EVERY = 1024
+
+    def __init__(self):
+        """Initialize empty stores."""
+        self._values: Dict[str, Tuple[str, Optional[float]]] = {}
+        self._hashes: Dict[str, Dict[str, str]] = {}
+        self._writes = 0
+
+    def _live(self, key: str) -> Optional[Tuple[str, Optional[float]]]:
+        item = self._values.get(key)
+        if item is not None and item[1] is not None and item[1] <= time.monotonic():
+            del self._values[key]
+            return None
+        return item
+
+    def _expiry(self, ttl: Optional[float]) -> Optional[float]:
+        return time.monotonic() + ttl if ttl else None
+
+    def _on_write(self):
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            now = time.monotonic()
+            for key in [k for k, (_, exp) in self._values.items() if exp is not None and exp <= now]:
+                del self._values[key]
+
+    async def get(self, key: str) -> Optional[str]:
+        item = self._live(key)
+        return item[0] if item is not None else None
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self._values[key] = (value, self._expiry(ttl))
+        self._on_write()
+
+    async def delete(self, key: str) -> None:
+        self._values.pop(key, None)
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        item = self._live(key)
+        if item is None:
+            value, expires_at = amount, self._expiry(ttl)
+        else:
+            value, expires_at = int(item[0]) + amount, item[1]
+        self._values[key] = (str(value), expires_at)
+        self._on_write()
+        return value
+
+    async def hset(self, name: str, key: str, value: str) -> None:
+        self._hashes.setdefault(name, {})[key] = value
+
+    async def hdel(self, name: str, key: str) -> None:
+        fields = self._hashes.get(name)
+        if fields is not None:
+            fields.pop(key, None)
+            if not fields:
+                del self._hashes[name]
+
+    async def hget(self, name: str, key: str) -> Optional[str]:
+        return self._hashes.get(name, {}).get(key)
+
+    async def hgetall(self, name: str) -> Dict[str, str]:
+        return dict(self._hashes.get(name, {}))
+
+
+class RedisBackend(SharedStateBackend):
+    """Redis (or Redis-protocol compatible, e.g. Valkey, KeyDB) backend."""
+
+    def __init__(self, url: str, prefix: str = "promptsafe:"):
+        """
+        Initialize the Redis client.
+
+        Args:
+            url: Redis connection URL
+            prefix: Prefix added to every key
+
+        Raises:
+            ImportError: If the redis package is not installed
+        """
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise ImportError("Redis paylaşımlı durum için 'redis' paketi gerekli: pip install redis")
+
+        self._client = redis.from_url(url, decode_responses=True)
+        self._prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self._prefix}{key}"
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._client.get(self._key(key))
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        if ttl:
+            await self._client.set(self._key(key), value, px=int(ttl * 1000))
+        else:
+            await self._client.set(self._key(key), value)
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(self._key(key))
+
+    async def incr(self, key: str, amount: int = 1, ttl: Optional[float] = None) -> int:
+        full_key = self._key(key)
+        value = await self._client.incrby(full_key, amount)
+        if ttl and value == amount:
+            await self._client.pexpire(full_key, int(ttl * 1000))
+        return value
+
+    async def hset(self, name: str, key: str, value: str) -> None:
+        await self._client.hset(self._key(name), key, value)
+
+    async def hdel(self, name: str, key: str) -> None:
+        await self._client.hdel(self._key(name), key)
+
+    async def hget(self, name: str, key: str) -> Optional[str]:
+        return await self._client.hget(self._key(name), key)
+
+    async def hgetall(self, name: str) -> Dict[str, str]:
+        return await self._client.hgetall(self._key(name))
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+def create_backend() -> SharedStateBackend:
+    """Build the backend selected by SHARED_STATE_BACKEND."""
+    backend = settings.SHARED_STATE_BACKEND.lower()
+    if backend == "memory":
+        return InMemoryBackend()
+    if backend == "redis":
+        return RedisBackend(settings.REDIS_URL, prefix=settings.SHARED_STATE_PREFIX)
+    raise ValueError(f"Unknown shared state backend: {settings.SHARED_STATE_BACKEND}")
+
+
+# Singleton instance
+shared_state = create_backend()
@@ -0,0 +1,188 @@
+"""Context-length checks and per-user token budgets.
+
+Usage is accumulated per user in memory on the request path (a dict
+update) and flushed periodically to the shared state backend, whose
+counters are shared by every worker. Budget checks read the last flushed
+cluster total plus this worker's unflushed usage, so they never wait on
+the backend.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.rate_limit import RateLimitExceeded
+from app.core.shared_state import shared_state
+
+logger = logging.getLogger(__name__)
+
+# Shared counter key prefix: tokens:<window>:<user_id>
+KEY_PREFIX = "tokens"
+
+
+class ContextLengthExceeded(Exception):
+    """Raised when a prompt plus its requested output does not fit the model's context window."""
+
+    def __init__(self, tokens: int, limit: int):
+        """
+        Initialize the error.
+
+        Args:
+            tokens: Prompt tokens plus requested output tokens
+            limit: Model context window
+        """
+        super().__init__(f"Prompt needs {tokens} tokens, model context window is {limit}")
+        self.tokens = tokens
+        self.limit = limit
+
+
+class TokenUsageAccumulator:
+    """
+    Per-user token consumption within fixed windows, with budget enforcement.
+
+    ``budget`` is the total tokens (prompt and completion) a user may use
+    per ``window`` seconds; 0 disables enforcement but usage is still
+    counted.
+    """
+
+    def __init__(self, budget: int = 0, window: float = 86400.0, flush_interval: float = 10.0):
+        """
+        Initialize the accumulator.
+
+        Args:
+            budget: Tokens per user per window (0 disables the budget)
+            window: Budget window length in seconds
+            flush_interval: Seconds between flushes to the shared state backend
+        """
+        self.budget = budget
+        self.window = window
+        self.flush_interval = flush_interval
+        self._window_id = self._current_window()
+        self._pending: Dict[str, int] = {}
+        self._totals: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.rejected = 0
+        self.flushes = 0
+        self.failed = 0
+
+    def _current_window(self, now: Optional[float] = None) -> int:
+        return int((time.time() if now is None else now) // self.window)
+
+    def _roll_window(self, now: Optional[float] = None):
+        window_id = self._current_window(now)
+        if window_id != self._window_id:
+            self._window_id = window_id
+            self._pending.clear()
+            self._totals.clear()
+
+    def used(self, user_id: str) -> int:
+        """Tokens the user has used in the current window (last flushed total plus unflushed usage)."""
+        self._roll_window()
+        return self._totals.get(user_id, 0) + self._pending.get(user_id, 0)
+
+    def check(self, user_id: Optional[str], prompt_tokens: int):
+        """
+        Reject a request whose prompt would exceed the user's remaining budget.
+
+        Args:
+            user_id: Caller user ID (requests without one are not budgeted)
+            prompt_tokens: Tokens the request will send
+
+        Raises:
+            RateLimitExceeded: If the budget is used up, with the time until the window resets
+        """
+        if not self.budget or not user_id:
+            return
+        if self.used(user_id) + prompt_tokens > self.budget:
+            self.rejected += 1
+            retry_after = (self._window_id + 1) * self.window - time.time()
+            raise RateLimitExceeded("token_budget", retry_after)
+
+    def record(self, user_id: Optional[str], prompt_tokens: int, completion_tokens: int):
+        """
+        Count a request's token usage.
+
+        Args:
+            user_id: Caller user ID
+            prompt_tokens: Input tokens
+            completion_tokens: Output tokens
+        """
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        if not user_id:
+            return
+        self._roll_window()
+        self._pending[user_id] = self._pending.get(user_id, 0) + prompt_tokens + completion_tokens
+
+    def start(self):
+        """Start the periodic flush task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush task after flushing pending usage."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Add pending usage to the shared per-user counters and refresh the local totals."""
+        self._roll_window()
+        if not self._pending:
+            return
+        window_id, pending = self._window_id, self._pending
+        self._pending = {}
+        users = list(pending)
+        results = await asyncio.gather(
+            *(
+                shared_state.incr(f"{KEY_PREFIX}:{window_id}:{user}", pending[user], ttl=self.window)
+                for user in users
+            ),
+            return_exceptions=True,
+        )
+        if window_id != self._window_id:
+            return
+        for user, result in zip(users, results):
+            if isinstance(result, Exception):
+                # Retried on the next flush
+                self._pending[user] = self._pending.get(user, 0) + pending[user]
+                self.failed += 1
+                logger.warning(f"Token usage for {user} could not be flushed: {result}")
+            else:
+                self._totals[user] = result
+        self.flushes += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Token totals, tracked users and budget rejections."""
+        return {
+            "budget": self.budget,
+            "window_seconds": self.window,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "users": len(set(self._totals) | set(self._pending)),
+            "pending_users": len(self._pending),
+            "rejected": self.rejected,
+            "flushes": self.flushes,
+            "failed": self.failed,
+        }
+
+
+# Singleton instance
+token_usage = TokenUsageAccumulator(
+    budget=settings.TOKEN_BUDGET_PER_USER,
+    window=settings.TOKEN_BUDGET_WINDOW,
+    flush_interval=settings.TOKEN_USAGE_FLUSH_INTERVAL,
+)
@@ -1,8 +1,14 @@
 """Filter manager to handle and combine all filtering strategies."""
-from typing import Dict, List, Optional, Tuple, Any
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple, Any
 
 from app.core.config import settings
+from app.filters.entropy_filters import EntropyFilter
+from app.filters.policies import DEFAULT_PROFILE, PolicyProfile
+from app.filters.prescreen import NERPrescreen
 from app.filters.regex_filters import RegexFilter
+from app.filters.spans import SpanBuffer
 # Conditional import for NER filter based on configuration
 if settings.ENABLE_NER_FILTERS:
     try:
@@ -14,24 +20,76 @@ else:
     NERFilter = None
 
 
+# Shared worker threads for CPU-bound filtering (spaCy models are shared across them)
+_filter_executor: Optional[ThreadPoolExecutor] = None
+
+# Filter jobs submitted by filter_text_async and not yet finished (queued or running)
+_filter_jobs = 0
+
+
+def get_filter_executor() -> ThreadPoolExecutor:
+    """Return the process-wide filter thread pool, creating it on first use."""
+    global _filter_executor
+    if _filter_executor is None:
+        _filter_executor = ThreadPoolExecutor(
+            max_workers=settings.FILTER_WORKER_THREADS,
+            thread_name_prefix="promptsafe-filter",
+        )
+    return _filter_executor
+
+
+def filter_queue_depth() -> int:
+    """Number of filter jobs waiting for a free worker thread."""
+    return max(0, _filter_jobs - settings.FILTER_WORKER_THREADS)
+
+
+def _resolve_flag(profile_value: Optional[bool], default: bool) -> bool:
+    """Profile overrides apply only when explicitly set."""
+    return default if profile_value is None else profile_value
+
+
 class FilterManager:
     """Manager class to handle all text filtering operations."""
     
-    def __init__(self):
-        """Initialize all available filters."""
+    def __init__(self, profile: Optional[PolicyProfile] = None):
+        """
+        Initialize all available filters.
+        
+        Args:
+            profile: Policy profile to build the filters for (defaults to the global profile)
+        """
+        self.profile = profile or DEFAULT_PROFILE
+        enable_regex = _resolve_flag(self.profile.enable_regex, settings.ENABLE_REGEX_FILTERS)
+        enable_ner = _resolve_flag(self.profile.enable_ner, settings.ENABLE_NER_FILTERS)
+        enable_entropy = _resolve_flag(self.profile.enable_entropy, settings.ENABLE_ENTROPY_FILTERS)
+        
         # Always initialize regex filters
-        self.regex_filter = RegexFilter() if settings.ENABLE_REGEX_FILTERS else None
+        self.regex_filter = RegexFilter(self.profile.pattern_groups) if enable_regex else None
+        
+        # Entropy based secret detector catches credentials the fixed patterns miss
+        self.entropy_filter = (
+            EntropyFilter(entropy_threshold=settings.ENTROPY_THRESHOLD) if enable_entropy else None
+        )
         
         # Initialize NER filter if enabled and available
         self.ner_filter = None
-        if settings.ENABLE_NER_FILTERS and NERFilter is not None:
+        if enable_ner and NERFilter is not None:
             try:
-                self.ner_filter = NERFilter()
+                self.ner_filter = NERFilter(
+                    model_name=settings.NER_MODEL,
+                    entities_to_mask=self.profile.entities_to_mask,
+                    language_models=settings.NER_LANGUAGE_MODELS,
+                )
             except ImportError:
                 # Log this error for the admin to fix
                 print("UYARI: NER filtreleri için SpaCy model yüklü değil.")
+        
+        # Cheap pre-screen that lets texts without candidate entities bypass NER
+        self.prescreen = None
+        if self.ner_filter and settings.ENABLE_NER_PRESCREEN:
+            self.prescreen = NERPrescreen(recall_target=settings.NER_PRESCREEN_RECALL)
     
-    def filter_text(self, text: str) -> Tuple[str, List[Dict[str, Any]], bool]:
+    def filter_text(self, text: str) -> Tuple[str, SpanBuffer, bool]:
         """
         Apply all available filters to the text.
         
@@ -39,31 +97,57 @@ class FilterManager:
             text: The text to filter
             
         Returns:
-            Tuple[str, List[Dict], bool]:
+            Tuple[str, SpanBuffer, bool]:
                 - Filtered text
-                - List of masked elements
+                - Masked elements (every filter appends to the same buffer)
                 - Whether sensitive content was detected
         """
+        spans = SpanBuffer()
         if not text:
-            return "", [], False
+            return "", spans, False
             
         filtered_text = text
-        all_masked_elements = []
-        has_sensitive_content = False
         
         # Apply regex filtering first
         if self.regex_filter:
-            filtered_text, masked_elements, has_regex_sensitive = self.regex_filter.filter_text(filtered_text)
-            all_masked_elements.extend(masked_elements)
-            has_sensitive_content = has_sensitive_content or has_regex_sensitive
+            filtered_text, _, _ = self.regex_filter.filter_text(filtered_text, spans)
+        
+        # Then catch remaining high-entropy secrets
+        if self.entropy_filter:
+            filtered_text, _, _ = self.entropy_filter.filter_text(filtered_text, spans)
+        
+        # Then apply NER filtering if available and the pre-screen finds candidates
+        if self.ner_filter and (self.prescreen is None or self.prescreen.needs_ner(filtered_text)):
+            filtered_text, _, _ = self.ner_filter.filter_text(filtered_text, spans)
         
-        # Then apply NER filtering if available
-        if self.ner_filter:
-            filtered_text, masked_elements, has_ner_sensitive = self.ner_filter.filter_text(filtered_text)
-            all_masked_elements.extend(masked_elements)
-            has_sensitive_content = has_sensitive_content or has_ner_sensitive
+        return filtered_text, spans, len(spans) > 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return filter statistics for this profile (NER pre-screen skip rate)."""
+        return {
+            "profile": self.profile.name,
+            "ner_prescreen": self.prescreen.stats() if self.prescreen else None,
+        }
+    
+    async def filter_text_async(self, text: str) -> Tuple[str, SpanBuffer, bool]:
+        """
+        Run filter_text on the shared filter thread pool without blocking the event loop.
         
-        return filtered_text, all_masked_elements, has_sensitive_content
+        Args:
+            text: The text to filter
+            
+        Returns:
+            Tuple[str, SpanBuffer, bool]: Same as filter_text
+        """
+        global _filter_jobs
+        if not text:
+            return "", SpanBuffer(), False
+        loop = asyncio.get_running_loop()
+        _filter_jobs += 1
+        try:
+            return await loop.run_in_executor(get_filter_executor(), self.filter_text, text)
+        finally:
+            _filter_jobs -= 1
 
 
 # Singleton instance for the application
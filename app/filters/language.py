@@ -0,0 +1,64 @@
+"""NER modelini seçmek için hafif dil tespiti."""
+import re
+from typing import Iterable
+
+# Türkçe'ye özgü harfler (ç, ö, ü diğer dillerde de geçtiği için dahil edilmez)
+TURKISH_ONLY_CHARS = frozenset("ğĞıİşŞ")
+
+TURKISH_STOPWORDS = frozenset({
+    "ve", "bir", "bu", "için", "ile", "da", "de", "ne", "mi", "mı", "çok", "daha",
+    "gibi", "olan", "olarak", "ama", "ben", "sen", "biz", "şu", "var", "yok",
+    "değil", "nasıl", "neden", "lütfen", "merhaba", "kadar", "sonra", "önce",
+    "her", "şey", "bana", "bunu", "şunu", "ise", "veya", "hangi", "nedir",
+})
+
+ENGLISH_STOPWORDS = frozenset({
+    "the", "and", "is", "are", "to", "of", "a", "an", "in", "that", "it", "for",
+    "with", "on", "this", "please", "you", "be", "was", "what", "how", "why",
+    "can", "my", "me", "from", "at", "by", "or", "not", "have", "has", "will",
+})
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Dil tespiti için incelenecek maksimum karakter sayısı
+SAMPLE_SIZE = 2000
+
+
+def detect_language(text: str, default: str = "en", languages: Iterable[str] = ("en", "tr")) -> str:
+    """
+    Metnin dilini Türkçe'ye özgü harfler ve sık kullanılan kelimelerle tahmin eder.
+
+    Tam bir dil tanıma modeli değildir; yalnızca NER modeli seçimi için
+    yeterli, mikro saniyeler mertebesinde çalışan bir sezgiseldir.
+
+    Args:
+        text: İncelenecek metin
+        default: Karar verilemezse döndürülecek dil kodu
+        languages: Dikkate alınacak dil kodları
+
+    Returns:
+        str: Dil kodu ("en", "tr" veya default)
+    """
+    sample = text[:SAMPLE_SIZE]
+    if not sample:
+        return default
+
+    languages = set(languages)
+    tr_score = 0
+    en_score = 0
+
+    if "tr" in languages:
+        # Özel harfler güçlü bir sinyaldir
+        tr_score += 2 * sum(1 for ch in sample if ch in TURKISH_ONLY_CHARS)
+
+    for word in WORD_PATTERN.findall(sample.lower()):
+        if word in TURKISH_STOPWORDS:
+            tr_score += 1
+        elif word in ENGLISH_STOPWORDS:
+            en_score += 1
+
+    if "tr" in languages and tr_score > en_score:
+        return "tr"
+    if "en" in languages and en_score > tr_score:
+        return "en"
+    return default
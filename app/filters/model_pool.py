@@ -0,0 +1,170 @@
+"""SpaCy modelleri için tembel yüklenen, bellek sınırlı ve iş parçacıkları arasında paylaşılan havuz."""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _load_spacy_model(model_name: str):
+    """SpaCy modelini yükle; model kurulu değilse ImportError fırlat."""
+    try:
+        import spacy
+
+        return spacy.load(model_name)
+    except OSError:
+        # Model henüz yüklenmemişse indirme komutu verilmeli
+        # python -m spacy download en_core_web_sm
+        raise ImportError(
+            f"SpaCy modeli '{model_name}' yüklü değil. "
+            f"Yüklemek için: python -m spacy download {model_name}"
+        )
+
+
+def _estimate_model_size(model_name: str) -> int:
+    """
+    Modelin bellek maliyetini disk üzerindeki paket boyutuyla tahmin et.
+
+    Returns:
+        int: Tahmini boyut (bayt); bulunamazsa 0
+    """
+    try:
+        import spacy
+
+        path = spacy.util.get_package_path(model_name)
+    except Exception:
+        return 0
+
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class ModelPool:
+    """
+    LRU tahliyeli SpaCy model havuzu.
+
+    Modeller ilk kullanımda yüklenir ve tüm iş parçacıkları tarafından
+    paylaşılır. Model sayısı veya tahmini toplam boyut sınırı aşıldığında
+    en uzun süredir kullanılmayan model havuzdan çıkarılır; sabitlenmiş
+    modeller (varsayılan NER modeli) hiçbir zaman çıkarılmaz, böylece
+    readiness kontrolü başka dillerin trafiğiyle bozulmaz.
+    """
+
+    def __init__(
+        self,
+        max_models: int = 2,
+        max_memory_mb: int = 0,
+        loader: Callable[[str], Any] = _load_spacy_model,
+        size_estimator: Callable[[str], int] = _estimate_model_size,
+        pinned: Iterable[str] = (),
+    ):
+        """
+        Initialize the model pool.
+
+        Args:
+            max_models: Aynı anda bellekte tutulacak maksimum model sayısı
+            max_memory_mb: Tahmini toplam boyut sınırı (0: sınırsız)
+            loader: Model adını alıp modeli yükleyen fonksiyon
+            size_estimator: Model adından tahmini boyutu (bayt) hesaplayan fonksiyon
+            pinned: Yüklendikten sonra havuzdan çıkarılmayacak modeller
+        """
+        self.max_models = max(1, max_models)
+        self.max_memory_bytes = max_memory_mb * 1024 * 1024
+        self._loader = loader
+        self._size_estimator = size_estimator
+        self.pinned = frozenset(pinned)
+        self._models: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, model_name: str):
+        """
+        Modeli havuzdan al; yoksa yükle.
+
+        Aynı model için eşzamanlı istekler tek bir yüklemeyi bekler,
+        farklı modellerin yüklenmesi birbirini engellemez.
+
+        Args:
+            model_name: SpaCy model adı
+
+        Returns:
+            Yüklenmiş SpaCy Language nesnesi
+        """
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is not None:
+                self._models.move_to_end(model_name)
+                return model
+            load_lock = self._load_locks.setdefault(model_name, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                model = self._models.get(model_name)
+                if model is not None:
+                    self._models.move_to_end(model_name)
+                    return model
+
+            model = self._loader(model_name)
+            size = self._size_estimator(model_name)
+
+            with self._lock:
+                self._models[model_name] = model
+                self._sizes[model_name] = size
+                self.loads += 1
+                self._evict()
+        return model
+
+    def is_loaded(self, model_name: str) -> bool:
+        """Model şu anda havuzda mı?"""
+        return model_name in self._models
+
+    def loaded_models(self) -> List[str]:
+        """Havuzdaki modelleri en eskiden en yeniye sırala."""
+        with self._lock:
+            return list(self._models)
+
+    def stats(self) -> Dict[str, Any]:
+        """Havuz istatistiklerini döndür."""
+        with self._lock:
+            return {
+                "models": list(self._models),
+                "estimated_bytes": sum(self._sizes.values()),
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
+
+    def _evict(self):
+        """Sınırlar aşıldıysa en uzun süredir kullanılmayan modelleri çıkar (kilit tutulurken çağrılır)."""
+        while len(self._models) > 1 and (
+            len(self._models) > self.max_models
+            or (self.max_memory_bytes and sum(self._sizes.values()) > self.max_memory_bytes)
+        ):
+            name = next((name for name in self._models if name not in self.pinned), None)
+            if name is None:
+                break
+            # Çıkarılan modeli kullanmakta olan iş parçacıkları referans tuttuğu için etkilenmez
+            del self._models[name]
+            self._sizes.pop(name, None)
+            self.evictions += 1
+            logger.info(f"SpaCy modeli havuzdan çıkarıldı: {name}")
+
+
+# Singleton instance
+model_pool = ModelPool(
+    max_models=settings.NER_MODEL_POOL_SIZE,
+    max_memory_mb=settings.NER_MODEL_POOL_MAX_MEMORY_MB,
+    pinned=(settings.NER_MODEL,),
+)
@@ -1,11 +1,18 @@
 """NER (Named Entity Recognition) based filters for sensitive data."""
-import spacy
-from typing import Dict, List, Tuple, Set, Optional
+import logging
+from typing import Dict, Iterable, Tuple, Set, Optional
+
+from app.filters.language import detect_language
+from app.filters.model_pool import ModelPool, model_pool
+from app.filters.spans import SpanBuffer
+
+logger = logging.getLogger(__name__)
 
 # SpaCy Entity türleri ve maskelemesi
 ENTITY_MASK_MAP = {
     # SpaCy'nin standart entity türleri
     "PERSON": "[KIŞI]",
+    "PER": "[KIŞI]",  # Çok dilli (xx_*) ve bazı Türkçe modellerde
     "ORG": "[ORGANIZASYON]",
     "GPE": "[LOKASYON]",  # Geopolitical entity
     "LOC": "[LOKASYON]",
@@ -23,7 +30,7 @@ ENTITY_MASK_MAP = {
 
 # Maskelenecek entity türlerinin kümesi
 ENTITIES_TO_MASK: Set[str] = {
-    "PERSON", "ORG", "GPE", "LOC", "MONEY", "DATE", 
+    "PERSON", "PER", "ORG", "GPE", "LOC", "MONEY", "DATE", 
     "EMAIL", "PHONE", "CREDIT_CARD", "SSN"
 }
 
@@ -31,84 +38,99 @@ ENTITIES_TO_MASK: Set[str] = {
 class NERFilter:
     """SpaCy tabanlı NER (Named Entity Recognition) filtreleme sınıfı."""
 
-    def __init__(self, model_name: str = "en_core_web_sm"):
+    def __init__(
+        self,
+        model_name: str = "en_core_web_sm",
+        entities_to_mask: Optional[Iterable[str]] = None,
+        language_models: Optional[Dict[str, str]] = None,
+        pool: Optional[ModelPool] = None,
+    ):
         """
         NER modelini yükle.
         
         Args:
-            model_name: Kullanılacak SpaCy model adı
+            model_name: Varsayılan SpaCy model adı (dil tespit edilemezse kullanılır)
+            entities_to_mask: Maskelenecek entity türleri (varsayılan: ENTITIES_TO_MASK)
+            language_models: Dil kodu -> SpaCy model adı eşlemesi (ör. {"tr": "tr_core_news_md"})
+            pool: Modellerin alınacağı havuz (varsayılan: paylaşılan model_pool)
         """
-        self._model = None
         self.model_name = model_name
+        self.entities_to_mask = (
+            frozenset(entities_to_mask) if entities_to_mask is not None else frozenset(ENTITIES_TO_MASK)
+        )
+        self.language_models = dict(language_models or {})
+        self.pool = pool or model_pool
+        # Kurulu olmadığı anlaşılan dil modelleri (tekrar tekrar denenmez)
+        self._missing_models: Set[str] = set()
         
     @property
     def model(self):
-        """SpaCy modelini lazy loading ile yükle."""
-        if self._model is None:
-            try:
-                self._model = spacy.load(self.model_name)
-            except OSError:
-                # Model henüz yüklenmemişse indirme komutu verilmeli
-                # python -m spacy download en_core_web_sm
-                raise ImportError(
-                    f"SpaCy modeli '{self.model_name}' yüklü değil. "
-                    f"Yüklemek için: python -m spacy download {self.model_name}"
-                )
-        return self._model
+        """Varsayılan SpaCy modelini havuzdan lazy loading ile yükle."""
+        return self.pool.get(self.model_name)
     
-    def filter_text(self, text: str) -> Tuple[str, List[Dict], bool]:
+    def model_for(self, text: str):
+        """
+        Metnin diline uygun SpaCy modelini döndür.
+        
+        Dile özgü model kurulu değilse varsayılan modele düşülür.
+        
+        Args:
+            text: İşlenecek metin
+        """
+        if not self.language_models:
+            return self.model
+        
+        language = detect_language(text, languages=self.language_models.keys())
+        model_name = self.language_models.get(language, self.model_name)
+        if model_name == self.model_name or model_name in self._missing_models:
+            return self.model
+        
+        try:
+            return self.pool.get(model_name)
+        except ImportError as e:
+            self._missing_models.add(model_name)
+            logger.warning(f"{language} dili için NER modeli yüklenemedi, varsayılan model kullanılıyor: {e}")
+            return self.model
+    
+    def filter_text(self, text: str, spans: Optional[SpanBuffer] = None) -> Tuple[str, SpanBuffer, bool]:
         """
         Metindeki varlıkları (entities) tespit eder ve maskeler.
         
         Args:
             text: İşlenecek metin
+            spans: Maskelenen öğelerin ekleneceği tampon (yoksa yenisi oluşturulur)
             
         Returns:
-            Tuple[str, List[Dict], bool]: 
+            Tuple[str, SpanBuffer, bool]: 
                 - Filtrelenmiş metin
-                - Maskelenen öğeler listesi
-                - Hassas içerik tespit edildi mi?
+                - Maskelenen öğeler
+                - Bu filtre hassas içerik tespit etti mi?
         """
+        spans = SpanBuffer() if spans is None else spans
         if not text:
-            return "", [], False
+            return "", spans, False
             
-        # SpaCy ile metni işle
-        doc = self.model(text)
-        
-        # Maskelenecek entity'leri topla ve sırala (sondan başa)
-        entities_to_mask = []
-        for ent in doc.ents:
-            if ent.label_ in ENTITIES_TO_MASK:
-                entities_to_mask.append({
-                    "text": ent.text,
-                    "type": ent.label_,
-                    "start_idx": ent.start_char,
-                    "end_idx": ent.end_char,
-                    "mask": ENTITY_MASK_MAP.get(ent.label_, f"[{ent.label_}]")
-                })
+        # SpaCy ile metni dile uygun modelle işle
+        doc = self.model_for(text)(text)
         
-        # Sondan başa doğru sırala
-        entities_to_mask.sort(key=lambda x: x["start_idx"], reverse=True)
+        # Maskelenecek entity'leri (başlangıç, bitiş, tip) olarak topla
+        entities_to_mask = [
+            (ent.start_char, ent.end_char, ent.label_)
+            for ent in doc.ents
+            if ent.label_ in self.entities_to_mask
+        ]
+        if not entities_to_mask:
+            return text, spans, False
         
-        # Metni maskele
-        filtered_text = text
-        masked_elements = []
-        
-        for entity in entities_to_mask:
-            start = entity["start_idx"]
-            end = entity["end_idx"]
-            mask = entity["mask"]
-            
-            # Maskeleme işlemini uygula
-            filtered_text = filtered_text[:start] + mask + filtered_text[end:]
-            
-            # Maskelenen içeriği kaydet
-            masked_elements.append({
-                "type": entity["type"],
-                "start_idx": start,
-                "end_idx": end,
-                "length": end - start,
-            })
+        # Sondan başa doğru maskele; parçalar tek seferde birleştirilir
+        entities_to_mask.sort(reverse=True)
+        pieces = []
+        last_start = len(text)
+        for start, end, label in entities_to_mask:
+            pieces.append(text[end:last_start])
+            pieces.append(ENTITY_MASK_MAP.get(label, f"[{label}]"))
+            last_start = start
+            spans.add(label, start, end)
+        pieces.append(text[:last_start])
         
-        has_sensitive_content = len(masked_elements) > 0
-        return filtered_text, masked_elements, has_sensitive_content 
\ No newline at end of file
+        return "".join(reversed(pieces)), spans, True 
\ No newline at end of file
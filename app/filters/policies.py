@@ -0,0 +1,84 @@
+"""Politika profilleri - departman/kiracı bazında filtreleme kuralları."""
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from app.filters.regex_filters import DEFAULT_PATTERN_GROUPS, PATTERN_GROUPS
+from app.filters.ner_filters import ENTITIES_TO_MASK
+
+
+@dataclass(frozen=True)
+class PolicyProfile:
+    """Bir filtreleme politikasını tanımlayan değişmez profil."""
+
+    name: str
+    version: int = 1
+    pattern_groups: Tuple[str, ...] = DEFAULT_PATTERN_GROUPS
+    entities_to_mask: FrozenSet[str] = field(default_factory=lambda: frozenset(ENTITIES_TO_MASK))
+    enable_regex: Optional[bool] = None
+    enable_ner: Optional[bool] = None
+    enable_entropy: Optional[bool] = None
+
+    @classmethod
+    def from_dict(cls, name: str, data: Dict[str, Any]) -> "PolicyProfile":
+        """
+        Yapılandırmadaki sözlükten profil oluştur.
+
+        Args:
+            name: Profil adı
+            data: Profil alanlarını içeren sözlük
+
+        Returns:
+            PolicyProfile: Oluşturulan profil
+
+        Raises:
+            ValueError: Desen grubu bilinmiyorsa veya liste alanı liste değilse
+                (hatalı yapılandırma ilk istekte değil açılışta fark edilir)
+        """
+        kwargs: Dict[str, Any] = {"name": name}
+        if "version" in data:
+            kwargs["version"] = int(data["version"])
+        if "pattern_groups" in data:
+            pattern_groups = _name_list(name, "pattern_groups", data["pattern_groups"])
+            unknown = sorted(set(pattern_groups) - set(PATTERN_GROUPS))
+            if unknown:
+                raise ValueError(f"Profil {name}: bilinmeyen desen grupları: {', '.join(unknown)}")
+            kwargs["pattern_groups"] = pattern_groups
+        if "entities_to_mask" in data:
+            kwargs["entities_to_mask"] = frozenset(_name_list(name, "entities_to_mask", data["entities_to_mask"]))
+        if "enable_regex" in data:
+            kwargs["enable_regex"] = bool(data["enable_regex"])
+        if "enable_ner" in data:
+            kwargs["enable_ner"] = bool(data["enable_ner"])
+        if "enable_entropy" in data:
+            kwargs["enable_entropy"] = bool(data["enable_entropy"])
+        return cls(**kwargs)
+
+
+def _name_list(profile: str, field_name: str, value: Any) -> Tuple[str, ...]:
+    """Liste alanını doğrula ("secrets" gibi tek bir metin harflerine bölünmesin)."""
+    if isinstance(value, str) or not isinstance(value, (list, tuple, set, frozenset)):
+        raise ValueError(f"Profil {profile}: {field_name} bir liste olmalı, {type(value).__name__} verildi")
+    return tuple(value)
+
+
+# Yerleşik profiller
+DEFAULT_PROFILE = PolicyProfile(name="default")
+
+BUILTIN_PROFILES: Dict[str, PolicyProfile] = {
+    "default": DEFAULT_PROFILE,
+    # Hukuk: varsayılan kümeye (ORG ve MONEY dahil) ek olarak topluluk, tesis,
+    # ürün, olay, eser ve kanun/dava adları da maskelenir
+    "legal": PolicyProfile(
+        name="legal",
+        entities_to_mask=frozenset(
+            ENTITIES_TO_MASK | {"ORG", "MONEY", "NORP", "FAC", "PRODUCT", "EVENT", "WORK_OF_ART", "LAW"}
+        ),
+    ),
+    # Mühendislik: ORG/MONEY serbest, ek gizli anahtar dedektörleri açık
+    "engineering": PolicyProfile(
+        name="engineering",
+        pattern_groups=("credentials", "api_keys", "extended_secrets", "pii", "organization"),
+        entities_to_mask=frozenset(ENTITIES_TO_MASK - {"ORG", "MONEY"}),
+        enable_entropy=True,
+    ),
+}
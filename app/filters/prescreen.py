@@ -0,0 +1,118 @@
+"""NER öncesi hızlı ön eleme: aday varlık içermeyen metinlerde SpaCy'yi atla."""
+import re
+import threading
+from typing import Dict
+
+from app.filters.language import ENGLISH_STOPWORDS, TURKISH_STOPWORDS
+
+UPPER = "A-ZÇĞİÖŞÜ"
+
+# Güçlü sinyaller: NER varlığına işaret eden ucuz kalıplar
+DIGIT_PATTERN = re.compile(r"\d")
+CURRENCY_PATTERN = re.compile(r"(?i)[$€£₺¥]|\b(?:dollars?|euros?|lira|usd|eur)\b")
+DATE_WORD_PATTERN = re.compile(
+    r"(?i)\b(?:today|tomorrow|yesterday|tonight|bugün|yarın|dün|"
+    r"january|february|march|april|june|july|august|september|october|november|december|"
+    r"ocak|şubat|mart|nisan|mayıs|haziran|temmuz|ağustos|eylül|ekim|kasım|aralık|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday|"
+    r"pazartesi|salı|çarşamba|perşembe|cuma|cumartesi|pazar)\b"
+)
+# Cümle ortasında büyük harfle başlayan kelime (özel isim adayı)
+MID_SENTENCE_CAPITAL_PATTERN = re.compile(rf"[^\s.!?:;\n]\s+[{UPPER}]\w")
+# Tamamı büyük harf kısaltmalar (maskeler hariç: [EMAIL], [KIŞI] ...)
+ACRONYM_PATTERN = re.compile(rf"(?<!\[)\b[{UPPER}]{{2,}}\b(?!\])")
+
+# Zayıf sinyal: cümle başında, sıradan bir kelime olmayan büyük harfli kelime
+SENTENCE_START_PATTERN = re.compile(rf"(?:^|[.!?:;\n]\s*)([{UPPER}]\w+)")
+COMMON_SENTENCE_STARTERS = ENGLISH_STOPWORDS | TURKISH_STOPWORDS | frozenset({
+    "fix", "summarize", "summarise", "write", "explain", "make", "add", "create",
+    "remove", "refactor", "translate", "update", "review", "check", "find", "list",
+    "show", "give", "tell", "help", "could", "would", "should", "do",
+    "does", "why", "where", "when", "which", "who", "i", "we", "they", "it", "there",
+    "özetle", "düzelt", "yaz", "açıkla", "çevir", "ekle", "kaldır", "oluştur",
+    "bul", "listele", "göster", "kontrol", "yardım", "bunu", "şunu",
+})
+
+STRONG_SIGNAL_PATTERNS = (
+    DIGIT_PATTERN,
+    MID_SENTENCE_CAPITAL_PATTERN,
+    ACRONYM_PATTERN,
+    CURRENCY_PATTERN,
+    DATE_WORD_PATTERN,
+)
+
+
+class NERPrescreen:
+    """
+    Metnin NER'e ihtiyaç duyup duymadığına karar veren sezgisel ön eleme.
+
+    Rakam, para birimi, tarih kelimeleri, cümle ortasında büyük harfle başlayan
+    kelimeler ve kısaltmalar güçlü sinyaldir; cümle başındaki sıradan olmayan
+    büyük harfli kelimeler zayıf sinyaldir. Hedef duyarlılık (recall) ne kadar
+    yüksekse NER o kadar az sinyalle çalıştırılır:
+
+    - recall_target >= 0.99: herhangi bir sinyal NER'i tetikler
+    - recall_target >= 0.95: yalnızca güçlü sinyaller NER'i tetikler
+    - daha düşük: en az iki güçlü sinyal gerekir
+    """
+
+    def __init__(self, recall_target: float = 0.99):
+        """
+        Initialize the prescreen.
+
+        Args:
+            recall_target: Hedef NER duyarlılığı (0.0-1.0)
+        """
+        self.recall_target = recall_target
+        if recall_target >= 0.99:
+            self.threshold = 0.5
+        elif recall_target >= 0.95:
+            self.threshold = 1.0
+        else:
+            self.threshold = 2.0
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.skipped = 0
+
+    def _score(self, text: str) -> float:
+        """Sinyalleri eşik aşılana kadar topla (erken çıkışlı)."""
+        score = 0.0
+        for pattern in STRONG_SIGNAL_PATTERNS:
+            if pattern.search(text) is not None:
+                score += 1.0
+                if score >= self.threshold:
+                    return score
+
+        for match in SENTENCE_START_PATTERN.finditer(text):
+            if match.group(1).lower() not in COMMON_SENTENCE_STARTERS:
+                score += 0.5
+                if score >= self.threshold:
+                    return score
+        return score
+
+    def needs_ner(self, text: str) -> bool:
+        """
+        Metin NER ile işlenmeli mi?
+
+        Args:
+            text: Regex/entropi filtrelerinden geçmiş metin
+
+        Returns:
+            bool: NER çalıştırılmalıysa True
+        """
+        needed = self._score(text) >= self.threshold
+        with self._lock:
+            self.checked += 1
+            if not needed:
+                self.skipped += 1
+        return needed
+
+    def stats(self) -> Dict[str, float]:
+        """Atlama oranı metriklerini döndür."""
+        with self._lock:
+            return {
+                "recall_target": self.recall_target,
+                "checked": self.checked,
+                "skipped": self.skipped,
+                "skip_rate": self.skipped / self.checked if self.checked else 0.0,
+            }
@@ -1,7 +1,33 @@
 """Regex pattern based filters for sensitive data."""
 import re
-from typing import Dict, List, Tuple, Pattern
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Pattern
 
+from app.filters.spans import SpanBuffer
+from app.filters.validators import is_valid_iban, is_valid_luhn, is_valid_tc_kimlik
+
+# Eşleşme sonrası doğrulayıcı: eşleşen metni alır, gerçekten hassas ise True döner
+Validator = Callable[[str], bool]
+
+
+# Yapısal kimlik bilgileri (diğer desenlerden önce çalışır; ör. e-posta deseni
+# veritabanı URL'sindeki "parola@host" kısmını parçalamasın)
+CREDENTIAL_PATTERNS = [
+    # PEM özel anahtar blokları
+    (r'-----BEGIN (?:[A-Z]+ )?PRIVATE KEY-----[\s\S]*?-----END (?:[A-Z]+ )?PRIVATE KEY-----', "[PRIVATE_KEY]"),
+    
+    # JSON Web Token'ları
+    (r'\beyJ[A-Za-z0-9_\-]{8,}\.eyJ[A-Za-z0-9_\-]{8,}\.[A-Za-z0-9_\-]{8,}', "[JWT]"),
+    
+    # Parola içeren veritabanı bağlantı URL'leri
+    (r'\b(?:postgres(?:ql)?|mysql|mariadb|mssql|mongodb(?:\+srv)?|redis|rediss|amqps?)://[^\s:/@]+:[^\s@/]+@[^\s/]+', "[DATABASE_URL]"),
+    
+    # Azure depolama / servis veri yolu anahtarları
+    (r'(?:AccountKey|SharedAccessKey)=[A-Za-z0-9+/]{40,}={0,2}', "[AZURE_KEY]"),
+    
+    # Stripe anahtarları (canlı ve test)
+    (r'\b(?:sk|rk)_(?:live|test)_[0-9a-zA-Z]{24,}', "[STRIPE_KEY]"),
+]
 
 # API Anahtarları ve gizli bilgiler
 API_KEY_PATTERNS = [
@@ -26,18 +52,24 @@ API_KEY_PATTERNS = [
 ]
 
 # Kişisel tanımlayıcı bilgiler
+# Üçüncü eleman (varsa) eşleşmeyi maskelemeden önce çalışan sağlama doğrulayıcısıdır.
+# Rakam dizisi desenleri telefon deseninden önce gelir; aksi halde geçerli numaralar
+# telefon olarak parçalanır.
 PII_PATTERNS = [
     # E-posta adresleri
     (r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', "[EMAIL]"),
     
-    # Telefon numaraları (farklı formatlar)
-    (r'(?:\+\d{1,2}\s?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}', "[PHONE_NUMBER]"),
+    # Türk IBAN numaraları (mod-97 doğrulamalı)
+    (r'\bTR\d{2}[ ]?(?:\d{4}[ ]?){5}\d{2}\b', "[IBAN]", is_valid_iban),
     
-    # Kredi kartı numaraları
-    (r'(?:\d{4}[- ]?){3}\d{4}', "[CREDIT_CARD]"),
+    # Kredi kartı numaraları (Luhn doğrulamalı)
+    (r'\b(?:\d{4}[- ]?){3}\d{4}\b', "[CREDIT_CARD]", is_valid_luhn),
     
-    # Sosyal güvenlik numaraları (Türkiye için TC kimlik no)
-    (r'\d{11}', "[TC_KIMLIK_NO]"),
+    # Sosyal güvenlik numaraları (Türkiye için TC kimlik no, sağlama doğrulamalı)
+    (r'\b[1-9]\d{10}\b', "[TC_KIMLIK_NO]", is_valid_tc_kimlik),
+    
+    # Telefon numaraları (farklı formatlar); daha uzun rakam dizilerinin parçalarını yakalamaz
+    (r'(?<![\d+])(?:\+\d{1,2}\s?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}(?!\d)', "[PHONE_NUMBER]"),
     
     # IP adresleri
     (r'\b(?:\d{1,3}\.){3}\d{1,3}\b', "[IP_ADDRESS]"),
@@ -58,62 +90,110 @@ ORGANIZATION_PATTERNS = [
     (r'(?:[\w-]+\.)*internal\.example\.com', "[İÇ_DOMAIN]"),
 ]
 
+# Ek gizli bilgi desenleri (mühendislik gibi profiller için)
+EXTENDED_SECRET_PATTERNS = [
+    # Anthropic API anahtarları
+    (r'sk-ant-[A-Za-z0-9_\-]{32,}', "[ANTHROPIC_API_KEY]"),
+    
+    # GitLab kişisel erişim tokenları
+    (r'glpat-[0-9a-zA-Z_\-]{20}', "[GITLAB_TOKEN]"),
+    
+    # Slack webhook URL'leri
+    (r'https://hooks\.slack\.com/services/[A-Za-z0-9/]+', "[SLACK_WEBHOOK]"),
+]
+
 # Tüm desenleri birleştir
-ALL_PATTERNS = API_KEY_PATTERNS + PII_PATTERNS + ORGANIZATION_PATTERNS
+ALL_PATTERNS = CREDENTIAL_PATTERNS + API_KEY_PATTERNS + PII_PATTERNS + ORGANIZATION_PATTERNS
+
+# Politika profillerinin seçebileceği desen grupları
+PATTERN_GROUPS: Dict[str, List[tuple]] = {
+    "credentials": CREDENTIAL_PATTERNS,
+    "api_keys": API_KEY_PATTERNS,
+    "extended_secrets": EXTENDED_SECRET_PATTERNS,
+    "pii": PII_PATTERNS,
+    "organization": ORGANIZATION_PATTERNS,
+}
+
+# Varsayılan desen grupları (ALL_PATTERNS ile aynı sırada)
+DEFAULT_PATTERN_GROUPS: Tuple[str, ...] = ("credentials", "api_keys", "pii", "organization")
 
 
-def compile_patterns(patterns: List[Tuple[str, str]]) -> List[Tuple[Pattern, str]]:
-    """Regex desenlerini derle."""
-    return [(re.compile(pattern), replacement) for pattern, replacement in patterns]
+def compile_patterns(patterns: List[tuple]) -> List[Tuple[Pattern, str, Optional[Validator]]]:
+    """Regex desenlerini derle; doğrulayıcısı olmayan desenler için None kullanılır."""
+    return [
+        (re.compile(pattern), replacement, rest[0] if rest else None)
+        for pattern, replacement, *rest in patterns
+    ]
+
+
+@lru_cache(maxsize=None)
+def get_compiled_patterns(pattern_groups: Tuple[str, ...]) -> Tuple[Tuple[Pattern, str, Optional[Validator]], ...]:
+    """
+    Desen gruplarını bir kez derleyip önbellekte tutar.
+    
+    Aynı grup kombinasyonunu kullanan tüm filtreler derlenmiş desenleri paylaşır.
+    
+    Args:
+        pattern_groups: PATTERN_GROUPS içindeki grup adları
+        
+    Returns:
+        Tuple[Tuple[Pattern, str], ...]: Derlenmiş desenler
+    """
+    patterns: List[Tuple[str, str]] = []
+    for group in pattern_groups:
+        if group not in PATTERN_GROUPS:
+            raise ValueError(f"Bilinmeyen desen grubu: {group}")
+        patterns.extend(PATTERN_GROUPS[group])
+    return tuple(compile_patterns(patterns))
 
 
 class RegexFilter:
     """Regex tabanlı hassas veri filtreleme sınıfı."""
 
-    def __init__(self):
-        """Regex desenlerini derle."""
-        self.compiled_patterns = compile_patterns(ALL_PATTERNS)
+    def __init__(self, pattern_groups: Optional[Sequence[str]] = None):
+        """
+        Regex desenlerini derle.
+        
+        Args:
+            pattern_groups: Kullanılacak desen grupları (varsayılan: DEFAULT_PATTERN_GROUPS)
+        """
+        self.pattern_groups = tuple(pattern_groups or DEFAULT_PATTERN_GROUPS)
+        self.compiled_patterns = get_compiled_patterns(self.pattern_groups)
     
-    def filter_text(self, text: str) -> Tuple[str, List[Dict], bool]:
+    def filter_text(self, text: str, spans: Optional[SpanBuffer] = None) -> Tuple[str, SpanBuffer, bool]:
         """
         Metindeki hassas verileri maskeler.
         
         Args:
             text: İşlenecek metin
+            spans: Maskelenen öğelerin ekleneceği tampon (yoksa yenisi oluşturulur)
             
         Returns:
-            Tuple[str, List[Dict], bool]: 
+            Tuple[str, SpanBuffer, bool]: 
                 - Filtrelenmiş metin
-                - Maskelenen öğeler listesi
-                - Hassas içerik tespit edildi mi?
+                - Maskelenen öğeler
+                - Bu filtre hassas içerik tespit etti mi?
         """
+        spans = SpanBuffer() if spans is None else spans
         if not text:
-            return "", [], False
+            return "", spans, False
             
         filtered_text = text
-        masked_elements = []
-        has_sensitive_content = False
+        found_before = len(spans)
         
-        for pattern, replacement in self.compiled_patterns:
-            matches = pattern.finditer(filtered_text)
+        for pattern, replacement, validator in self.compiled_patterns:
+            mask_type = replacement.strip("[]")
             
-            # Son eşleşmeden başlayarak geriye doğru değiştir (pozisyonları bozmamak için)
-            matches_list = list(matches)
-            
-            for match in reversed(matches_list):
-                start, end = match.span()
-                matched_text = match.group()
+            def _mask(match, replacement=replacement, validator=validator, mask_type=mask_type):
+                # Sağlama kontrolünden geçemeyen eşleşmeler olduğu gibi bırakılır
+                if validator is not None and not validator(match.group()):
+                    return match.group()
                 
-                # Orijinal metinle eşleşen içeriği kaydet
-                masked_elements.append({
-                    "type": replacement.strip("[]"),
-                    "start_idx": start,
-                    "end_idx": end,
-                    "length": end - start,
-                })
-                
-                # Metni maskele
-                filtered_text = filtered_text[:start] + replacement + filtered_text[end:]
-                has_sensitive_content = True
+                start, end = match.span()
+                spans.add(mask_type, start, end)
+                return replacement
+            
+            # Desen başına tek geçişte maskele (her eşleşme için metni yeniden kurmadan)
+            filtered_text = pattern.sub(_mask, filtered_text)
         
-        return filtered_text, masked_elements, has_sensitive_content 
\ No newline at end of file
+        return filtered_text, spans, len(spans) > found_before
@@ -0,0 +1,64 @@
+"""Maskelenen öğeler için dizi tabanlı, kompakt span tamponu."""
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+class SpanBuffer:
+    """
+    Maskelenen öğelerin (tip, başlangıç, bitiş) listesi.
+
+    Her eşleşme için ayrı bir sözlük oluşturmak yerine konumlar iki tamsayı
+    dizisinde, tipler (paylaşılan) dizgi listesinde tutulur. Sözlüklere
+    yalnızca API yanıtı oluşturulurken (to_dicts) dönüştürülür.
+    """
+
+    __slots__ = ("types", "starts", "ends")
+
+    def __init__(self):
+        """Boş tampon oluştur."""
+        self.types: List[str] = []
+        self.starts = array("q")
+        self.ends = array("q")
+
+    def add(self, span_type: str, start: int, end: int):
+        """
+        Maskelenen bir öğe ekle.
+
+        Args:
+            span_type: Öğe tipi (EMAIL, PERSON, ...)
+            start: Başlangıç konumu
+            end: Bitiş konumu
+        """
+        self.types.append(span_type)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def extend(self, other: "SpanBuffer"):
+        """Başka bir tamponun öğelerini sona ekle."""
+        self.types.extend(other.types)
+        self.starts.extend(other.starts)
+        self.ends.extend(other.ends)
+
+    def shift(self, offset: int):
+        """Tüm konumları kaydır (akışta parçaları tam metne göre konumlamak için)."""
+        if offset:
+            self.starts = array("q", [start + offset for start in self.starts])
+            self.ends = array("q", [end + offset for end in self.ends])
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __iter__(self) -> Iterator[Tuple[str, int, int]]:
+        return zip(self.types, self.starts, self.ends)
+
+    def type_counts(self) -> Dict[str, int]:
+        """Tip başına öğe sayısı."""
+        return dict(Counter(self.types))
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """API yanıtındaki biçim: type, start_idx, end_idx ve length alanlı sözlükler."""
+        return [
+            {"type": span_type, "start_idx": start, "end_idx": end, "length": end - start}
+            for span_type, start, end in self
+        ]
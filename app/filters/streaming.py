@@ -0,0 +1,97 @@
+"""Akış halinde gelen LLM çıktısını güvenli sınırlardan bölen yardımcı."""
+import re
+from typing import Optional
+
+from app.filters.entropy_filters import KEYWORD_PATTERN, KEYWORD_WINDOW
+
+# Cümle/satır sonu: bu noktalardan bölmek bir varlığı ikiye ayırmaz
+BOUNDARY_PATTERN = re.compile(r"[.!?]\s|\n")
+
+# Kapanmamış çok satırlı yapılar (ör. PEM blokları) tamamlanana kadar bekletilir
+OPEN_BLOCK_PATTERN = re.compile(r"-----BEGIN [A-Z ]*-----")
+CLOSE_BLOCK_PATTERN = re.compile(r"-----END [A-Z ]*-----")
+
+
+class StreamSegmenter:
+    """
+    Akış parçalarını biriktirip filtrelenmeye hazır bölümler halinde verir.
+
+    Maskeleme parça sınırlarında da doğru kalsın diye metin yalnızca
+    cümle veya satır sonlarından bölünür; böylece bir e-posta, kart numarası
+    ya da isim iki parçaya ayrılmaz. Son ``KEYWORD_WINDOW`` karakterinde
+    gizli bilgi anahtar kelimesi (ör. "API token:") bulunan bir sınırdan
+    bölünmez: entropi filtresi sonraki satırdaki değeri bu bağlamla tanır.
+    Uzun süre sınır gelmezse tampon, sondaki ``holdback`` karakter
+    bekletilerek son boşluktan, boşluk yoksa doğrudan bekletme penceresinin
+    başından bölünür.
+    """
+
+    def __init__(self, holdback: int = 64, max_buffer: int = 2048, max_block: int = 16384):
+        """
+        Initialize the segmenter.
+
+        Args:
+            holdback: Zorunlu bölmede sonda bekletilecek minimum karakter sayısı
+            max_buffer: Sınır bulunamazsa zorunlu bölmeden önceki maksimum tampon boyutu
+            max_block: Kapanmamış bir blok (ör. PEM) varken zorunlu bölmeden önceki maksimum tampon boyutu
+        """
+        self.holdback = holdback
+        self.max_buffer = max_buffer
+        self.max_block = max(max_block, max_buffer)
+        self._buffer = ""
+
+    def push(self, chunk: str) -> Optional[str]:
+        """
+        Yeni parçayı ekle ve güvenle filtrelenebilecek bölümü döndür.
+
+        Args:
+            chunk: LLM'den gelen metin parçası
+
+        Returns:
+            Optional[str]: Filtrelenmeye hazır (henüz maskelenmemiş) bölüm veya None
+        """
+        self._buffer += chunk
+        cut = self._find_cut()
+        if cut <= 0:
+            return None
+
+        segment, self._buffer = self._buffer[:cut], self._buffer[cut:]
+        return segment
+
+    def flush(self) -> str:
+        """Akış bittiğinde kalan tamponu döndür."""
+        segment, self._buffer = self._buffer, ""
+        return segment
+
+    def _find_cut(self) -> int:
+        """Tampondaki son güvenli bölme noktasını bul (yoksa 0)."""
+        buffer = self._buffer
+        limit = len(buffer)
+
+        # Kapanmamış bir blok varsa yalnızca bloğun başından önce bölünebilir
+        last_open = None
+        for last_open in OPEN_BLOCK_PATTERN.finditer(buffer):
+            pass
+        if last_open is not None and CLOSE_BLOCK_PATTERN.search(buffer, last_open.end()) is None:
+            limit = last_open.start()
+
+        cut = 0
+        for match in BOUNDARY_PATTERN.finditer(buffer, 0, limit):
+            if not self._keyword_before(buffer, match.end()):
+                cut = match.end()
+        if cut:
+            return cut
+
+        # Kapanmayan blok (ör. yarım kalmış PEM başlığı) tamponu sınırsız büyütmesin
+        max_size = self.max_buffer if limit == len(buffer) else self.max_block
+        if len(buffer) > max_size:
+            # Sınır yok: sondaki bekletme penceresinden önceki son boşluktan böl;
+            # boşluk da yoksa (base64, sıkıştırılmış kod, CJK metin) pencerenin başından kes
+            hard_cut = len(buffer) - self.holdback
+            return buffer.rfind(" ", 0, hard_cut) + 1 or hard_cut
+        return 0
+
+    @staticmethod
+    def _keyword_before(buffer: str, position: int) -> bool:
+        """Bölme noktasından önceki entropi bağlam penceresinde anahtar kelime var mı?"""
+        return KEYWORD_PATTERN.search(buffer, max(0, position - KEYWORD_WINDOW), position) is not None
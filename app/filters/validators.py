@@ -0,0 +1,85 @@
+"""Regex eşleşmeleri için ucuz sağlama (checksum) doğrulayıcıları."""
+
+
+def _digits(text: str) -> str:
+    """Metindeki rakamları ayıkla (boşluk ve tireleri at)."""
+    return "".join(ch for ch in text if "0" <= ch <= "9")
+
+
+def is_valid_tc_kimlik(text: str) -> bool:
+    """
+    TC Kimlik numarası sağlama algoritmasını uygular.
+
+    Kurallar: 11 hane, ilk hane 0 olamaz,
+    10. hane = ((1+3+5+7+9. haneler) * 7 - (2+4+6+8. haneler)) mod 10,
+    11. hane = (ilk 10 hanenin toplamı) mod 10.
+
+    Args:
+        text: Eşleşen metin
+
+    Returns:
+        bool: Geçerli bir TC Kimlik numarası ise True
+    """
+    digits = _digits(text)
+    if len(digits) != 11 or digits[0] == "0":
+        return False
+
+    d = [int(ch) for ch in digits]
+    odd_sum = d[0] + d[2] + d[4] + d[6] + d[8]
+    even_sum = d[1] + d[3] + d[5] + d[7]
+    if (odd_sum * 7 - even_sum) % 10 != d[9]:
+        return False
+    return sum(d[:10]) % 10 == d[10]
+
+
+def is_valid_luhn(text: str) -> bool:
+    """
+    Kredi kartı numaraları için Luhn (mod 10) kontrolü.
+
+    Args:
+        text: Eşleşen metin
+
+    Returns:
+        bool: Luhn kontrolünden geçiyorsa True
+    """
+    digits = _digits(text)
+    if not 13 <= len(digits) <= 19:
+        return False
+
+    total = 0
+    for index, ch in enumerate(reversed(digits)):
+        value = ord(ch) - 48
+        if index % 2 == 1:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+    return total % 10 == 0
+
+
+def is_valid_iban(text: str) -> bool:
+    """
+    IBAN mod-97 kontrolü (ISO 13616).
+
+    Args:
+        text: Eşleşen metin
+
+    Returns:
+        bool: Geçerli bir IBAN ise True
+    """
+    iban = "".join(text.split()).upper()
+    if len(iban) < 15 or not iban[:2].isalpha() or not iban[2:4].isdigit():
+        return False
+
+    # İlk dört karakteri sona taşı, harfleri sayıya çevir (A=10 ... Z=35)
+    rearranged = iban[4:] + iban[:4]
+    remainder = 0
+    for ch in rearranged:
+        if "0" <= ch <= "9":
+            remainder = (remainder * 10 + ord(ch) - 48) % 97
+        elif "A" <= ch <= "Z":
+            remainder = (remainder * 100 + ord(ch) - 55) % 97
+        else:
+            return False
+    return remainder == 1
+
@@ -1,18 +1,22 @@
 """Main application module for PromptSafe."""
-import time
 import uuid
-from typing import Callable
 
-from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from loguru import logger
 
 from app import __version__
 from app.api.endpoints import router as api_router
 from app.core.config import settings
+from app.core.lifespan import lifespan
+from app.core.log import RequestLoggingMiddleware, SuccessSampler, configure_logging
+from app.core.request_limits import BodySizeLimitMiddleware
 from app.proxy.browser_extension import browser_extension_manager
+from app.utils.json_utils import FastJSONResponse
 
 
+# Tüm modüllerin logları tek, yapılandırılmış ve kuyruklu loguru çıkışına gider
+configure_logging()
+
 # FastAPI uygulaması oluştur
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -20,6 +24,16 @@ app = FastAPI(
     version=__version__,
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
+    # Kaynaklar açılışta ısıtılır, kapanışta boşaltılıp kapatılır
+    lifespan=lifespan,
+)
+
+# Gövde boyutu sınırı (en içteki middleware; 413 yanıtları da loglanır)
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    default_limit=settings.MAX_REQUEST_BODY_BYTES,
+    route_limits=settings.MAX_REQUEST_BODY_BYTES_ROUTES,
 )
 
 # CORS middleware ekle
@@ -32,32 +46,12 @@ app.add_middleware(
 )
 
 
-# Loglama middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next: Callable) -> Response:
-    """Log requests and responses."""
-    start_time = time.time()
-    
-    # İstek bilgileri
-    request_id = f"{int(start_time * 1000)}"
-    logger.info(
-        f"Request [{request_id}]: {request.method} {request.url.path}"
-    )
-    
-    # İsteği işle
-    response = await call_next(request)
-    
-    # İşlem süresi
-    process_time = (time.time() - start_time) * 1000
-    logger.info(
-        f"Response [{request_id}]: status={response.status_code}, " 
-        f"time={process_time:.2f}ms"
-    )
-    
-    # İşlem süresini yanıt başlıklarına ekle
-    response.headers["X-Process-Time"] = f"{process_time:.2f}ms"
-    
-    return response
+# Loglama middleware (en dıştaki; sınır ve CORS yanıtları da istek kimliğiyle loglanır)
+app.add_middleware(
+    RequestLoggingMiddleware,
+    sampler=SuccessSampler(settings.LOG_SAMPLE_THRESHOLD_RPS, settings.LOG_SUCCESS_SAMPLE_RATE),
+    slow_ms=settings.LOG_SLOW_REQUEST_MS,
+)
 
 
 # API rotalarını ekle
@@ -88,8 +82,9 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
     if not client_id or client_id == "undefined":
         client_id = str(uuid.uuid4())
     
-    # Bağlantıyı kabul et
-    await browser_extension_manager.connect(websocket, client_id)
+    # Bağlantıyı kabul et (kapasite doluysa reddedilir)
+    if await browser_extension_manager.connect(websocket, client_id) is None:
+        return
     
     try:
         # Mesajları işle
@@ -0,0 +1,160 @@
+"""
+Prefork server for PromptSafe.
+
+Filter engines, compiled patterns and spaCy models are loaded once in the
+master process, the heap is frozen and workers are forked from it. Workers
+share those pages copy-on-write instead of each loading its own copy, as
+``uvicorn --workers`` does (its workers are spawned, not forked).
+
+Usage:
+    python -m app.prefork --workers 4 --port 8000
+
+POSIX only (requires os.fork).
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, Optional
+
+from loguru import logger
+
+from app.server import DrainingServer, build_config
+
+# Bu süreden önce ölen worker hemen yeniden başlatılmaz (çökme döngüsüne karşı)
+MIN_WORKER_LIFETIME = 1.0
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Bind the listening socket shared by all workers."""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class PreforkSupervisor:
+    """Forks workers from the preloaded master and restarts the ones that die."""
+
+    def __init__(
+        self,
+        app,
+        sock: socket.socket,
+        workers: int,
+        log_level: str = "info",
+        graceful_timeout: Optional[float] = None,
+    ):
+        """
+        Initialize the supervisor.
+
+        Args:
+            app: Preloaded ASGI application
+            sock: Bound listening socket
+            workers: Number of worker processes
+            log_level: Uvicorn log level
+            graceful_timeout: Seconds a worker waits for open requests on shutdown
+        """
+        self.app = app
+        self.sock = sock
+        self.workers = max(1, workers)
+        self.log_level = log_level
+        self.graceful_timeout = graceful_timeout
+        self.children: Dict[int, float] = {}
+        self.stopping = False
+
+    def spawn(self):
+        """Fork one worker."""
+        pid = os.fork()
+        if pid == 0:
+            # Worker: master'ın sinyal işleyicilerini bırak, uvicorn kendi işleyicilerini kurar
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                # SIGTERM'de önce devam eden prompt'lar boşaltılır, sonra soketler kapanır
+                config = build_config(self.app, self.graceful_timeout, log_level=self.log_level)
+                DrainingServer(config).run(sockets=[self.sock])
+            except BaseException:
+                logger.exception("Worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        logger.info(f"Worker started: pid={pid}")
+
+    def stop(self, signum=None, frame=None):
+        """Ask every worker to shut down gracefully."""
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:
+        """Start the workers and supervise them until shutdown."""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+
+            logger.warning(f"Worker exited: pid={pid}, status={status}")
+            if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME)
+            if not self.stopping:
+                self.spawn()
+        return 0
+
+
+def main(argv=None) -> int:
+    """Preload the application, freeze the heap and run the forked workers."""
+    parser = argparse.ArgumentParser(description="PromptSafe prefork server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", 2)))
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, "fork"):
+        logger.error("Prefork mode requires os.fork; use uvicorn instead")
+        return 1
+
+    # Uygulamayı ve filtre motorlarını master süreçte yükle
+    import asyncio
+
+    from app.core.config import settings
+    from app.core.preload import freeze_heap, warm_up
+    from app.main import app
+
+    summary = asyncio.run(warm_up())
+    logger.info(
+        f"Preloaded profiles={summary['profiles']} models={summary['models']} "
+        f"providers={summary['providers']} in {summary['seconds']}s"
+    )
+    # Master'da yüklendi; worker'lar tekrar ısınma yapmasın
+    settings.STARTUP_WARM_UP = False
+
+    sock = bind_socket(args.host, args.port)
+    logger.info(f"Frozen {freeze_heap()} objects; forking {args.workers} workers on {args.host}:{args.port}")
+    return PreforkSupervisor(
+        app, sock, args.workers, args.log_level, graceful_timeout=settings.SHUTDOWN_DRAIN_TIMEOUT
+    ).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,114 +1,411 @@
 """Tarayıcı eklentisi için yardımcı sınıf ve fonksiyonlar."""
+import asyncio
 import json
 import logging
-from typing import Dict, Any, Optional
+import time
+import uuid
+from typing import Dict, Any, List, Optional
 
 from fastapi import WebSocket, WebSocketDisconnect
+from app.core.config import settings
+from app.core.inflight import inflight
+from app.core.rate_limit import RateLimitExceeded, admission_controller, request_rate_limiter, user_limit_key
+from app.core.request_limits import RequestTooLarge, loads_limited
+from app.core.shared_state import shared_state, worker_id
+from app.proxy.connection_registry import CLOSE_TRY_AGAIN_LATER, ConnectionRegistry, ConnectionState
 from app.proxy.mcp_handler import mcp_handler
 
 logger = logging.getLogger(__name__)
 
+# Paylaşımlı durumda client_id -> {"worker", "expires"} eşlemesini tutan hash
+CONNECTION_DIRECTORY = "ws:connections"
+
+
+def directory_entry(owner: str, ttl: float) -> str:
+    """Bağlantı dizini kaydı: sahibi olan worker ve son geçerlilik zamanı (Unix saniyesi)."""
+    return json.dumps({"worker": owner, "expires": time.time() + ttl})
+
+
+def entry_owner(value: Optional[str]) -> Optional[str]:
+    """Kaydın sahibi olan worker; kayıt yoksa veya süresi dolduysa (çökmüş worker) None."""
+    if value is None:
+        return None
+    try:
+        entry = json.loads(value)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(entry, dict) or entry.get("expires", 0) < time.time():
+        return None
+    return entry.get("worker")
+
 
 class BrowserExtensionManager:
     """Tarayıcı eklentisi bağlantılarını yöneten sınıf."""
     
     def __init__(self):
         """Initialize browser extension manager."""
-        self.active_connections: Dict[str, WebSocket] = {}
+        self.registry = ConnectionRegistry(
+            max_connections=settings.WS_MAX_CONNECTIONS,
+            heartbeat_interval=settings.WS_HEARTBEAT_INTERVAL,
+            idle_timeout=settings.WS_IDLE_TIMEOUT,
+            on_heartbeat=self._refresh_directory,
+        )
+        # Dizin kayıtları bu süre içinde tazelenmezse (worker çöktüyse) geçersiz sayılır
+        self.directory_ttl = max(settings.WS_DIRECTORY_TTL, 2 * settings.WS_HEARTBEAT_INTERVAL)
+        # Çalışan arka plan görevleri (çöp toplayıcı tarafından silinmesinler)
+        self._background_tasks = set()
+    
+    @property
+    def active_connections(self) -> Dict[str, WebSocket]:
+        """Aktif bağlantılar (client_id -> WebSocket)."""
+        return {client_id: state.websocket for client_id, state in self.registry.items()}
     
-    async def connect(self, websocket: WebSocket, client_id: str):
+    async def connect(self, websocket: WebSocket, client_id: str) -> Optional[ConnectionState]:
         """
         Yeni bir WebSocket bağlantısı kabul et.
         
+        Worker bağlantı sınırına ulaştıysa bağlantı "try again later"
+        koduyla kapatılır (load shedding).
+        
         Args:
             websocket: WebSocket bağlantısı
             client_id: İstemci tanımlayıcısı
+            
+        Returns:
+            Optional[ConnectionState]: Bağlantı durumu; reddedildiyse None
         """
+        if self.registry.is_full() and self.registry.get(client_id) is None:
+            self.registry.shed_total += 1
+            logger.warning(f"WebSocket bağlantı sınırı dolu, bağlantı reddedildi: {client_id}")
+            await websocket.close(code=CLOSE_TRY_AGAIN_LATER)
+            return None
+        
         await websocket.accept()
-        self.active_connections[client_id] = websocket
+        state = await self.registry.register(client_id, websocket)
+        if state is None:
+            await websocket.close(code=CLOSE_TRY_AGAIN_LATER)
+            return None
+        
+        # İstemcinin hangi worker'da olduğunu tüm worker'lara duyur; paylaşımlı
+        # durum erişilemezse bağlantı yine de kabul edilir
+        try:
+            await shared_state.hset(CONNECTION_DIRECTORY, client_id, directory_entry(worker_id(), self.directory_ttl))
+        except Exception as e:
+            logger.warning(f"Bağlantı dizini güncellenemedi: {str(e)}")
+        
         logger.info(f"Yeni WebSocket bağlantısı: {client_id}")
+        return state
     
-    def disconnect(self, client_id: str):
+    def disconnect(self, client_id: str, state: Optional[ConnectionState] = None):
         """
         WebSocket bağlantısını kapat.
         
         Args:
             client_id: İstemci tanımlayıcısı
+            state: Verilirse yalnızca bu bağlantı kayıtlıysa çıkarılır
         """
-        if client_id in self.active_connections:
-            del self.active_connections[client_id]
+        if self.registry.unregister(client_id, state):
             logger.info(f"WebSocket bağlantısı kapatıldı: {client_id}")
+            task = asyncio.create_task(self._forget(client_id))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+    
+    async def _forget(self, client_id: str):
+        """İstemciyi paylaşımlı dizinden sil (başka bir worker'a yeniden bağlanmadıysa)."""
+        try:
+            if entry_owner(await shared_state.hget(CONNECTION_DIRECTORY, client_id)) == worker_id():
+                await shared_state.hdel(CONNECTION_DIRECTORY, client_id)
+        except Exception as e:
+            logger.warning(f"Bağlantı dizini güncellenemedi: {str(e)}")
+    
+    async def _refresh_directory(self, client_ids: List[str]):
+        """
+        Heartbeat kancası: bu worker'daki bağlantıların dizin kayıtlarını tazele ve
+        çökmüş worker'lardan kalan süresi dolmuş kayıtları temizle.
+        """
+        owner = worker_id()
+        results = await asyncio.gather(
+            *(
+                shared_state.hset(CONNECTION_DIRECTORY, client_id, directory_entry(owner, self.directory_ttl))
+                for client_id in client_ids
+            ),
+            return_exceptions=True,
+        )
+        failed = [result for result in results if isinstance(result, Exception)]
+        if failed:
+            logger.warning(f"{len(failed)} bağlantı dizini kaydı tazelenemedi: {str(failed[0])}")
+        
+        try:
+            entries = await shared_state.hgetall(CONNECTION_DIRECTORY)
+        except Exception as e:
+            logger.warning(f"Bağlantı dizini okunamadı: {str(e)}")
+            return
+        expired = [client_id for client_id, value in entries.items() if entry_owner(value) is None]
+        await asyncio.gather(
+            *(shared_state.hdel(CONNECTION_DIRECTORY, client_id) for client_id in expired),
+            return_exceptions=True,
+        )
+    
+    async def locate(self, client_id: str) -> Optional[str]:
+        """
+        İstemcinin bağlı olduğu worker'ı bul.
+        
+        Args:
+            client_id: İstemci tanımlayıcısı
+            
+        Returns:
+            Optional[str]: Worker kimliği veya None (kayıt yoksa ya da süresi dolduysa)
+        """
+        return entry_owner(await shared_state.hget(CONNECTION_DIRECTORY, client_id))
     
     async def handle_message(self, websocket: WebSocket, client_id: str):
         """
         WebSocket üzerinden gelen mesajları işle.
         
+        Prompt mesajları ayrı görevlerde eşzamanlı işlenir; yanıtlar mesajın
+        "id" alanıyla eşleştirilir ve tamamlanma sırasına göre gönderilir.
+        Böylece yavaş bir LLM çağrısı aynı istemcinin ping ve diğer
+        prompt'larını bekletmez.
+        
         Args:
             websocket: WebSocket bağlantısı
             client_id: İstemci tanımlayıcısı
         """
+        session = self.registry.get(client_id)
+        if session is None or session.websocket is not websocket:
+            return
+        
         try:
             while True:
                 # Mesajı al
                 data = await websocket.receive_text()
-                message = json.loads(data)
+                session.record_in(len(data))
+                try:
+                    message = loads_limited(data)
+                except json.JSONDecodeError:
+                    await session.send({"type": "error", "error": "Geçersiz JSON formatı"})
+                    continue
+                except RequestTooLarge as e:
+                    await session.send({"type": "error", "error": e.detail})
+                    continue
+                if not isinstance(message, dict):
+                    # Bağlantıyı ve diğer prompt'ları bozmadan yalnızca bu mesaj reddedilir
+                    await session.send({"type": "error", "error": "Mesaj bir JSON nesnesi olmalı"})
+                    continue
                 
                 # Mesaj tipini kontrol et
                 message_type = message.get("type")
                 
                 if message_type == "prompt":
-                    # Prompt işleme
-                    await self._handle_prompt_message(websocket, message)
+                    # Prompt işleme (arka planda)
+                    await self._start_prompt(session, message)
+                elif message_type == "cancel":
+                    # Devam eden prompt'u iptal et
+                    await self._cancel_prompt(session, message.get("id"))
                 elif message_type == "ping":
                     # Ping mesajına yanıt ver
-                    await websocket.send_json({"type": "pong"})
+                    await session.send({"type": "pong", "id": message.get("id")})
+                elif message_type == "pong":
+                    # İstemcinin kendi ping'ine gelen yanıt gibi yok sayılır (heartbeat protokol seviyesindedir)
+                    pass
                 else:
                     # Bilinmeyen mesaj tipi
                     logger.warning(f"Bilinmeyen mesaj tipi: {message_type}")
-                    await websocket.send_json({
+                    await session.send({
                         "type": "error",
+                        "id": message.get("id"),
                         "error": f"Bilinmeyen mesaj tipi: {message_type}"
                     })
                     
         except WebSocketDisconnect:
-            self.disconnect(client_id)
+            pass
         except Exception as e:
             logger.error(f"WebSocket mesajı işlenirken hata: {str(e)}")
             try:
-                await websocket.send_json({
+                await session.send({
                     "type": "error",
                     "error": f"Mesaj işlenirken hata: {str(e)}"
                 })
             except:
                 pass
+        finally:
+            # Bağlantı kapandı: kaydı sil ve yarım kalan prompt'ları iptal et
+            self.disconnect(client_id, session)
+            session.cancel_all()
     
-    async def _handle_prompt_message(self, websocket: WebSocket, message: Dict[str, Any]):
+    async def _start_prompt(self, session: ConnectionState, message: Dict[str, Any]):
+        """
+        Prompt mesajını arka plan görevi olarak başlat.
+        
+        Args:
+            session: İstemci oturumu
+            message: Gelen mesaj
+        """
+        # Eski istemciler id göndermez; yanıtla eşleştirebilmeleri için biz üretiriz
+        message_id = str(message.get("id") or uuid.uuid4())
+        
+        if message_id in session.tasks:
+            await session.send({
+                "type": "error",
+                "id": message_id,
+                "error": f"Bu id ile devam eden bir istek zaten var: {message_id}"
+            })
+            return
+        
+        if len(session.tasks) >= settings.WS_MAX_CONCURRENT_PROMPTS:
+            await session.send({
+                "type": "error",
+                "id": message_id,
+                "error": "Eşzamanlı istek sınırı aşıldı, lütfen bekleyin"
+            })
+            return
+        
+        task = asyncio.create_task(self._handle_prompt_message(session, message_id, message))
+        session.tasks[message_id] = task
+        task.add_done_callback(lambda _: session.tasks.pop(message_id, None))
+    
+    async def _cancel_prompt(self, session: ConnectionState, message_id: Optional[str]):
+        """
+        Devam eden bir prompt görevini iptal et.
+        
+        Args:
+            session: İstemci oturumu
+            message_id: İptal edilecek isteğin id'si
+        """
+        task = session.tasks.get(str(message_id)) if message_id is not None else None
+        if task is None:
+            await session.send({
+                "type": "error",
+                "id": message_id,
+                "error": f"İptal edilecek istek bulunamadı: {message_id}"
+            })
+            return
+        
+        task.cancel()
+        await session.send({"type": "cancelled", "id": message_id})
+    
+    async def _handle_prompt_message(self, session: ConnectionState, message_id: str, message: Dict[str, Any]):
         """
         Prompt mesajını işle.
         
         Args:
-            websocket: WebSocket bağlantısı
+            session: İstemci oturumu
+            message_id: Yanıtla eşleştirilecek istek id'si
             message: Gelen mesaj
         """
+        # Kapanışta yeni iş alınmaz; istemci başka bir worker'a yeniden bağlanır
+        if not inflight.accepting:
+            await session.send({
+                "type": "error",
+                "id": message_id,
+                "error": "Sunucu kapanıyor, lütfen yeniden bağlanın"
+            })
+            return
+        
         try:
             # Prompt verilerini al
             prompt_data = message.get("data", {})
             
-            # MCP handler ile işle
-            result = await mcp_handler.process_request(prompt_data)
+            # HTTP proxy ile aynı hız sınırları ve kabul kontrolü; akış bitene kadar slot tutulur
+            await self._check_rate_limit(session, prompt_data)
+            async with admission_controller.slot():
+                # Kapanış, devam eden yanıtların (akışların) bitmesini bekler
+                async with inflight.track():
+                    if message.get("stream"):
+                        await self._stream_prompt(session, message_id, prompt_data)
+                        return
+                    
+                    # MCP handler ile işle
+                    result = await mcp_handler.process_request(prompt_data)
+                    
+                    # Sonucu gönder
+                    await session.send({
+                        "type": "response",
+                        "id": message_id,
+                        "data": result
+                    })
             
-            # Sonucu gönder
-            await websocket.send_json({
-                "type": "response",
-                "data": result
+        except asyncio.CancelledError:
+            raise
+        except RateLimitExceeded as e:
+            await session.send({
+                "type": "error",
+                "id": message_id,
+                "error": f"İstek sınırı aşıldı: {e.scope}",
+                "retry_after": int(e.retry_after_header),
             })
-            
         except Exception as e:
             logger.error(f"Prompt işlenirken hata: {str(e)}")
-            await websocket.send_json({
-                "type": "error",
-                "error": f"Prompt işlenirken hata: {str(e)}"
-            })
+            try:
+                await session.send({
+                    "type": "error",
+                    "id": message_id,
+                    "error": f"Prompt işlenirken hata: {str(e)}"
+                })
+            except Exception:
+                pass
+    
+    async def _check_rate_limit(self, session: ConnectionState, prompt_data: Any):
+        """
+        Prompt'u kullanıcı (yoksa API anahtarı, o da yoksa istemci adresi) sınırına tabi tut.
+        
+        Raises:
+            RateLimitExceeded: Sınır aşıldıysa
+        """
+        user = prompt_data.get("user") if isinstance(prompt_data, dict) else None
+        websocket = session.websocket
+        api_key = websocket.headers.get(settings.API_KEY_HEADER)
+        client_host = websocket.client.host if websocket.client is not None else None
+        await request_rate_limiter.check(
+            user=user_limit_key(user if isinstance(user, str) else None, api_key, client_host),
+            api_key=api_key,
+        )
+    
+    async def stats(self) -> Dict[str, Any]:
+        """Bu worker'ın bağlantı istatistikleri ve tüm worker'lardaki bağlantı sayıları."""
+        stats = self.registry.stats()
+        stats["worker_id"] = worker_id()
+        try:
+            entries = await shared_state.hgetall(CONNECTION_DIRECTORY)
+        except Exception as e:
+            logger.warning(f"Bağlantı dizini okunamadı: {str(e)}")
+            stats["cluster"] = None
+            return stats
+        
+        # Süresi dolmuş kayıtlar sayılmaz (temizliği heartbeat kancası yapar)
+        per_worker: Dict[str, int] = {}
+        for value in entries.values():
+            owner = entry_owner(value)
+            if owner is not None:
+                per_worker[owner] = per_worker.get(owner, 0) + 1
+        stats["cluster"] = {"active": sum(per_worker.values()), "per_worker": per_worker}
+        return stats
+    
+    async def _stream_prompt(self, session: ConnectionState, message_id: str, prompt_data: Dict[str, Any]):
+        """
+        Prompt'u işle ve filtrelenmiş yanıtı parça parça gönder.
+        
+        Her filtrelenmiş parça bir "response.delta", akış sonunda metadata
+        içeren bir "response.done" mesajı olarak gönderilir.
+        
+        Args:
+            session: İstemci oturumu
+            message_id: Yanıtla eşleştirilecek istek id'si
+            prompt_data: MCP formatındaki istek verisi
+        """
+        async for event in mcp_handler.stream_request(prompt_data):
+            if isinstance(event, str):
+                await session.send({
+                    "type": "response.delta",
+                    "id": message_id,
+                    "delta": event
+                })
+            else:
+                await session.send({
+                    "type": "response.done",
+                    "id": message_id,
+                    "data": event
+                })
 
 
 # Singleton instance
@@ -0,0 +1,244 @@
+"""Tarayıcı eklentisi WebSocket bağlantıları için kayıt, heartbeat ve boşta kalma tahliyesi.
+
+Ölü TCP bağlantıları protokol seviyesindeki WebSocket ping'leriyle
+(uvicorn ``ws_ping_interval``/``ws_ping_timeout``) tespit edilir; istemcinin
+uygulama seviyesinde bir mesaj göndermesi gerekmez.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import WebSocket
+
+from app.utils.json_utils import dumps_str
+
+logger = logging.getLogger(__name__)
+
+# WebSocket kapatma kodları
+CLOSE_TRY_AGAIN_LATER = 1013  # Kapasite dolu (load shedding)
+CLOSE_IDLE_TIMEOUT = 4000  # idle_timeout boyunca mesaj göndermeyen bağlantı (etkinse)
+CLOSE_REPLACED = 4001  # Aynı client_id ile yeni bağlantı açıldı
+
+
+class ConnectionState:
+    """Tek bir WebSocket bağlantısının durumu (binlerce bağlantı için __slots__ ile)."""
+
+    __slots__ = (
+        "client_id", "websocket", "connected_at", "last_seen",
+        "messages_in", "messages_out", "bytes_in", "bytes_out",
+        "tasks", "_send_lock",
+    )
+
+    def __init__(self, client_id: str, websocket: WebSocket):
+        """
+        Initialize connection state.
+
+        Args:
+            client_id: İstemci tanımlayıcısı
+            websocket: WebSocket bağlantısı
+        """
+        now = time.monotonic()
+        self.client_id = client_id
+        self.websocket = websocket
+        self.connected_at = now
+        self.last_seen = now
+        self.messages_in = 0
+        self.messages_out = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        # Devam eden prompt görevleri (mesaj id -> görev)
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self._send_lock = asyncio.Lock()
+
+    def record_in(self, size: int):
+        """Gelen bir mesajı say ve bağlantıyı canlı olarak işaretle."""
+        self.last_seen = time.monotonic()
+        self.messages_in += 1
+        self.bytes_in += size
+
+    async def send(self, message: Dict[str, Any]):
+        """Mesajı gönder; eşzamanlı görevlerin yazmaları birbirine karışmaz."""
+        data = dumps_str(message)
+        async with self._send_lock:
+            await self.websocket.send_text(data)
+        self.messages_out += 1
+        self.bytes_out += len(data)
+
+    def cancel_all(self):
+        """Devam eden tüm prompt görevlerini iptal et."""
+        for task in list(self.tasks.values()):
+            task.cancel()
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        """Bağlantı başına trafik istatistikleri."""
+        duration = max(now - self.connected_at, 1e-6)
+        return {
+            "client_id": self.client_id,
+            "connected_seconds": round(duration, 1),
+            "idle_seconds": round(now - self.last_seen, 1),
+            "in_flight": len(self.tasks),
+            "messages_in": self.messages_in,
+            "messages_out": self.messages_out,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "messages_per_second": round((self.messages_in + self.messages_out) / duration, 3),
+            "bytes_per_second": round((self.bytes_in + self.bytes_out) / duration, 1),
+        }
+
+
+class ConnectionRegistry:
+    """
+    Worker başına WebSocket bağlantı kaydı.
+
+    Bağlantı sayısını sınırlar (dolduğunda yeni bağlantıları reddeder),
+    aynı client_id ile yeniden bağlananların eski bağlantısını kapatır ve
+    periyodik heartbeat turlarında (etkinse) boşta kalma süresini aşanları
+    tahliye eder. Sessiz ama canlı bağlantılar varsayılan olarak açık kalır.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 10000,
+        heartbeat_interval: float = 30.0,
+        idle_timeout: float = 0.0,
+        on_heartbeat: Optional[Callable[[List[str]], Awaitable[None]]] = None,
+    ):
+        """
+        Initialize connection registry.
+
+        Args:
+            max_connections: Bu worker'daki maksimum eşzamanlı bağlantı sayısı
+            heartbeat_interval: Heartbeat turlarının aralığı (saniye)
+            idle_timeout: Hiç mesaj gelmeyen bağlantının kapatılacağı süre (saniye, 0 kapatmaz)
+            on_heartbeat: Her heartbeat turundan sonra canlı client_id'lerle çağrılır
+                (ör. paylaşımlı dizin kayıtlarını tazelemek için)
+        """
+        self.max_connections = max_connections
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.on_heartbeat = on_heartbeat
+        self._connections: Dict[str, ConnectionState] = {}
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.shed_total = 0
+        self.evicted_total = 0
+        self.replaced_total = 0
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    def get(self, client_id: str) -> Optional[ConnectionState]:
+        """client_id'ye ait bağlantı durumunu döndür."""
+        return self._connections.get(client_id)
+
+    def items(self):
+        """(client_id, ConnectionState) çiftleri."""
+        return self._connections.items()
+
+    def is_full(self) -> bool:
+        """Bağlantı sınırına ulaşıldı mı?"""
+        return len(self._connections) >= self.max_connections
+
+    async def register(self, client_id: str, websocket: WebSocket) -> Optional[ConnectionState]:
+        """
+        Kabul edilmiş bir bağlantıyı kaydet.
+
+        Aynı client_id ile açık bir bağlantı varsa kapatılıp yenisiyle değiştirilir.
+
+        Args:
+            client_id: İstemci tanımlayıcısı
+            websocket: Kabul edilmiş WebSocket bağlantısı
+
+        Returns:
+            Optional[ConnectionState]: Kayıt durumu; kapasite doluysa None
+        """
+        previous = self._connections.pop(client_id, None)
+        if previous is not None:
+            self.replaced_total += 1
+            previous.cancel_all()
+            await self._close(previous, CLOSE_REPLACED)
+        elif self.is_full():
+            self.shed_total += 1
+            return None
+
+        state = ConnectionState(client_id, websocket)
+        self._connections[client_id] = state
+        self._ensure_heartbeat()
+        return state
+
+    def unregister(self, client_id: str, state: Optional[ConnectionState] = None) -> bool:
+        """
+        Bağlantıyı kayıttan çıkar.
+
+        Args:
+            client_id: İstemci tanımlayıcısı
+            state: Verilirse yalnızca kayıtlı durum bu nesneyse çıkarılır
+                (yeniden bağlanan istemcinin yeni bağlantısını silmemek için)
+
+        Returns:
+            bool: Kayıt çıkarıldıysa True
+        """
+        current = self._connections.get(client_id)
+        if current is None or (state is not None and current is not state):
+            return False
+        del self._connections[client_id]
+        current.cancel_all()
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Bağlantı sayıları ve bağlantı başına trafik istatistikleri."""
+        now = time.monotonic()
+        connections: List[Dict[str, Any]] = [state.stats(now) for state in list(self._connections.values())]
+        return {
+            "active": len(connections),
+            "max_connections": self.max_connections,
+            "shed_total": self.shed_total,
+            "evicted_total": self.evicted_total,
+            "replaced_total": self.replaced_total,
+            "in_flight": sum(c["in_flight"] for c in connections),
+            "connections": connections,
+        }
+
+    def _ensure_heartbeat(self):
+        """Heartbeat döngüsünü (henüz çalışmıyorsa) başlat."""
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self):
+        """Heartbeat döngüsünü durdur."""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+
+    async def _heartbeat_loop(self):
+        """Boşta kalanları tahliye et ve heartbeat kancasını çağır."""
+        while self._connections:
+            await asyncio.sleep(self.heartbeat_interval)
+            await self.sweep()
+            if self.on_heartbeat is not None and self._connections:
+                try:
+                    await self.on_heartbeat(list(self._connections))
+                except Exception as e:
+                    logger.warning(f"Heartbeat kancası başarısız: {str(e)}")
+
+    async def sweep(self):
+        """Boşta kalma süresini aşan bağlantıları kapat (idle_timeout 0 ise hiçbir şey yapmaz)."""
+        if self.idle_timeout <= 0:
+            return
+        now = time.monotonic()
+        for client_id, state in list(self._connections.items()):
+            if now - state.last_seen >= self.idle_timeout and self.unregister(client_id, state):
+                self.evicted_total += 1
+                logger.info(f"Boşta kalan WebSocket bağlantısı kapatıldı: {client_id}")
+                await self._close(state, CLOSE_IDLE_TIMEOUT)
+
+    async def _close(self, state: ConnectionState, code: int):
+        """Bağlantıyı sessizce kapat (zaten kapanmış olabilir)."""
+        try:
+            await state.websocket.close(code=code)
+        except Exception:
+            pass
@@ -1,11 +1,15 @@
 """Model-Context-Protocol (MCP) entegrasyonu için handler sınıfı."""
 import json
 import logging
-from typing import Dict, Any, Optional, Tuple
+from typing import AsyncIterator, Dict, Any, Optional, Tuple, Union
 
 from app.core.config import settings
 from app.core.prompt_service import prompt_service
-from app.schemas.request import PromptRequest, ModelProvider
+from app.core.rate_limit import RateLimitExceeded
+from app.core.token_budget import ContextLengthExceeded
+from app.schemas.request import DetailLevel, PromptRequest, ModelProvider
+from app.schemas.response import PromptResponse
+from app.services.resilience import ProviderError
 from app.utils.mcp_utils import extract_mcp_data, create_mcp_response
 
 logger = logging.getLogger(__name__)
@@ -21,51 +25,42 @@ class MCPHandler:
             "google": ModelProvider.GOOGLE,
         }
     
-    async def process_request(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def process_request(self, request_data: Dict[str, Any], policy: Optional[str] = None) -> Dict[str, Any]:
         """
         MCP formatındaki isteği işle ve filtrelenmiş yanıtı döndür.
         
         Args:
             request_data: MCP formatındaki istek verisi
+            policy: Uygulanacak politika profili (yoksa kullanıcıya göre belirlenir)
             
         Returns:
             Dict[str, Any]: MCP formatında filtrelenmiş yanıt
+            
+        Raises:
+            ValueError: İstek geçersizse (ör. desteklenmeyen sağlayıcı)
+            ContextLengthExceeded: Prompt modelin bağlam penceresine sığmıyorsa
+            RateLimitExceeded: Kullanıcının token bütçesi dolduysa
+            ProviderError: Sağlayıcı çağrısı denemelerden sonra da başarısızsa
         """
+        # Geçersiz istek hata yanıtına gömülmez; çağıran 400 olarak döndürür
+        prompt_request = self.build_prompt_request(request_data)
+        
         try:
-            # MCP verilerini ayıkla
-            content, provider_name, model, params = extract_mcp_data(request_data)
-            
-            # Provider adını PromptSafe'in desteklediği formata dönüştür
-            provider = self._map_provider(provider_name)
-            
-            # PromptRequest oluştur
-            prompt_request = PromptRequest(
-                content=content,
-                provider=provider,
-                model=model,
-                temperature=params.get("temperature", 0.7),
-                max_tokens=params.get("max_tokens", 1024),
-                system_prompt=params.get("system_prompt"),
-                additional_params=params
-            )
-            
             # PromptSafe ile işle
-            response = await prompt_service.process_prompt(prompt_request)
+            response = await prompt_service.process_prompt(prompt_request, policy=policy)
             
             # Yanıtı MCP formatına dönüştür
             mcp_response = create_mcp_response(
                 response.response_content,
                 request_data,
-                {
-                    "filtered_input": response.request_filtered.has_sensitive_content,
-                    "filtered_output": response.response_filtered.has_sensitive_content,
-                    "processing_time_ms": response.processing_time_ms,
-                    "request_id": response.request_id
-                }
+                self._metadata(response)
             )
             
             return mcp_response
             
+        except (ContextLengthExceeded, RateLimitExceeded, ProviderError):
+            # Çağıran bunları HTTP 413/429/502-503 olarak döndürür
+            raise
         except Exception as e:
             logger.error(f"MCP isteği işlenirken hata: {str(e)}")
             # Hata durumunda basit bir yanıt döndür
@@ -74,6 +69,67 @@ class MCPHandler:
                 "message": f"İstek işlenirken hata oluştu: {str(e)}"
             }
     
+    async def stream_request(
+        self, request_data: Dict[str, Any], policy: Optional[str] = None
+    ) -> AsyncIterator[Union[str, Dict[str, Any]]]:
+        """
+        MCP formatındaki isteği işle ve filtrelenmiş yanıtı akış halinde döndür.
+        
+        Args:
+            request_data: MCP formatındaki istek verisi
+            policy: Uygulanacak politika profili (yoksa kullanıcıya göre belirlenir)
+            
+        Yields:
+            str: Filtrelenmiş yanıt parçaları
+            Dict[str, Any]: En sonda PromptSafe metadata'sı
+        """
+        prompt_request = self.build_prompt_request(request_data)
+        
+        async for event in prompt_service.stream_prompt(prompt_request, policy=policy):
+            if isinstance(event, str):
+                yield event
+            else:
+                yield self._metadata(event)
+    
+    def build_prompt_request(self, request_data: Dict[str, Any]) -> PromptRequest:
+        """
+        MCP verisinden PromptRequest oluştur.
+        
+        Args:
+            request_data: MCP formatındaki istek verisi
+            
+        Returns:
+            PromptRequest: PromptSafe istek nesnesi
+        """
+        # MCP verilerini ayıkla
+        content, provider_name, model, params = extract_mcp_data(request_data)
+        
+        # Provider adını PromptSafe'in desteklediği formata dönüştür
+        provider = self._map_provider(provider_name)
+        
+        return PromptRequest(
+            content=content,
+            provider=provider,
+            model=model,
+            temperature=params.get("temperature", 0.7),
+            max_tokens=params.get("max_tokens", 1024),
+            user_id=request_data.get("user"),
+            system_prompt=params.get("system_prompt"),
+            additional_params=params,
+            # MCP yanıtına yalnızca hassas içerik bayrakları eklenir
+            detail_level=DetailLevel.NONE
+        )
+    
+    def _metadata(self, response: PromptResponse) -> Dict[str, Any]:
+        """Yanıta eklenecek PromptSafe metadata'sını oluştur."""
+        return {
+            "filtered_input": response.request_filtered.has_sensitive_content,
+            "filtered_output": response.response_filtered.has_sensitive_content,
+            "processing_time_ms": response.processing_time_ms,
+            "request_id": response.request_id,
+            "policy_profile": response.policy_profile
+        }
+    
     def _map_provider(self, provider_name: str) -> ModelProvider:
         """
         Provider adını PromptSafe'in desteklediği formata dönüştür.
@@ -83,6 +139,9 @@ class MCPHandler:
             
         Returns:
             ModelProvider: PromptSafe'in desteklediği provider enum değeri
+            
+        Raises:
+            ValueError: Provider desteklenmiyorsa (istek başka bir sağlayıcıya sessizce gönderilmez)
         """
         provider_name = provider_name.lower()
         
@@ -90,9 +149,10 @@ class MCPHandler:
         if provider_name in self.supported_providers:
             return self.supported_providers[provider_name]
         
-        # Desteklenmeyen provider için varsayılan olarak OpenAI kullan
-        logger.warning(f"Desteklenmeyen provider: {provider_name}, OpenAI kullanılıyor")
-        return ModelProvider.OPENAI
+        raise ValueError(
+            f"Desteklenmeyen provider: {provider_name} "
+            f"(desteklenenler: {', '.join(self.supported_providers)})"
+        )
 
 
 # Singleton instance
@@ -1,15 +1,23 @@
 """LLM istekleri için proxy sunucu."""
 import json
 import logging
-import httpx
-from typing import Dict, Any, Optional, Union, Callable
+from typing import TYPE_CHECKING, Dict, Any, Optional, Union, Callable
 from fastapi import Request, Response, HTTPException
 from starlette.responses import StreamingResponse
 
 from app.core.config import settings
+from app.core.policy_registry import policy_registry
+from app.core.rate_limit import RateLimitExceeded
+from app.core.request_limits import read_json
+from app.core.token_budget import ContextLengthExceeded
 from app.proxy.mcp_handler import mcp_handler
+from app.services.resilience import RETRYABLE_STATUS, ProviderError, parse_retry_after, provider_resilience
+from app.utils.json_utils import dumps
 from app.utils.mcp_utils import is_mcp_request
 
+if TYPE_CHECKING:
+    import httpx
+
 logger = logging.getLogger(__name__)
 
 # LLM sağlayıcılarının API endpoint'leri
@@ -25,26 +33,46 @@ class ProxyServer:
     
     def __init__(self):
         """Initialize proxy server."""
-        self.client = httpx.AsyncClient(timeout=60.0)
+        self._client: Optional["httpx.AsyncClient"] = None
+    
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        """Sağlayıcılara giden paylaşılan bağlantı havuzu (httpx ilk kullanımda yüklenir)."""
+        if self._client is None:
+            import httpx
+            
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.LLM_REQUEST_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT)
+            )
+        return self._client
     
-    async def handle_request(self, request: Request) -> Union[Response, Dict[str, Any]]:
+    async def close(self):
+        """Bağlantı havuzunu kapat (uygulama kapanırken)."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def handle_request(self, request: Request, body: Any = None) -> Union[Response, Dict[str, Any]]:
         """
         Gelen isteği işle ve uygun şekilde yönlendir.
         
         Args:
             request: Gelen HTTP isteği
+            body: Önceden ayrıştırılmış istek gövdesi (verilmezse istekten okunur)
             
         Returns:
             Union[Response, Dict[str, Any]]: İşlenmiş yanıt
         """
         try:
-            # İstek gövdesini oku
-            body = await request.json()
+            # İstek gövdesini oku (gövde ve metin alanı sınırları ayrıştırma sırasında uygulanır)
+            if body is None:
+                body = await read_json(request)
             
             # MCP formatında mı kontrol et
             if is_mcp_request(body):
                 logger.info("MCP formatında istek alındı")
-                return await self._handle_mcp_request(body)
+                policy = self._resolve_policy(request, body)
+                return await self._handle_mcp_request(body, policy)
             else:
                 logger.info("Standart API isteği alındı")
                 return await self._handle_api_request(request, body)
@@ -52,21 +80,48 @@ class ProxyServer:
         except json.JSONDecodeError:
             logger.error("İstek gövdesi JSON formatında değil")
             raise HTTPException(status_code=400, detail="Geçersiz JSON formatı")
+        except (HTTPException, ContextLengthExceeded, RateLimitExceeded, ProviderError):
+            raise
+        except ValueError as e:
+            # Geçersiz MCP isteği (ör. desteklenmeyen sağlayıcı)
+            logger.warning(f"Geçersiz istek: {str(e)}")
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             logger.error(f"İstek işlenirken hata: {str(e)}")
             raise HTTPException(status_code=500, detail=f"İstek işlenirken hata: {str(e)}")
     
-    async def _handle_mcp_request(self, request_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _resolve_policy(self, request: Request, body: Dict[str, Any]) -> str:
+        """
+        İstek başlıkları, API anahtarı veya kullanıcıya göre politika profilini belirle.
+        
+        Args:
+            request: Gelen HTTP isteği
+            body: İstek gövdesi
+            
+        Returns:
+            str: Politika profili adı
+        """
+        try:
+            return policy_registry.resolve(
+                profile_name=request.headers.get(settings.POLICY_HEADER),
+                api_key=request.headers.get(settings.API_KEY_HEADER),
+                user_id=body.get("user"),
+            )
+        except KeyError as e:
+            raise HTTPException(status_code=400, detail=f"Geçersiz politika profili: {e.args[0]}")
+    
+    async def _handle_mcp_request(self, request_data: Dict[str, Any], policy: Optional[str] = None) -> Dict[str, Any]:
         """
         MCP formatındaki isteği işle.
         
         Args:
             request_data: MCP formatındaki istek verisi
+            policy: Uygulanacak politika profili
             
         Returns:
             Dict[str, Any]: İşlenmiş MCP yanıtı
         """
-        return await mcp_handler.process_request(request_data)
+        return await mcp_handler.process_request(request_data, policy=policy)
     
     async def _handle_api_request(self, request: Request, body: Dict[str, Any]) -> Response:
         """
@@ -94,6 +149,10 @@ class ProxyServer:
         # İsteği ilgili sağlayıcıya yönlendir
         headers = dict(request.headers)
         headers.pop("host", None)
+        # Gövde yeniden kodlandığı için uzunluğu httpx hesaplar
+        headers.pop("content-length", None)
+        headers["content-type"] = "application/json"
+        content = dumps(body)
         
         # API anahtarını ekle
         api_key = self._get_api_key(provider)
@@ -104,12 +163,31 @@ class ProxyServer:
         elif provider == "google":
             target_url = f"{target_url}?key={api_key}"
         
-        # İsteği gönder
-        response = await self.client.post(
-            target_url,
-            json=body,
-            headers=headers
-        )
+        # İsteği gönder; 429/5xx yanıtlarında Retry-After'a uyarak yeniden dene
+        async def send() -> "httpx.Response":
+            response = await self.client.post(
+                target_url,
+                content=content,
+                headers=headers
+            )
+            if response.status_code in RETRYABLE_STATUS:
+                raise ProviderError(
+                    provider,
+                    f"{provider} HTTP {response.status_code}",
+                    status_code=response.status_code,
+                    retry_after=parse_retry_after(response.headers),
+                    response=response,
+                )
+            return response
+        
+        try:
+            response = await provider_resilience.get(provider).call(send, hedge=False)
+        except ProviderError as e:
+            if e.response is None:
+                headers = {"Retry-After": str(max(1, int(e.retry_after or 1)))}
+                raise HTTPException(status_code=503, detail=str(e), headers=headers)
+            # Denemeler tükendi: sağlayıcının son yanıtını olduğu gibi ilet
+            response = e.response
         
         # Yanıtı döndür
         return Response(
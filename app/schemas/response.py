@@ -1,6 +1,6 @@
 """Response schemas for the API."""
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 
 from pydantic import BaseModel, Field
 
@@ -8,12 +8,15 @@ from pydantic import BaseModel, Field
 class FilteredContent(BaseModel):
     """Schema for filtered content information."""
 
-    original_text: str = Field(..., description="Orijinal metin")
-    filtered_text: str = Field(..., description="Filtrelenmiş metin")
+    original_text: Optional[str] = Field(None, description="Orijinal metin (yalnızca full)")
+    filtered_text: Optional[str] = Field(None, description="Filtrelenmiş metin (yalnızca full)")
     has_sensitive_content: bool = Field(..., description="Hassas içerik tespit edildi mi?")
-    masked_elements: List[Dict[str, Any]] = Field(
-        default_factory=list, 
-        description="Maskelenen içerik öğeleri"
+    entity_counts: Optional[Dict[str, int]] = Field(
+        None, description="Varlık tipi başına maskelenen öğe sayısı (none dışında)"
+    )
+    masked_elements: Optional[List[Dict[str, Any]]] = Field(
+        None,
+        description="Maskelenen içerik öğeleri (spans ve full)"
     )
 
 
@@ -26,9 +29,13 @@ class PromptResponse(BaseModel):
     response_filtered: FilteredContent = Field(..., description="Filtrelenmiş yanıt içeriği")
     model_used: str = Field(..., description="Kullanılan model adı")
     provider: str = Field(..., description="Kullanılan sağlayıcı")
+    route: Optional[str] = Field(None, description="Yönlendirilen modelde kullanılan hedef")
+    policy_profile: Optional[str] = Field(None, description="Uygulanan politika profili")
     processing_time_ms: float = Field(..., description="İşleme süresi (ms)")
     timestamp: datetime = Field(default_factory=datetime.now, description="Yanıt zamanı")
-    tokens_used: Optional[Dict[str, int]] = Field(None, description="Kullanılan token sayısı")
+    tokens_used: Optional[Dict[str, Union[int, float]]] = Field(
+        None, description="Kullanılan token sayısı (önbellekten okunan token'lar ve önbellek isabet oranı dahil)"
+    )
 
 
 class HealthResponse(BaseModel):
@@ -37,4 +44,7 @@ class HealthResponse(BaseModel):
     status: str = Field(..., description="Servis durumu")
     version: str = Field(..., description="API versiyonu")
     environment: str = Field(..., description="Çalışma ortamı")
-    providers: Dict[str, bool] = Field(..., description="API sağlayıcıları durumu") 
\ No newline at end of file
+    providers: Dict[str, bool] = Field(..., description="API sağlayıcıları durumu")
+    provider_status: Optional[Dict[str, Dict[str, Any]]] = Field(
+        None, description="Son yoklama sonuçları (durum, gecikme, devre durumu)"
+    ) 
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""
+Uvicorn server for PromptSafe that drains before closing connections.
+
+uvicorn's shutdown closes the listening sockets and every open connection
+(WebSockets get close code 1012) before the lifespan shutdown event is
+sent, so a drain in the lifespan handler starts only after in-flight
+WebSocket prompts and streams have lost their connection. This server
+drains on the exit signal instead: readiness switches to ``draining``, new
+prompts are refused, running ones get ``SHUTDOWN_DRAIN_TIMEOUT`` seconds
+to finish, and only then does uvicorn's own shutdown begin.
+
+Usage:
+    python -m app.server --host 0.0.0.0 --port 8000
+"""
+import argparse
+import asyncio
+import sys
+from types import FrameType
+from typing import Optional
+
+import uvicorn
+
+from app.core.config import settings
+from app.core.lifespan import AppResources, resources as app_resources
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn.Server whose first exit signal drains the application before shutting down."""
+
+    def __init__(self, config: uvicorn.Config, resources: AppResources = app_resources):
+        """
+        Initialize the server.
+
+        Args:
+            config: Uvicorn configuration
+            resources: Application resources to drain on exit
+        """
+        super().__init__(config)
+        self.resources = resources
+        self._drain_task: Optional[asyncio.Task] = None
+
+    def handle_exit(self, sig: int, frame: Optional[FrameType]) -> None:
+        """Start draining on the first signal; a second one exits without waiting."""
+        if self._drain_task is None and not self.should_exit:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            if loop is not None:
+                self._drain_task = loop.create_task(self._drain_then_exit(sig, frame))
+                return
+        super().handle_exit(sig, frame)
+
+    async def _drain_then_exit(self, sig: int, frame: Optional[FrameType]):
+        try:
+            await self.resources.drain()
+        finally:
+            # İkinci sinyal uvicorn'un kapanışını zaten başlattıysa tekrar tetikleme
+            if not self.should_exit:
+                super().handle_exit(sig, frame)
+
+
+def build_config(app, graceful_timeout: Optional[float] = None, **kwargs) -> uvicorn.Config:
+    """Uvicorn configuration shared by the single-process and prefork servers."""
+    # Erişim logları RequestLoggingMiddleware tarafından yazılır; ölü WebSocket
+    # istemcileri protokol seviyesindeki ping'lerle tespit edilir
+    kwargs.setdefault("ws_ping_interval", settings.WS_HEARTBEAT_INTERVAL)
+    kwargs.setdefault("ws_ping_timeout", settings.WS_PING_TIMEOUT)
+    return uvicorn.Config(app, access_log=False, timeout_graceful_shutdown=graceful_timeout, **kwargs)
+
+
+def main(argv=None) -> int:
+    """Run the application in a single draining uvicorn process."""
+    parser = argparse.ArgumentParser(description="PromptSafe server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    config = build_config(
+        "app.main:app",
+        graceful_timeout=settings.SHUTDOWN_DRAIN_TIMEOUT,
+        host=args.host,
+        port=args.port,
+        log_level=args.log_level,
+    )
+    DrainingServer(config).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,43 @@
 """Integration services for different LLM providers."""
+import asyncio
 import time
 import uuid
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple, Union
 
 from app.core.config import settings
 from app.schemas.request import ModelProvider, PromptRequest
 from app.schemas.response import FilteredContent, PromptResponse
+from app.services.prompt_cache import prompt_cache
+from app.services.resilience import ProviderError, classify_exception, provider_resilience
+
+# Anthropic cache breakpoint (prefix up to and including the block is cached)
+EPHEMERAL_CACHE = {"type": "ephemeral"}
+
+
+def _usage_field(usage: Any, name: str) -> int:
+    """Read a usage counter from an SDK object or a plain dict (older SDKs keep unknown fields as dicts)."""
+    value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+    return value or 0
 
 
 class BaseLLMService(ABC):
     """Base abstract class for all LLM service integrations."""
     
+    # Provider name used for resilience policies and error messages
+    provider: str = ""
+    
+    def __init__(self, base_url: Optional[str] = None):
+        """
+        Attach the endpoint's shared retry/circuit breaker policy.
+        
+        Args:
+            base_url: Alternative (e.g. regional) API endpoint; provider default if omitted
+        """
+        self.base_url = base_url
+        self.endpoint = f"{self.provider}@{base_url}" if base_url else self.provider
+        self.resilience = provider_resilience.get(self.endpoint)
+    
     @abstractmethod
     async def generate_response(self, prompt: str, **kwargs) -> Tuple[str, Dict[str, Any]]:
         """
@@ -23,6 +49,9 @@ class BaseLLMService(ABC):
         
         Returns:
             Tuple[str, Dict]: Response text and metadata
+        
+        Raises:
+            ProviderError: If the provider call fails after retries
         """
         pass
     
@@ -30,207 +59,447 @@ class BaseLLMService(ABC):
     def is_available(self) -> bool:
         """Check if the service is available (has API key, etc.)"""
         pass
+    
+    def warm_up(self):
+        """
+        Import the provider SDK and build its client ahead of the first request.
+        
+        Raises:
+            ProviderError: If the SDK is not installed
+        """
+    
+    async def close(self):
+        """Close the provider client and its connection pool."""
+    
+    async def stream_response(
+        self, prompt: str, metadata: Optional[Dict[str, Any]] = None, **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Stream the response from the LLM provider as text chunks.
+        
+        Providers without streaming support yield the full response once.
+        
+        Args:
+            prompt: The processed prompt text
+            metadata: Dict filled with response metadata once the stream ends
+            **kwargs: Additional parameters for the model
+        
+        Yields:
+            str: Response text chunks
+        
+        Raises:
+            ProviderError: If the provider call fails
+        """
+        response_text, response_metadata = await self.generate_response(prompt, **kwargs)
+        if metadata is not None:
+            metadata.update(response_metadata)
+        yield response_text
 
 
 class OpenAIService(BaseLLMService):
     """OpenAI API integration service."""
     
-    def __init__(self):
-        """Initialize the OpenAI service."""
-        self.api_key = settings.OPENAI_API_KEY
+    provider = "openai"
+    
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None):
+        """
+        Initialize the OpenAI service.
+        
+        Args:
+            base_url: Alternative API endpoint
+            api_key: API key for the endpoint (defaults to OPENAI_API_KEY)
+        """
+        super().__init__(base_url)
+        self.api_key = api_key or settings.OPENAI_API_KEY
+        self._client = None
         
     def is_available(self) -> bool:
         """Check if OpenAI service is available."""
         return self.api_key is not None and len(self.api_key) > 0
+    
+    def _get_client(self):
+        """Create the async client once; retries are done by the resilience layer."""
+        if self._client is None:
+            try:
+                import openai
+            except ImportError:
+                raise ProviderError(self.provider, "OpenAI paketi yüklü değil.", retryable=False)
+            self._client = openai.AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=settings.LLM_REQUEST_TIMEOUT,
+                max_retries=0,
+            )
+        return self._client
+    
+    def warm_up(self):
+        """Import the OpenAI SDK and build the client."""
+        self._get_client()
+    
+    async def close(self):
+        """Close the OpenAI client."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+    
+    @staticmethod
+    def _messages(prompt: str, system_prompt: Optional[str]) -> List[Dict[str, str]]:
+        """Build the chat messages."""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+    
+    def _cache_params(self, model: str, prompt: str, system_prompt: Optional[str]) -> Dict[str, Any]:
+        """
+        Route requests sharing a repeated prefix to the same provider cache.
+        
+        OpenAI caches long prefixes automatically; a stable ``prompt_cache_key``
+        only makes requests with the same prefix land on the same cache.
+        """
+        stable, key = prompt_cache.stable_prefix(f"{system_prompt or ''}\x00{prompt}", f"{self.provider}:{model}")
+        return {"extra_body": {"prompt_cache_key": key}} if stable else {}
+    
+    def _tokens(self, usage: Any) -> Dict[str, Any]:
+        """Token usage including prompt tokens served from the provider cache."""
+        return prompt_cache.record_usage(
+            self.provider,
+            _usage_field(usage, "prompt_tokens"),
+            _usage_field(usage, "completion_tokens"),
+            cached_tokens=_usage_field(_usage_field(usage, "prompt_tokens_details") or {}, "cached_tokens"),
+        )
         
     async def generate_response(self, prompt: str, **kwargs) -> Tuple[str, Dict[str, Any]]:
         """Generate response using OpenAI API."""
-        try:
-            import openai
-            
-            # Set API key
-            client = openai.OpenAI(api_key=self.api_key)
-            
-            # Get parameters
-            model = kwargs.get("model", "gpt-3.5-turbo")
-            temperature = kwargs.get("temperature", 0.7)
-            max_tokens = kwargs.get("max_tokens", 1024)
-            system_prompt = kwargs.get("system_prompt")
-            
-            # Prepare messages
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            messages.append({"role": "user", "content": prompt})
-            
-            # Call API
-            start_time = time.time()
-            response = client.chat.completions.create(
+        # Get parameters
+        model = kwargs.get("model", "gpt-3.5-turbo")
+        temperature = kwargs.get("temperature", 0.7)
+        max_tokens = kwargs.get("max_tokens", 1024)
+        messages = self._messages(prompt, kwargs.get("system_prompt"))
+        cache_params = self._cache_params(model, prompt, kwargs.get("system_prompt"))
+        
+        # Call API
+        start_time = time.time()
+        response = await self.resilience.call(
+            lambda: self._get_client().chat.completions.create(
                 model=model,
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
+                **cache_params,
             )
-            end_time = time.time()
-            
-            # Extract response
-            response_text = response.choices[0].message.content
-            
-            # Prepare metadata
-            metadata = {
-                "model": model,
-                "processing_time_ms": (end_time - start_time) * 1000,
-                "tokens": {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens
-                }
-            }
-            
-            return response_text, metadata
-            
-        except ImportError:
-            # Handle missing openai package
-            return "OpenAI paketi yüklü değil.", {"error": "openai paketi yüklü değil."}
-            
+        )
+        end_time = time.time()
+        
+        # Extract response
+        response_text = response.choices[0].message.content
+        
+        # Prepare metadata
+        metadata = {
+            "model": model,
+            "processing_time_ms": (end_time - start_time) * 1000,
+            "tokens": self._tokens(response.usage),
+        }
+        
+        return response_text, metadata
+    
+    async def stream_response(
+        self, prompt: str, metadata: Optional[Dict[str, Any]] = None, **kwargs
+    ) -> AsyncIterator[str]:
+        """Stream response chunks using the OpenAI API."""
+        metadata = metadata if metadata is not None else {}
+        model = kwargs.get("model", "gpt-3.5-turbo")
+        messages = self._messages(prompt, kwargs.get("system_prompt"))
+        cache_params = self._cache_params(model, prompt, kwargs.get("system_prompt"))
+        
+        # Opening the stream is retried; a stream that breaks midway is not
+        start_time = time.time()
+        stream = await self.resilience.call(
+            lambda: self._get_client().chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=kwargs.get("temperature", 0.7),
+                max_tokens=kwargs.get("max_tokens", 1024),
+                stream=True,
+                **cache_params,
+            ),
+            hedge=False,
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
         except Exception as e:
-            # Handle API errors
-            error_msg = f"OpenAI API hatası: {str(e)}"
-            return error_msg, {"error": error_msg}
+            raise classify_exception(self.provider, e) from e
+        
+        metadata.update({
+            "model": model,
+            "processing_time_ms": (time.time() - start_time) * 1000,
+        })
 
 
 class GoogleAIService(BaseLLMService):
     """Google (Gemini) API integration service."""
     
-    def __init__(self):
-        """Initialize the Google AI service."""
-        self.api_key = settings.GOOGLE_API_KEY
+    provider = "google"
+    
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None):
+        """
+        Initialize the Google AI service.
+        
+        Args:
+            base_url: Alternative API endpoint
+            api_key: API key for the endpoint (defaults to GOOGLE_API_KEY)
+        """
+        super().__init__(base_url)
+        self.api_key = api_key or settings.GOOGLE_API_KEY
+        self._genai = None
+        self._models: Dict[str, Any] = {}
         
     def is_available(self) -> bool:
         """Check if Google AI service is available."""
         return self.api_key is not None and len(self.api_key) > 0
+    
+    def _get_genai(self):
+        """Import and configure the SDK once."""
+        if self._genai is None:
+            try:
+                import google.generativeai as genai
+            except ImportError:
+                raise ProviderError(self.provider, "Google GenerativeAI paketi yüklü değil.", retryable=False)
+            if self.base_url:
+                genai.configure(api_key=self.api_key, client_options={"api_endpoint": self.base_url})
+            else:
+                genai.configure(api_key=self.api_key)
+            self._genai = genai
+        return self._genai
+    
+    def warm_up(self):
+        """Import and configure the Google SDK."""
+        self._get_genai()
+    
+    def _generate_sync(self, prompt: str, model: str, temperature: float):
+        """Blocking SDK call, run in a worker thread."""
+        model_instance = self._models.get(model)
+        if model_instance is None:
+            model_instance = self._get_genai().GenerativeModel(model)
+            self._models[model] = model_instance
+        return model_instance.generate_content(prompt, generation_config={"temperature": temperature})
         
     async def generate_response(self, prompt: str, **kwargs) -> Tuple[str, Dict[str, Any]]:
         """Generate response using Google Generative AI API."""
-        try:
-            import google.generativeai as genai
-            
-            # Set API key
-            genai.configure(api_key=self.api_key)
-            
-            # Get parameters
-            model = kwargs.get("model", "gemini-pro")
-            temperature = kwargs.get("temperature", 0.7)
-            
-            # Call API
-            start_time = time.time()
-            model_instance = genai.GenerativeModel(model)
-            response = model_instance.generate_content(prompt, generation_config={"temperature": temperature})
-            end_time = time.time()
-            
-            # Extract response
-            response_text = response.text
-            
-            # Prepare metadata
-            metadata = {
-                "model": model,
-                "processing_time_ms": (end_time - start_time) * 1000,
-            }
-            
-            return response_text, metadata
-            
-        except ImportError:
-            # Handle missing google-generativeai package
-            return "Google GenerativeAI paketi yüklü değil.", {"error": "google-generativeai paketi yüklü değil."}
-            
-        except Exception as e:
-            # Handle API errors
-            error_msg = f"Google API hatası: {str(e)}"
-            return error_msg, {"error": error_msg}
+        # Get parameters
+        model = kwargs.get("model", "gemini-pro")
+        temperature = kwargs.get("temperature", 0.7)
+        
+        # Call API (the SDK is synchronous; keep it off the event loop)
+        start_time = time.time()
+        response = await self.resilience.call(
+            lambda: asyncio.to_thread(self._generate_sync, prompt, model, temperature)
+        )
+        end_time = time.time()
+        
+        # Extract response
+        response_text = response.text
+        
+        # Prepare metadata
+        metadata = {
+            "model": model,
+            "processing_time_ms": (end_time - start_time) * 1000,
+        }
+        
+        return response_text, metadata
 
 
 class AnthropicService(BaseLLMService):
     """Anthropic (Claude) API integration service."""
     
-    def __init__(self):
-        """Initialize the Anthropic service."""
-        self.api_key = settings.ANTHROPIC_API_KEY
+    provider = "anthropic"
+    
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None):
+        """
+        Initialize the Anthropic service.
+        
+        Args:
+            base_url: Alternative API endpoint
+            api_key: API key for the endpoint (defaults to ANTHROPIC_API_KEY)
+        """
+        super().__init__(base_url)
+        self.api_key = api_key or settings.ANTHROPIC_API_KEY
+        self._client = None
         
     def is_available(self) -> bool:
         """Check if Anthropic service is available."""
         return self.api_key is not None and len(self.api_key) > 0
+    
+    def _get_client(self):
+        """Create the async client once; retries are done by the resilience layer."""
+        if self._client is None:
+            try:
+                import anthropic
+            except ImportError:
+                raise ProviderError(self.provider, "Anthropic paketi yüklü değil.", retryable=False)
+            self._client = anthropic.AsyncAnthropic(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=settings.LLM_REQUEST_TIMEOUT,
+                max_retries=0,
+            )
+        return self._client
+    
+    def warm_up(self):
+        """Import the Anthropic SDK and build the client."""
+        self._get_client()
+    
+    async def close(self):
+        """Close the Anthropic client."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+        
+    @staticmethod
+    def _cacheable(text: str, context: str) -> Union[str, List[Dict[str, Any]]]:
+        """Split a text's repeated prefix off into a cache_control block (text unchanged otherwise)."""
+        stable, _ = prompt_cache.stable_prefix(text, context)
+        if not stable:
+            return text
+        blocks = [{"type": "text", "text": text[:stable], "cache_control": EPHEMERAL_CACHE}]
+        if stable < len(text):
+            blocks.append({"type": "text", "text": text[stable:]})
+        return blocks
+    
+    def _create_params(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Build messages.create arguments, marking repeated system prompts and context as cacheable."""
+        model = kwargs.get("model", "claude-3-haiku-20240307")
+        system_prompt = kwargs.get("system_prompt") or ""
+        # The cached prefix covers the system prompt, so the user prefix is keyed by it too
+        context = f"{self.provider}:{model}"
+        return {
+            "model": model,
+            "system": self._cacheable(system_prompt, context),
+            "max_tokens": kwargs.get("max_tokens", 1024),
+            "temperature": kwargs.get("temperature", 0.7),
+            "messages": [
+                {
+                    "role": "user",
+                    "content": self._cacheable(prompt, f"{context}\x00{system_prompt}")
+                }
+            ],
+        }
+    
+    def _tokens(self, usage: Any, output_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Token usage; Anthropic reports cache reads and writes apart from input_tokens."""
+        cached = _usage_field(usage, "cache_read_input_tokens")
+        created = _usage_field(usage, "cache_creation_input_tokens")
+        return prompt_cache.record_usage(
+            self.provider,
+            _usage_field(usage, "input_tokens") + cached + created,
+            _usage_field(usage, "output_tokens") if output_tokens is None else output_tokens,
+            cached_tokens=cached,
+            cache_creation_tokens=created,
+        )
         
     async def generate_response(self, prompt: str, **kwargs) -> Tuple[str, Dict[str, Any]]:
         """Generate response using Anthropic API."""
+        params = self._create_params(prompt, **kwargs)
+        
+        # Call API
+        start_time = time.time()
+        message = await self.resilience.call(lambda: self._get_client().messages.create(**params))
+        end_time = time.time()
+        
+        # Extract response
+        response_text = message.content[0].text
+        
+        # Prepare metadata
+        metadata = {
+            "model": params["model"],
+            "processing_time_ms": (end_time - start_time) * 1000,
+            "tokens": self._tokens(message.usage),
+        }
+        
+        return response_text, metadata
+    
+    async def stream_response(
+        self, prompt: str, metadata: Optional[Dict[str, Any]] = None, **kwargs
+    ) -> AsyncIterator[str]:
+        """Stream response chunks using the Anthropic API."""
+        metadata = metadata if metadata is not None else {}
+        params = self._create_params(prompt, **kwargs)
+        
+        # Opening the stream is retried; a stream that breaks midway is not
+        start_time = time.time()
+        stream = await self.resilience.call(
+            lambda: self._get_client().messages.create(**params, stream=True),
+            hedge=False,
+        )
+        # Input and cache usage arrive in message_start, output tokens in message_delta
+        usage, output_tokens = None, 0
         try:
-            import anthropic
-            
-            # Set API key
-            client = anthropic.Anthropic(api_key=self.api_key)
-            
-            # Get parameters
-            model = kwargs.get("model", "claude-3-haiku-20240307")
-            temperature = kwargs.get("temperature", 0.7)
-            max_tokens = kwargs.get("max_tokens", 1024)
-            system_prompt = kwargs.get("system_prompt")
-            
-            # Call API
-            start_time = time.time()
-            message = client.messages.create(
-                model=model,
-                system=system_prompt or "",
-                max_tokens=max_tokens,
-                temperature=temperature,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
-            end_time = time.time()
-            
-            # Extract response
-            response_text = message.content[0].text
-            
-            # Prepare metadata
-            metadata = {
-                "model": model,
-                "processing_time_ms": (end_time - start_time) * 1000,
-            }
-            
-            return response_text, metadata
-            
-        except ImportError:
-            # Handle missing anthropic package
-            return "Anthropic paketi yüklü değil.", {"error": "anthropic paketi yüklü değil."}
-            
+            async for event in stream:
+                if event.type == "content_block_delta" and getattr(event.delta, "text", None):
+                    yield event.delta.text
+                elif event.type == "message_start":
+                    usage = event.message.usage
+                elif event.type == "message_delta":
+                    output_tokens = _usage_field(event.usage, "output_tokens")
         except Exception as e:
-            # Handle API errors
-            error_msg = f"Anthropic API hatası: {str(e)}"
-            return error_msg, {"error": error_msg}
+            raise classify_exception(self.provider, e) from e
+        
+        metadata.update({
+            "model": params["model"],
+            "processing_time_ms": (time.time() - start_time) * 1000,
+        })
+        if usage is not None:
+            metadata["tokens"] = self._tokens(usage, output_tokens)
 
 
 class LLMServiceFactory:
     """Factory class for creating LLM services based on provider."""
     
+    # One instance per endpoint so clients and connection pools are reused
+    _services: Dict[Tuple[ModelProvider, Optional[str], Optional[str]], BaseLLMService] = {}
+    
+    _service_classes = {
+        ModelProvider.OPENAI: OpenAIService,
+        ModelProvider.GOOGLE: GoogleAIService,
+        ModelProvider.ANTHROPIC: AnthropicService,
+    }
+    
     @staticmethod
-    def get_service(provider: ModelProvider) -> BaseLLMService:
+    def get_service(
+        provider: ModelProvider, base_url: Optional[str] = None, api_key: Optional[str] = None
+    ) -> BaseLLMService:
         """
         Get the appropriate LLM service based on provider.
         
         Args:
             provider: The model provider to use
+            base_url: Alternative (e.g. regional) API endpoint
+            api_key: API key for the endpoint (provider default if omitted)
             
         Returns:
-            BaseLLMService: An instance of the LLM service
-        """
-        if provider == ModelProvider.OPENAI:
-            return OpenAIService()
-        elif provider == ModelProvider.GOOGLE:
-            return GoogleAIService()
-        elif provider == ModelProvider.ANTHROPIC:
-            return AnthropicService()
-        else:
-            # Default to OpenAI
-            return OpenAIService() 
\ No newline at end of file
+            BaseLLMService: The shared instance of the LLM service
+            
+        Raises:
+            ValueError: If the provider is not supported
+        """
+        key = (provider, base_url, api_key)
+        service = LLMServiceFactory._services.get(key)
+        if service is not None:
+            return service
+        
+        service_class = LLMServiceFactory._service_classes.get(provider)
+        if service_class is None:
+            raise ValueError(f"Desteklenmeyen sağlayıcı: {provider}")
+        service = service_class(base_url=base_url, api_key=api_key)
+        LLMServiceFactory._services[key] = service
+        return service
+    
+    @staticmethod
+    async def close_all():
+        """Close every shared service's client (on application shutdown)."""
+        services = list(LLMServiceFactory._services.values())
+        LLMServiceFactory._services.clear()
+        await asyncio.gather(*(service.close() for service in services), return_exceptions=True)
@@ -0,0 +1,158 @@
+"""Detection of repeated prompt prefixes for provider-side prompt caching.
+
+Providers cache a prompt prefix only when asked to (Anthropic
+``cache_control``) or route requests to a warm cache by key (OpenAI
+``prompt_cache_key``). Marking every prefix would pay cache-write costs for
+one-off prompts, so a prefix is marked only after it has been seen
+``min_repeats`` times within ``ttl`` seconds. Prefixes are compared by hash
+on fixed block boundaries, and no text is kept.
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from app.core.config import settings
+
+
+class PrefixTracker:
+    """
+    Bounded LRU of prefix hashes with per-provider cache usage counters.
+
+    A text is hashed incrementally; the digest at every block boundary
+    (from ``min_chars`` on, plus the end of the text) is one candidate
+    prefix. The longest candidate seen often enough is the stable prefix.
+    """
+
+    def __init__(
+        self,
+        min_chars: int = 4096,
+        block_chars: int = 2048,
+        min_repeats: int = 2,
+        max_entries: int = 4096,
+        ttl: float = 300.0,
+    ):
+        """
+        Initialize the tracker.
+
+        Args:
+            min_chars: Shortest prefix worth caching (providers ignore short ones)
+            block_chars: Distance between candidate prefix boundaries
+            min_repeats: Sightings before a prefix is marked cacheable
+            max_entries: Prefix hashes kept (least recently seen are evicted)
+            ttl: Seconds after which a prefix's count restarts (provider cache lifetime)
+        """
+        self.min_chars = min_chars
+        self.block_chars = max(1, block_chars)
+        self.min_repeats = min_repeats
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._seen: "OrderedDict[bytes, Tuple[int, float]]" = OrderedDict()
+        self.marked = 0
+        self.usage: Dict[str, Dict[str, int]] = {}
+
+    def _observe(self, digest: bytes, now: float) -> bool:
+        count, last_seen = self._seen.pop(digest, (0, now))
+        if now - last_seen > self.ttl:
+            count = 0
+        count += 1
+        self._seen[digest] = (count, now)
+        if len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+        return count >= self.min_repeats
+
+    def stable_prefix(self, text: str, context: str = "") -> Tuple[int, str]:
+        """
+        Record a text's prefixes and return the longest one that repeats.
+
+        Args:
+            text: Prompt text (system prompt, or context followed by the question)
+            context: What must also match for a provider cache hit (provider, model, preceding prompt)
+
+        Returns:
+            Tuple[int, str]: Stable prefix length in characters (0 if none) and its hex digest
+        """
+        if not settings.PROMPT_CACHE_ENABLED or len(text) < self.min_chars:
+            return 0, ""
+
+        hasher = hashlib.blake2b(context.encode("utf-8"), digest_size=16)
+        now = time.monotonic()
+        stable, key, position = 0, "", 0
+        boundaries = list(range(self.min_chars, len(text), self.block_chars))
+        boundaries.append(len(text))
+        for boundary in boundaries:
+            hasher.update(text[position:boundary].encode("utf-8"))
+            position = boundary
+            digest = hasher.copy().digest()
+            if self._observe(digest, now):
+                stable, key = boundary, digest.hex()
+        if stable:
+            self.marked += 1
+        return stable, key
+
+    def record_usage(
+        self,
+        provider: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cached_tokens: int = 0,
+        cache_creation_tokens: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        Count a response's token usage and build its ``tokens_used`` entry.
+
+        Args:
+            provider: Provider name
+            prompt_tokens: All input tokens, cached ones included
+            completion_tokens: Output tokens
+            cached_tokens: Input tokens read from the provider cache
+            cache_creation_tokens: Input tokens written to the provider cache
+
+        Returns:
+            Dict[str, Any]: Token counts with this response's cache hit rate
+        """
+        totals = self.usage.setdefault(
+            provider, {"responses": 0, "prompt_tokens": 0, "cached_tokens": 0, "cache_creation_tokens": 0}
+        )
+        totals["responses"] += 1
+        totals["prompt_tokens"] += prompt_tokens
+        totals["cached_tokens"] += cached_tokens
+        totals["cache_creation_tokens"] += cache_creation_tokens
+
+        tokens: Dict[str, Any] = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "cached_tokens": cached_tokens,
+            "cache_hit_rate": round(cached_tokens / prompt_tokens, 4) if prompt_tokens else 0.0,
+        }
+        if cache_creation_tokens:
+            tokens["cache_creation_tokens"] = cache_creation_tokens
+        return tokens
+
+    def stats(self) -> Dict[str, Any]:
+        """Tracked prefixes, marked requests and cache hit rate per provider."""
+        return {
+            "enabled": settings.PROMPT_CACHE_ENABLED,
+            "tracked_prefixes": len(self._seen),
+            "marked_requests": self.marked,
+            "providers": {
+                provider: {
+                    **totals,
+                    "cache_hit_rate": (
+                        round(totals["cached_tokens"] / totals["prompt_tokens"], 4) if totals["prompt_tokens"] else 0.0
+                    ),
+                }
+                for provider, totals in self.usage.items()
+            },
+        }
+
+
+# Singleton instance
+prompt_cache = PrefixTracker(
+    min_chars=settings.PROMPT_CACHE_MIN_CHARS,
+    block_chars=settings.PROMPT_CACHE_BLOCK_CHARS,
+    min_repeats=settings.PROMPT_CACHE_MIN_REPEATS,
+    max_entries=settings.PROMPT_CACHE_TRACKER_SIZE,
+    ttl=settings.PROMPT_CACHE_TTL,
+)
@@ -0,0 +1,404 @@
+"""Retries, request hedging and circuit breaking for LLM provider calls."""
+import asyncio
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# Upstream statuses worth retrying: rate limited, timeouts and server errors
+RETRYABLE_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+
+# Caps the retries of calls in the current context (a router that can fail
+# over to another target sets it to 0 instead of retrying the same one)
+max_retries_override: ContextVar[Optional[int]] = ContextVar("max_retries_override", default=None)
+
+
+class ProviderError(Exception):
+    """A failed provider call, raised instead of returning error text as a model answer."""
+
+    def __init__(
+        self,
+        provider: str,
+        message: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        retryable: Optional[bool] = None,
+        response: Any = None,
+    ):
+        """
+        Initialize the error.
+
+        Args:
+            provider: Provider name
+            message: Error description
+            status_code: Upstream HTTP status, if any
+            retry_after: Seconds the provider asked to wait (Retry-After)
+            retryable: Override retryability (defaults to status based)
+            response: Upstream response, for pass-through proxying
+        """
+        super().__init__(message)
+        self.provider = provider
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.response = response
+        if retryable is None:
+            retryable = status_code is None or status_code in RETRYABLE_STATUS
+        self.retryable = retryable
+
+    @property
+    def is_failure(self) -> bool:
+        """Does this error indicate an unhealthy provider (counts towards the breaker)?"""
+        return self.retryable
+
+
+class CircuitOpenError(ProviderError):
+    """Raised without calling the provider while its circuit is open."""
+
+    def __init__(self, provider: str, retry_after: float):
+        """Initialize the error."""
+        super().__init__(
+            provider, f"{provider} geçici olarak devre dışı (circuit open)",
+            status_code=503, retry_after=retry_after, retryable=False,
+        )
+
+
+def parse_retry_after(headers: Any) -> Optional[float]:
+    """
+    Read a Retry-After (or retry-after-ms) header as seconds.
+
+    Args:
+        headers: Mapping of response headers
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if absent or invalid
+    """
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_exception(provider: str, exc: Exception) -> ProviderError:
+    """
+    Convert an SDK or transport exception into a ProviderError.
+
+    Works with the OpenAI/Anthropic SDKs (``status_code`` and ``response``),
+    google-api-core (integer ``code``), httpx and asyncio timeouts.
+    """
+    if isinstance(exc, ProviderError):
+        return exc
+
+    status_code = getattr(exc, "status_code", None)
+    if not isinstance(status_code, int):
+        code = getattr(exc, "code", None)
+        status_code = code if isinstance(code, int) and 100 <= code < 600 else None
+
+    response = getattr(exc, "response", None)
+    retry_after = parse_retry_after(getattr(response, "headers", None))
+
+    retryable = None
+    if status_code is None:
+        # Only transport problems (timeouts, dropped connections) are worth retrying
+        name = type(exc).__name__
+        retryable = isinstance(exc, (asyncio.TimeoutError, ConnectionError)) or "Timeout" in name or "Connect" in name
+    return ProviderError(provider, f"{provider} API hatası: {exc}", status_code, retry_after, retryable)
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failures in a row the circuit opens and calls
+    fail fast. After ``recovery_time`` one probe call is let through
+    (half-open); its success closes the circuit, its failure reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_time: float = 30.0):
+        """
+        Initialize the breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            recovery_time: Seconds before a probe call is allowed
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened_total = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """May a call go through now?"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_time:
+                return False
+            self.state = self.HALF_OPEN
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def is_open(self) -> bool:
+        """Would a call be rejected right now? (Does not claim the probe slot.)"""
+        if self.state == self.OPEN:
+            return time.monotonic() - self.opened_at < self.recovery_time
+        return self.state == self.HALF_OPEN and self._probing
+
+    def retry_after(self) -> float:
+        """Seconds until the next probe is allowed."""
+        if self.state != self.OPEN:
+            return 1.0
+        return max(1.0, self.recovery_time - (time.monotonic() - self.opened_at))
+
+    def release(self):
+        """Give up a probe slot without a verdict (e.g. the call was cancelled)."""
+        self._probing = False
+
+    def record_success(self):
+        """A call succeeded (or failed for a reason unrelated to provider health)."""
+        self.failures = 0
+        self._probing = False
+        self.state = self.CLOSED
+
+    def record_failure(self):
+        """A call failed in a way that indicates an unhealthy provider."""
+        self.failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opened_total += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Recent call latencies for percentile estimates (fixed-size window)."""
+
+    def __init__(self, window: int = 200):
+        """Initialize an empty window."""
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        """Add a latency sample."""
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Return the given percentile (0-1) of the window, or None if empty."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ProviderResilience:
+    """Retry, hedging and circuit breaking policy for one provider."""
+
+    def __init__(
+        self,
+        provider: str,
+        max_retries: int = 2,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        max_retry_after: float = 30.0,
+        hedging: bool = False,
+        hedge_min_samples: int = 20,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        """
+        Initialize the policy.
+
+        Args:
+            provider: Provider name
+            max_retries: Retries after the first attempt
+            base_delay: Base of the exponential backoff (seconds)
+            max_delay: Backoff cap (seconds)
+            max_retry_after: Longest Retry-After honoured; longer waits fail immediately
+            hedging: Send a second request when the first exceeds the p95 latency
+            hedge_min_samples: Latency samples needed before hedging starts
+            breaker: Circuit breaker (a new one if omitted)
+        """
+        self.provider = provider
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.hedging = hedging
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self.calls = 0
+        self.retries = 0
+        self.hedged = 0
+        self.failures = 0
+
+    def _backoff(self, attempt: int, error: ProviderError) -> float:
+        """Delay before the next attempt: Retry-After if given, else full-jitter backoff."""
+        if error.retry_after is not None:
+            return error.retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def hedge_delay(self) -> Optional[float]:
+        """Latency after which a hedged request is sent, or None if hedging is off."""
+        if not self.hedging or len(self.latency) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(0.95)
+
+    async def call(self, fn: Callable[[], Awaitable[T]], hedge: bool = True) -> T:
+        """
+        Call the provider with retries, optional hedging and circuit breaking.
+
+        Args:
+            fn: Zero-argument coroutine function performing one provider call
+            hedge: Allow hedging (only for idempotent, non-streaming calls)
+
+        Returns:
+            The result of the first successful attempt
+
+        Raises:
+            ProviderError: If all attempts fail or the circuit is open
+        """
+        self.calls += 1
+        override = max_retries_override.get()
+        max_retries = self.max_retries if override is None else min(self.max_retries, override)
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(self.provider, self.breaker.retry_after())
+
+            start = time.monotonic()
+            try:
+                result = await self._attempt(fn, hedge)
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                error = classify_exception(self.provider, e)
+                if error.is_failure:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+
+                delay = self._backoff(attempt, error)
+                if not error.retryable or attempt >= max_retries or delay > self.max_retry_after:
+                    self.failures += 1
+                    raise error from e
+                attempt += 1
+                self.retries += 1
+                await asyncio.sleep(delay)
+                continue
+
+            self.latency.record(time.monotonic() - start)
+            self.breaker.record_success()
+            return result
+
+    async def _attempt(self, fn: Callable[[], Awaitable[T]], hedge: bool) -> T:
+        """One attempt; with hedging, a second request races the first after the p95 delay."""
+        delay = self.hedge_delay() if hedge else None
+        if delay is None:
+            return await fn()
+
+        first = asyncio.ensure_future(fn())
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.hedged += 1
+                tasks.add(asyncio.ensure_future(fn()))
+
+            error: Optional[BaseException] = None
+            pending = tasks
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters, breaker state and latency percentiles."""
+        p50 = self.latency.percentile(0.5)
+        p95 = self.latency.percentile(0.95)
+        return {
+            "provider": self.provider,
+            "circuit": self.breaker.state,
+            "circuit_opened_total": self.breaker.opened_total,
+            "calls": self.calls,
+            "retries": self.retries,
+            "hedged": self.hedged,
+            "failures": self.failures,
+            "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+class ResilienceRegistry:
+    """One resilience policy per provider, built from settings on first use."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._policies: Dict[str, ProviderResilience] = {}
+
+    def get(self, provider: str) -> ProviderResilience:
+        """Return the policy for a provider."""
+        policy = self._policies.get(provider)
+        if policy is None:
+            policy = ProviderResilience(
+                provider,
+                max_retries=settings.LLM_MAX_RETRIES,
+                base_delay=settings.LLM_RETRY_BASE_DELAY,
+                max_delay=settings.LLM_RETRY_MAX_DELAY,
+                max_retry_after=settings.LLM_RETRY_AFTER_MAX,
+                hedging=settings.LLM_HEDGING_ENABLED,
+                hedge_min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+                breaker=CircuitBreaker(
+                    failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+                    recovery_time=settings.LLM_CIRCUIT_RECOVERY_TIME,
+                ),
+            )
+            self._policies[provider] = policy
+        return policy
+
+    def stats(self):
+        """Statistics of every provider called so far."""
+        return [policy.stats() for policy in list(self._policies.values())]
+
+
+# Singleton instance
+provider_resilience = ResilienceRegistry()
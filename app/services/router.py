@@ -0,0 +1,274 @@
+"""Latency-aware routing of logical models across providers and regional endpoints."""
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.schemas.request import ModelProvider
+from app.services.llm_service import BaseLLMService, LLMServiceFactory
+from app.services.resilience import CircuitOpenError, ProviderError, max_retries_override
+
+
+class RouteTarget:
+    """One provider endpoint serving a logical model, with live EWMA statistics."""
+
+    def __init__(
+        self,
+        provider: str,
+        model: str,
+        base_url: Optional[str] = None,
+        api_key_env: Optional[str] = None,
+        cost: float = 0.0,
+        alpha: float = 0.3,
+    ):
+        """
+        Initialize the target.
+
+        Args:
+            provider: Provider name (openai, anthropic, google)
+            model: Provider model name
+            base_url: Alternative (e.g. regional) API endpoint
+            api_key_env: Environment variable holding this endpoint's API key
+            cost: Relative cost (e.g. USD per 1K tokens)
+            alpha: EWMA smoothing factor
+
+        Raises:
+            ValueError: If the provider is not supported
+        """
+        self.provider = ModelProvider(provider)
+        self.model = model
+        self.base_url = base_url
+        self.api_key_env = api_key_env
+        self.cost = cost
+        self.alpha = alpha
+        self.name = f"{self.provider.value}:{model}" + (f"@{base_url}" if base_url else "")
+
+        # None until the first response: unknown targets are tried early
+        self.ewma_latency: Optional[float] = None
+        self.ewma_error = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], alpha: float = 0.3) -> "RouteTarget":
+        """Build a target from its LLM_ROUTES entry."""
+        return cls(
+            provider=data["provider"],
+            model=data["model"],
+            base_url=data.get("base_url"),
+            api_key_env=data.get("api_key_env"),
+            cost=float(data.get("cost", 0.0)),
+            alpha=alpha,
+        )
+
+    @property
+    def service(self) -> BaseLLMService:
+        """Shared service instance for this endpoint."""
+        api_key = os.environ.get(self.api_key_env) if self.api_key_env else None
+        return LLMServiceFactory.get_service(self.provider, self.base_url, api_key)
+
+    def is_open(self) -> bool:
+        """Is the endpoint's circuit open?"""
+        return self.service.resilience.breaker.is_open()
+
+    def score(self, error_penalty: float, cost_weight: float) -> float:
+        """Expected cost of sending a request here (lower is better)."""
+        latency = self.ewma_latency or 0.0
+        return latency * (1 + self.in_flight) + error_penalty * self.ewma_error + cost_weight * self.cost
+
+    def record(self, latency: Optional[float], failed: bool):
+        """Fold one outcome into the moving averages."""
+        self.requests += 1
+        if failed:
+            self.failures += 1
+        self.ewma_error += self.alpha * ((1.0 if failed else 0.0) - self.ewma_error)
+        if latency is not None:
+            if self.ewma_latency is None:
+                self.ewma_latency = latency
+            else:
+                self.ewma_latency += self.alpha * (latency - self.ewma_latency)
+
+    def stats(self, error_penalty: float, cost_weight: float) -> Dict[str, Any]:
+        """Live statistics of the target."""
+        return {
+            "target": self.name,
+            "circuit": self.service.resilience.breaker.state,
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 1) if self.ewma_latency is not None else None,
+            "error_rate": round(self.ewma_error, 3),
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "cost": self.cost,
+            "score": round(self.score(error_penalty, cost_weight), 4),
+        }
+
+
+class ModelRouter:
+    """
+    Sends requests for a logical model to the best of its targets.
+
+    Targets are ordered by EWMA latency scaled by their in-flight requests,
+    plus penalties for recent errors and cost. Targets whose circuit is open
+    are skipped. When a target fails with a retryable error the next one is
+    tried; only the last target retries on its own. Models without a route
+    go straight to the requested provider.
+    """
+
+    def __init__(self, routes: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        """
+        Initialize the router.
+
+        Args:
+            routes: Logical model name -> list of target definitions
+                (defaults to the LLM_ROUTES setting)
+        """
+        self.error_penalty = settings.LLM_ROUTER_ERROR_PENALTY
+        self.cost_weight = settings.LLM_ROUTER_COST_WEIGHT
+        alpha = settings.LLM_ROUTER_EWMA_ALPHA
+        routes = settings.LLM_ROUTES if routes is None else routes
+        self.routes: Dict[str, List[RouteTarget]] = {
+            name: [RouteTarget.from_dict(target, alpha) for target in targets]
+            for name, targets in routes.items()
+        }
+
+    def has_route(self, model: Optional[str]) -> bool:
+        """Is the model a routed logical model?"""
+        return model in self.routes
+
+    def candidates(self, model: str) -> List[RouteTarget]:
+        """
+        Targets of a route in the order they should be tried.
+
+        Raises:
+            CircuitOpenError: If every target's circuit is open
+        """
+        targets = [target for target in self.routes[model] if not target.is_open()]
+        if not targets:
+            retry_after = min(t.service.resilience.breaker.retry_after() for t in self.routes[model])
+            raise CircuitOpenError(model, retry_after)
+        return sorted(targets, key=lambda t: t.score(self.error_penalty, self.cost_weight))
+
+    def _plan(self, provider: ModelProvider, params: Dict[str, Any]) -> List[Tuple[Optional[RouteTarget], BaseLLMService, Dict[str, Any]]]:
+        """(target, service, params) attempts for a request, best first."""
+        model = params.get("model")
+        if not self.has_route(model):
+            return [(None, LLMServiceFactory.get_service(provider), params)]
+        return [(target, target.service, {**params, "model": target.model}) for target in self.candidates(model)]
+
+    @staticmethod
+    def _can_fail_over(error: ProviderError) -> bool:
+        """Would another target help? Not for requests the provider rejected as invalid."""
+        return error.retryable or isinstance(error, CircuitOpenError)
+
+    async def generate(self, provider: ModelProvider, prompt: str, **params) -> Tuple[str, Dict[str, Any]]:
+        """
+        Generate a response, failing over between the route's targets.
+
+        Args:
+            provider: Requested provider (used when the model has no route)
+            prompt: The processed prompt text
+            **params: Model parameters; ``model`` may name a route
+
+        Returns:
+            Tuple[str, Dict]: Response text and metadata (with provider and route)
+
+        Raises:
+            ProviderError: If every target failed
+        """
+        plan = self._plan(provider, params)
+        for index, (target, service, call_params) in enumerate(plan):
+            last = index == len(plan) - 1
+            token = max_retries_override.set(None if last else 0)
+            if target is not None:
+                target.in_flight += 1
+            start = time.monotonic()
+            try:
+                response_text, metadata = await service.generate_response(prompt, **call_params)
+            except ProviderError as e:
+                if target is not None:
+                    target.record(None, failed=self._can_fail_over(e))
+                if last or not self._can_fail_over(e):
+                    raise
+                continue
+            finally:
+                max_retries_override.reset(token)
+                if target is not None:
+                    target.in_flight -= 1
+
+            if target is not None:
+                target.record(time.monotonic() - start, failed=False)
+            metadata["provider"] = service.provider
+            metadata["route"] = target.name if target is not None else None
+            return response_text, metadata
+
+    async def stream(
+        self, provider: ModelProvider, prompt: str, metadata: Optional[Dict[str, Any]] = None, **params
+    ) -> AsyncIterator[str]:
+        """
+        Stream a response; fails over only before the first chunk is sent.
+
+        Args:
+            provider: Requested provider (used when the model has no route)
+            prompt: The processed prompt text
+            metadata: Dict filled with response metadata once the stream ends
+            **params: Model parameters; ``model`` may name a route
+
+        Yields:
+            str: Response text chunks
+        """
+        metadata = metadata if metadata is not None else {}
+        plan = self._plan(provider, params)
+        for index, (target, service, call_params) in enumerate(plan):
+            last = index == len(plan) - 1
+            started = False
+            first_chunk_latency = None
+            if target is not None:
+                target.in_flight += 1
+            start = time.monotonic()
+            try:
+                token = max_retries_override.set(None if last else 0)
+                try:
+                    stream = service.stream_response(prompt, metadata=metadata, **call_params)
+                    first = await stream.__anext__()
+                except StopAsyncIteration:
+                    first = None
+                finally:
+                    max_retries_override.reset(token)
+
+                started = True
+                # Streams are ranked by time to first chunk
+                first_chunk_latency = time.monotonic() - start
+                if first is not None:
+                    yield first
+                    async for chunk in stream:
+                        yield chunk
+            except ProviderError as e:
+                if target is not None:
+                    target.record(first_chunk_latency, failed=self._can_fail_over(e))
+                if started or last or not self._can_fail_over(e):
+                    raise
+                continue
+            finally:
+                if target is not None:
+                    target.in_flight -= 1
+
+            if target is not None:
+                target.record(first_chunk_latency, failed=False)
+            metadata["provider"] = service.provider
+            metadata["route"] = target.name if target is not None else None
+            return
+
+    def stats(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Per-route target statistics, in current preference order."""
+        return {
+            name: [
+                target.stats(self.error_penalty, self.cost_weight)
+                for target in sorted(targets, key=lambda t: t.score(self.error_penalty, self.cost_weight))
+            ]
+            for name, targets in self.routes.items()
+        }
+
+
+# Singleton instance
+model_router = ModelRouter()
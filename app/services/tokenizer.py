@@ -0,0 +1,181 @@
+"""Local prompt token counting with cached tokenizers.
+
+Counts use tiktoken when it is installed (exact for OpenAI models, a close
+approximation for the other providers) and a conservative
+characters-per-token estimate otherwise. Exact counts still come back from
+the provider in ``tokens_used``; these are for checks before dispatch.
+"""
+import hashlib
+import logging
+import math
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Generic encoding for models tiktoken does not know (Claude, Gemini)
+DEFAULT_ENCODING = "cl100k_base"
+
+
+def encoding_name(model: Optional[str]) -> str:
+    """
+    tiktoken encoding name for a model (DEFAULT_ENCODING for unknown models).
+
+    Model names come from clients, so tokenizers are cached by encoding
+    name: the cache stays bounded by the handful of tiktoken encodings.
+    """
+    if not model:
+        return DEFAULT_ENCODING
+    try:
+        from tiktoken import model as tiktoken_model
+    except ImportError:
+        return DEFAULT_ENCODING
+    name = tiktoken_model.MODEL_TO_ENCODING.get(model)
+    if name is not None:
+        return name
+    for prefix, name in tiktoken_model.MODEL_PREFIX_TO_ENCODING.items():
+        if model.startswith(prefix):
+            return name
+    return DEFAULT_ENCODING
+
+
+@lru_cache(maxsize=None)
+def load_encoding(name: str) -> Optional[Any]:
+    """
+    Load a tiktoken encoding once.
+
+    Args:
+        name: Encoding name (see ``encoding_name``)
+
+    Returns:
+        tiktoken Encoding, or None if tiktoken or its data is unavailable
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        # Encoding data could not be fetched (e.g. no network); fall back to estimates
+        logger.warning(f"Tokenizer {name} unavailable, estimating token counts: {e}")
+        return None
+
+
+class TokenCounter:
+    """
+    Counts and truncates text by tokens, caching counts of repeated texts.
+
+    System prompts and shared context repeat across requests, so counts are
+    kept in a small LRU keyed by the text's hash.
+    """
+
+    def __init__(self, cache_size: int = 2048, chars_per_token: float = 3.5):
+        """
+        Initialize the counter.
+
+        Args:
+            cache_size: Cached text counts
+            chars_per_token: Estimate used without a tokenizer (low values over-count, which is safer)
+        """
+        self.cache_size = cache_size
+        self.chars_per_token = chars_per_token
+        self._counts: "OrderedDict[Tuple[str, bytes], int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _encoding(self, model: Optional[str]) -> Optional[Any]:
+        return load_encoding(encoding_name(model))
+
+    def count(self, text: str, model: Optional[str] = None) -> int:
+        """
+        Number of tokens in a text for a model.
+
+        Args:
+            text: Text to count
+            model: Provider model name
+
+        Returns:
+            int: Token count (estimated without a tokenizer)
+        """
+        if not text:
+            return 0
+        encoding = self._encoding(model)
+        name = encoding.name if encoding is not None else "estimate"
+        key = (name, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest())
+        count = self._counts.get(key)
+        if count is not None:
+            self._counts.move_to_end(key)
+            self.hits += 1
+            return count
+
+        self.misses += 1
+        if encoding is not None:
+            count = len(encoding.encode(text, disallowed_special=()))
+        else:
+            count = math.ceil(len(text) / self.chars_per_token)
+        self._counts[key] = count
+        if len(self._counts) > self.cache_size:
+            self._counts.popitem(last=False)
+        return count
+
+    def truncate(self, text: str, max_tokens: int, model: Optional[str] = None) -> str:
+        """
+        Keep the last ``max_tokens`` tokens of a text (the question usually comes last).
+
+        Args:
+            text: Text to shorten
+            max_tokens: Tokens to keep
+            model: Provider model name
+
+        Returns:
+            str: The text itself if it already fits, else its tail
+        """
+        if max_tokens <= 0:
+            return ""
+        encoding = self._encoding(model)
+        if encoding is not None:
+            tokens = encoding.encode(text, disallowed_special=())
+            return text if len(tokens) <= max_tokens else encoding.decode(tokens[-max_tokens:])
+        keep = int(max_tokens * self.chars_per_token)
+        return text if len(text) <= keep else text[-keep:]
+
+    @staticmethod
+    def context_window(models: Iterable[Optional[str]]) -> int:
+        """
+        Smallest context window among the models a request may be sent to.
+
+        Models match MODEL_CONTEXT_WINDOWS by longest prefix; unknown models
+        get DEFAULT_CONTEXT_WINDOW.
+        """
+        windows = []
+        for model in models:
+            matches = [prefix for prefix in settings.MODEL_CONTEXT_WINDOWS if model and model.startswith(prefix)]
+            if matches:
+                windows.append(settings.MODEL_CONTEXT_WINDOWS[max(matches, key=len)])
+            else:
+                windows.append(settings.DEFAULT_CONTEXT_WINDOW)
+        return min(windows) if windows else settings.DEFAULT_CONTEXT_WINDOW
+
+    def warm_up(self, models: Iterable[str]) -> bool:
+        """Load the tokenizers of the given models; False if counts will be estimated."""
+        return all(self._encoding(model) is not None for model in models)
+
+    def stats(self) -> Dict[str, Any]:
+        """Tokenizer backend and count cache usage."""
+        return {
+            "backend": "tiktoken" if self._encoding(None) is not None else "estimate",
+            "cached": len(self._counts),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# Singleton instance
+token_counter = TokenCounter(
+    cache_size=settings.TOKEN_COUNT_CACHE_SIZE,
+    chars_per_token=settings.TOKEN_ESTIMATE_CHARS_PER_TOKEN,
+)
@@ -0,0 +1,52 @@
+"""Hızlı JSON kodlama/çözme katmanı (orjson varsa onu, yoksa standart json'u kullanır)."""
+import json
+from typing import Any, Union
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson isteğe bağlı
+    orjson = None
+
+# Tamsayı anahtarlı sözlükler standart json'daki gibi dizgiye çevrilir
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Nesneyi kompakt UTF-8 JSON baytlarına dönüştür.
+
+    Args:
+        obj: JSON'a dönüştürülecek nesne
+
+    Returns:
+        bytes: JSON belgesi
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(obj: Any) -> str:
+    """Nesneyi kompakt JSON metnine dönüştür (WebSocket metin çerçeveleri için)."""
+    return dumps(obj).decode("utf-8")
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    JSON belgesini çöz.
+
+    Raises:
+        json.JSONDecodeError: Belge geçerli JSON değilse (orjson hatası da bunun alt sınıfıdır)
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """Gövdesini hızlı JSON katmanıyla oluşturan JSONResponse."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,100 @@
+"""
+Measure the per-prompt cost of the entropy-based secret detector.
+
+Builds a deterministic prompt of the requested size (prose, code
+identifiers, commit hashes and a few embedded secrets) and times
+``EntropyFilter.filter_text`` on it with the numpy scorer and, when
+requested, the pure Python fallback. The target is below 1 ms per 8 KB.
+
+Usage:
+    python scripts/benchmark_entropy.py --size 8192 --repeat 500 --python
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import time
+from typing import Dict, List
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.filters import entropy_filters  # noqa: E402
+from app.filters.entropy_filters import EntropyFilter  # noqa: E402
+
+# Hedef: 8 KB'lık prompt başına 1 ms'nin altında ek maliyet
+TARGET_MS_PER_8KB = 1.0
+
+WORDS = (
+    "the request failed because the service returned an unexpected status when "
+    "we retried the deployment after updating the configuration for staging"
+).split()
+
+IDENTIFIERS = ("getUserAccountByIdentifier", "handle_request_timeout", "MAX_RETRY_ATTEMPTS", "PaymentGatewayClient")
+
+
+def sample_text(size: int = 8192, seed: int = 0) -> str:
+    """Return a deterministic prompt of ``size`` characters with a realistic candidate mix."""
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits
+    parts: List[str] = []
+    length = 0
+    while length <= size:
+        roll = rng.random()
+        if roll < 0.02:
+            part = "api_key = " + "".join(rng.choice(alphabet) for _ in range(40))
+        elif roll < 0.05:
+            part = "commit " + "".join(rng.choice("0123456789abcdef") for _ in range(40))
+        elif roll < 0.15:
+            part = rng.choice(IDENTIFIERS) + "()"
+        else:
+            part = rng.choice(WORDS)
+        parts.append(part)
+        length += len(part) + 1
+    return " ".join(parts)[:size]
+
+
+def measure(text: str, repeat: int = 200, use_numpy: bool = True) -> Dict[str, float]:
+    """
+    Time ``filter_text`` on a text.
+
+    Returns:
+        Dict[str, float]: Median and 95th percentile in milliseconds
+    """
+    entropy_filter = EntropyFilter()
+    with mock.patch.object(entropy_filters, "load_numpy", entropy_filters.load_numpy if use_numpy else lambda: None):
+        entropy_filter.filter_text(text)  # numpy ve regex önbelleklerini ısıt
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            entropy_filter.filter_text(text)
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {"median_ms": statistics.median(samples), "p95_ms": samples[int(len(samples) * 0.95) - 1]}
+
+
+def main(argv=None) -> int:
+    """Print the detector's cost per prompt."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=8192)
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--python", action="store_true", help="also time the pure Python scorer")
+    args = parser.parse_args(argv)
+
+    text = sample_text(args.size)
+    scorers = [("numpy", True)] if entropy_filters.load_numpy() is not None else []
+    if args.python or not scorers:
+        scorers.append(("python", False))
+
+    print(f"prompt: {len(text)} chars, target < {TARGET_MS_PER_8KB * len(text) / 8192:.2f} ms")
+    for name, use_numpy in scorers:
+        result = measure(text, args.repeat, use_numpy)
+        print(f"{name:>6}: median {result['median_ms']:.3f} ms  p95 {result['p95_ms']:.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
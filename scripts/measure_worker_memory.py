@@ -0,0 +1,144 @@
+"""
+Compare per-worker memory of ``uvicorn --workers`` and the prefork server.
+
+Starts each server mode, waits for it to answer, lets every worker serve a
+few filter requests and reads Rss/Pss/private memory from
+/proc/<pid>/smaps_rollup (Linux only).
+
+Usage:
+    python scripts/measure_worker_memory.py --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    "uvicorn": lambda port, workers: [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ],
+    "prefork": lambda port, workers: [
+        sys.executable, "-m", "app.prefork",
+        "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ],
+}
+
+SAMPLE_PROMPT = {
+    "content": "John Smith (john@example.com) from Acme Corp asked about invoice 4532-1234-5678-9014.",
+    "provider": "openai",
+}
+
+
+def read_memory(pid: int) -> Dict[str, int]:
+    """Return Rss, Pss and private memory of a process in KiB."""
+    values: Dict[str, int] = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "private": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+
+def worker_pids(master: int) -> List[int]:
+    """Return the worker processes of a server (children without helper processes)."""
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read()
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == master and b"resource_tracker" not in cmdline:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def wait_ready(process: subprocess.Popen, port: int, timeout: float) -> None:
+    """Poll the health endpoint until the server answers."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/api/v1/health", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"Server on port {port} did not become ready")
+
+
+def exercise(port: int, requests: int) -> None:
+    """Send filter requests so every worker touches the filter engines."""
+    for _ in range(requests):
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{port}/api/v1/prompt",
+            data=json.dumps(SAMPLE_PROMPT).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            urllib.request.urlopen(request, timeout=30).read()
+        except OSError:
+            # LLM çağrısı başarısız olabilir; filtreleme yine de çalışmıştır
+            pass
+
+
+def measure(mode: str, port: int, workers: int, requests: int, timeout: float) -> Dict[str, object]:
+    """Run one server mode and collect master and worker memory."""
+    process = subprocess.Popen(MODES[mode](port, workers), cwd=ROOT)
+    try:
+        wait_ready(process, port, timeout)
+        exercise(port, requests)
+        time.sleep(1.0)
+        master = read_memory(process.pid)
+        workers_memory = [read_memory(pid) for pid in worker_pids(process.pid)]
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+    total = {key: sum(m[key] for m in workers_memory) + master[key] for key in master}
+    count = max(len(workers_memory), 1)
+    return {
+        "mode": mode,
+        "workers": len(workers_memory),
+        "master_kib": master,
+        "avg_worker_kib": {key: sum(m[key] for m in workers_memory) // count for key in master},
+        "total_pss_kib": total["pss"],
+    }
+
+
+def main(argv=None) -> int:
+    """Measure every server mode and print the results as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    args = parser.parse_args(argv)
+
+    results = [
+        measure(mode, args.port + i, args.workers, args.requests, args.timeout)
+        for i, mode in enumerate(args.modes)
+    ]
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Profile the import-time cost of the application.
+
+Imports ``app.main`` in a fresh interpreter with ``-X importtime``, prints
+the total import time, the slowest top-level packages and whether any of
+the heavy dependencies that should load lazily were imported.
+
+Usage:
+    python scripts/profile_startup.py --top 25
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Bunlar ilk kullanımda veya ısınma aşamasında yüklenmeli, import sırasında değil
+LAZY_MODULES = ("spacy", "numpy", "httpx", "openai", "anthropic", "google.generativeai", "sqlite3")
+
+PROBE = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "import app.main\n"
+    "elapsed = time.perf_counter() - start\n"
+    f"lazy = [m for m in {LAZY_MODULES!r} if m in sys.modules]\n"
+    "print(json.dumps({'seconds': elapsed, 'loaded': lazy}))\n"
+)
+
+
+def run_probe(importtime: bool = True) -> Tuple[Dict[str, object], str]:
+    """
+    Import the app in a fresh interpreter.
+
+    Args:
+        importtime: Also collect the ``-X importtime`` log (adds some overhead)
+
+    Returns:
+        Tuple[Dict[str, object], str]: Import seconds with the lazy modules loaded, and the importtime log
+    """
+    flags = ["-X", "importtime"] if importtime else []
+    result = subprocess.run(
+        [sys.executable, *flags, "-W", "ignore", "-c", PROBE],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def parse_importtime(log: str) -> List[Tuple[str, int]]:
+    """Return (top-level package, self time in microseconds) sorted by cost."""
+    totals: Dict[str, int] = defaultdict(int)
+    for line in log.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        totals[name.strip().split(".")[0]] += int(self_us)
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def main(argv=None) -> int:
+    """Print the import profile of app.main."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    summary, log = run_probe()
+    print(f"import app.main: {summary['seconds']:.3f}s")
+    print(f"lazy modules loaded at import: {summary['loaded'] or 'none'}")
+    print()
+    for name, self_us in parse_importtime(log)[:args.top]:
+        print(f"{self_us / 1000:10.1f} ms  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
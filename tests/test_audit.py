@@ -0,0 +1,100 @@
+"""Audit pipeline tests."""
+import asyncio
+import gzip
+import json
+import os
+import sqlite3
+
+from app.core.audit import AuditLog, NDJSONSink, SQLiteSink
+
+
+class MemorySink:
+    """Sink keeping written batches in memory."""
+
+    def __init__(self):
+        self.batches = []
+        self.closed = False
+
+    def write(self, events):
+        self.batches.append(events)
+
+    def close(self):
+        self.closed = True
+
+
+def record(log: AuditLog, request_id: str):
+    log.record(request_id, "u1", "default", 1, "request", {"EMAIL": 2, "PERSON": 1})
+
+
+class TestAuditLog:
+    """Test class for the buffered audit log."""
+
+    def test_drop_policies(self):
+        """Test that a full buffer drops the oldest or the newest event and counts it."""
+        oldest = AuditLog(capacity=2, drop_policy="drop_oldest")
+        newest = AuditLog(capacity=2, drop_policy="drop_newest")
+        for request_id in ("r1", "r2", "r3"):
+            record(oldest, request_id)
+            record(newest, request_id)
+        
+        assert [e["request_id"] for e in oldest._buffer] == ["r2", "r3"]
+        assert [e["request_id"] for e in newest._buffer] == ["r1", "r2"]
+        assert oldest.stats()["dropped"] == newest.stats()["dropped"] == 1
+
+    def test_writer_batches_and_flushes_on_stop(self):
+        """Test that the writer flushes full batches early and the rest on stop."""
+        sink = MemorySink()
+        log = AuditLog(sink=sink, batch_size=2, flush_interval=60)
+        
+        async def scenario():
+            log.start()
+            for request_id in ("r1", "r2", "r3"):
+                record(log, request_id)
+            await asyncio.sleep(0.05)
+            assert [len(batch) for batch in sink.batches] == [2]
+            await log.stop()
+        
+        asyncio.run(scenario())
+        
+        assert [len(batch) for batch in sink.batches] == [2, 1]
+        assert sink.closed
+        assert log.stats()["written"] == 3
+        assert sink.batches[0][0]["total"] == 3
+
+
+class TestAuditSinks:
+    """Test class for the file sinks."""
+
+    def test_ndjson_sink_appends_and_rotates(self, tmp_path):
+        """Test that batches are readable gzip NDJSON and old files rotate out."""
+        sink = NDJSONSink(str(tmp_path), max_bytes=1, backups=2)
+        for index in range(3):
+            sink.write([{"request_id": f"r{index}", "entities": {"EMAIL": 1}}])
+        
+        name = os.path.basename(sink.path)
+        assert sorted(os.listdir(tmp_path)) == [f"{name}.1", f"{name}.2"]
+        with gzip.open(tmp_path / f"{name}.1", "rt") as f:
+            assert json.loads(f.readline())["request_id"] == "r2"
+
+    def test_ndjson_sink_file_per_worker(self, tmp_path, monkeypatch):
+        """Test that each worker process appends to and rotates its own file."""
+        sink = NDJSONSink(str(tmp_path))
+        monkeypatch.setattr("app.core.audit.worker_id", lambda: "host:101")
+        sink.write([{"request_id": "r1"}])
+        monkeypatch.setattr("app.core.audit.worker_id", lambda: "host:102")
+        sink.write([{"request_id": "r2"}])
+        
+        assert sorted(os.listdir(tmp_path)) == ["audit-host-101.ndjson.gz", "audit-host-102.ndjson.gz"]
+
+    def test_sqlite_sink(self, tmp_path):
+        """Test that events land in the audit_events table."""
+        path = str(tmp_path / "audit.db")
+        sink = SQLiteSink(path)
+        sink.write([{
+            "ts": 1.0, "request_id": "r1", "user_id": "u1", "policy": "default",
+            "policy_version": 1, "direction": "request", "entities": {"EMAIL": 1}, "total": 1,
+        }])
+        sink.close()
+        
+        row = sqlite3.connect(path).execute("SELECT request_id, entities, total FROM audit_events").fetchone()
+        assert row == ("r1", '{"EMAIL": 1}', 1)
@@ -0,0 +1,169 @@
+"""Browser extension WebSocket protocol tests."""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.proxy import browser_extension
+from app.proxy.connection_registry import CLOSE_IDLE_TIMEOUT, CLOSE_REPLACED, ConnectionRegistry
+from app.server import build_config
+
+
+@pytest.fixture
+def slow_mcp_handler(monkeypatch):
+    """Replace the MCP handler with one whose latency is set per request."""
+    async def process_request(request_data, policy=None):
+        await asyncio.sleep(request_data["delay"])
+        return {"echo": request_data["delay"]}
+    
+    monkeypatch.setattr(browser_extension.mcp_handler, "process_request", process_request)
+
+
+class TestConcurrentMessages:
+    """Test class for multiplexed prompt handling."""
+
+    def test_out_of_order_responses(self, slow_mcp_handler):
+        """Test that a slow prompt does not block pings or faster prompts."""
+        client = TestClient(app)
+        with client.websocket_connect("/ws/test-client") as websocket:
+            websocket.send_json({"type": "prompt", "id": "slow", "data": {"delay": 0.3}})
+            websocket.send_json({"type": "prompt", "id": "fast", "data": {"delay": 0.01}})
+            websocket.send_json({"type": "ping", "id": "p1"})
+            
+            received = [websocket.receive_json() for _ in range(3)]
+        
+        assert [message["id"] for message in received] == ["p1", "fast", "slow"]
+        assert received[1]["type"] == "response"
+
+    def test_non_object_message_keeps_connection(self, slow_mcp_handler):
+        """Test that a JSON array or string is rejected without cancelling in-flight prompts."""
+        client = TestClient(app)
+        with client.websocket_connect("/ws/test-client") as websocket:
+            websocket.send_json({"type": "prompt", "id": "p1", "data": {"delay": 0.1}})
+            websocket.send_text("[]")
+            websocket.send_text('"x"')
+            
+            received = [websocket.receive_json() for _ in range(3)]
+        
+        assert [message["type"] for message in received] == ["error", "error", "response"]
+        assert received[2]["id"] == "p1"
+
+    def test_cancel(self, slow_mcp_handler):
+        """Test cancelling an in-flight prompt."""
+        client = TestClient(app)
+        with client.websocket_connect("/ws/test-client") as websocket:
+            websocket.send_json({"type": "prompt", "id": "long", "data": {"delay": 5}})
+            websocket.send_json({"type": "cancel", "id": "long"})
+            
+            message = websocket.receive_json()
+        
+        assert message == {"type": "cancelled", "id": "long"}
+
+    def test_streaming_response(self, monkeypatch):
+        """Test that streamed prompts send deltas followed by a done message."""
+        async def stream_request(request_data, policy=None):
+            yield "Merhaba "
+            yield "[KIŞI]."
+            yield {"request_id": "r1", "filtered_output": True}
+        
+        monkeypatch.setattr(browser_extension.mcp_handler, "stream_request", stream_request)
+        
+        client = TestClient(app)
+        with client.websocket_connect("/ws/test-client") as websocket:
+            websocket.send_json({"type": "prompt", "id": "s1", "stream": True, "data": {}})
+            
+            received = [websocket.receive_json() for _ in range(3)]
+        
+        assert [message["type"] for message in received] == ["response.delta", "response.delta", "response.done"]
+        assert "".join(message["delta"] for message in received[:2]) == "Merhaba [KIŞI]."
+        assert received[2]["data"]["request_id"] == "r1"
+
+
+class FakeWebSocket:
+    """Minimal WebSocket stand-in recording sent messages and close codes."""
+    
+    def __init__(self):
+        self.sent = []
+        self.close_code = None
+    
+    async def send_text(self, data):
+        self.sent.append(data)
+    
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+class TestConnectionRegistry:
+    """Test class for the WebSocket connection registry."""
+
+    def test_duplicate_client_id_replaces_connection(self):
+        """Test that reconnecting with the same client_id closes the old socket."""
+        async def scenario():
+            registry = ConnectionRegistry(max_connections=10)
+            old, new = FakeWebSocket(), FakeWebSocket()
+            old_state = await registry.register("c1", old)
+            await registry.register("c1", new)
+            
+            assert old.close_code == CLOSE_REPLACED
+            assert len(registry) == 1
+            assert registry.unregister("c1", old_state) is False
+            assert registry.get("c1").websocket is new
+            await registry.stop()
+        
+        asyncio.run(scenario())
+
+    def test_load_shedding(self):
+        """Test that registrations beyond the limit are refused."""
+        async def scenario():
+            registry = ConnectionRegistry(max_connections=1)
+            assert await registry.register("c1", FakeWebSocket()) is not None
+            assert await registry.register("c2", FakeWebSocket()) is None
+            assert registry.stats()["shed_total"] == 1
+            await registry.stop()
+        
+        asyncio.run(scenario())
+
+    def test_quiet_clients_are_kept(self):
+        """Test that a silent client gets no application frames and is not evicted by default."""
+        async def scenario():
+            registry = ConnectionRegistry(heartbeat_interval=10)
+            quiet = FakeWebSocket()
+            state = await registry.register("quiet", quiet)
+            state.last_seen -= 3600
+            
+            await registry.sweep()
+            
+            assert quiet.sent == []
+            assert quiet.close_code is None
+            assert registry.get("quiet") is state
+            await registry.stop()
+        
+        asyncio.run(scenario())
+
+    def test_idle_eviction_when_configured(self):
+        """Test that an idle timeout, when set, closes connections that sent nothing."""
+        async def scenario():
+            registry = ConnectionRegistry(heartbeat_interval=10, idle_timeout=30)
+            active, dead = FakeWebSocket(), FakeWebSocket()
+            await registry.register("active", active)
+            dead_state = await registry.register("dead", dead)
+            dead_state.last_seen -= 60
+            
+            await registry.sweep()
+            
+            assert active.close_code is None
+            assert dead.close_code == CLOSE_IDLE_TIMEOUT
+            assert registry.get("dead") is None
+            assert registry.stats()["evicted_total"] == 1
+            await registry.stop()
+        
+        asyncio.run(scenario())
+
+    def test_server_sends_protocol_pings(self):
+        """Test that dead peers are detected with WebSocket ping frames, not application messages."""
+        config = build_config(app)
+        
+        assert config.ws_ping_interval == settings.WS_HEARTBEAT_INTERVAL
+        assert config.ws_ping_timeout == settings.WS_PING_TIMEOUT
@@ -0,0 +1,116 @@
+"""Request coalescing tests."""
+import asyncio
+
+from app.core import prompt_service as prompt_service_module
+from app.core.coalescing import SingleFlight
+from app.core.prompt_service import PromptService
+from app.filters.filter_manager import FilterManager
+from app.schemas.request import PromptRequest
+
+
+def test_concurrent_calls_share_one_result():
+    """Test that identical concurrent calls run once and later calls run again."""
+    flight = SingleFlight()
+    calls = []
+    
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+    
+    async def scenario():
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+        return results, await flight.do("key", work)
+    
+    results, later = asyncio.run(scenario())
+    
+    assert results == [1] * 5
+    assert later == 2
+    assert flight.stats() == {"in_flight": 0, "leaders": 2, "followers": 4}
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    """Test that the shared call survives one waiter leaving and stops when all leave."""
+    flight = SingleFlight()
+    
+    async def scenario():
+        release = asyncio.Event()
+        
+        async def work():
+            await release.wait()
+            return "ok"
+        
+        first = asyncio.create_task(flight.do("key", work))
+        second = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        result = await second
+        
+        orphan = asyncio.create_task(flight.do("other", asyncio.Event().wait))
+        await asyncio.sleep(0)
+        orphan.cancel()
+        await asyncio.sleep(0)
+        return first.cancelled(), result
+    
+    assert asyncio.run(scenario()) == (True, "ok")
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_prompt_service_coalesces_deterministic_requests(monkeypatch):
+    """Test that only temperature 0 duplicates share a provider call."""
+    calls = []
+    
+    async def generate(provider, prompt, **params):
+        calls.append(prompt)
+        await asyncio.sleep(0.01)
+        return "Yanıt", {"model": "gpt-4"}
+    
+    monkeypatch.setattr(prompt_service_module.model_router, "generate", generate)
+    monkeypatch.setattr(prompt_service_module.settings, "ENABLE_NER_FILTERS", False)
+    manager = FilterManager()
+    monkeypatch.setattr(prompt_service_module.policy_registry, "get_manager", lambda name=None: manager)
+    service = PromptService()
+    
+    async def burst(temperature):
+        requests = [
+            PromptRequest(content="Bana ali@example.com adresinden yazın", user_id=f"u{i}", temperature=temperature)
+            for i in range(4)
+        ]
+        return await asyncio.gather(*(service.process_prompt(request) for request in requests))
+    
+    responses = asyncio.run(burst(0.0))
+    assert len(calls) == 1
+    assert "ali@example.com" not in calls[0]
+    assert {response.response_content for response in responses} == {"Yanıt"}
+    assert len({response.request_id for response in responses}) == 4
+    assert service.coalescing_stats()["filter"]["followers"] >= 3
+    
+    asyncio.run(burst(0.7))
+    assert len(calls) == 5
+
+
+def test_shared_provider_call_is_charged_once(monkeypatch):
+    """Test that a coalesced provider call is charged to the user who started it only."""
+    charged = []
+    
+    async def generate(provider, prompt, **params):
+        await asyncio.sleep(0.01)
+        return "Yanıt", {"model": "gpt-4", "tokens": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}}
+    
+    monkeypatch.setattr(prompt_service_module.model_router, "generate", generate)
+    monkeypatch.setattr(prompt_service_module.token_usage, "record", lambda user, *tokens: charged.append((user, *tokens)))
+    monkeypatch.setattr(prompt_service_module.settings, "ENABLE_NER_FILTERS", False)
+    manager = FilterManager()
+    monkeypatch.setattr(prompt_service_module.policy_registry, "get_manager", lambda name=None: manager)
+    service = PromptService()
+    requests = [PromptRequest(content="Merhaba", user_id=f"u{i}", temperature=0.0) for i in range(3)]
+    
+    async def burst():
+        return await asyncio.gather(*(service.process_prompt(request) for request in requests))
+    
+    responses = asyncio.run(burst())
+    
+    assert charged == [("u0", 10, 5)]
+    assert all(response.tokens_used["total_tokens"] == 15 for response in responses)
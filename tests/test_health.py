@@ -0,0 +1,85 @@
+"""Health subsystem tests."""
+import asyncio
+import threading
+import time
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.core import health
+from app.core.health import CACHE_KEY, HealthMonitor, health_monitor
+from app.core.inflight import inflight
+from app.core.shared_state import InMemoryBackend
+from app.filters.filter_manager import FilterManager, filter_queue_depth
+from app.main import app
+
+
+def test_probe_classification(monkeypatch):
+    """Test that probe responses map to up, degraded and down."""
+    statuses = {"api.openai.com": 200, "api.anthropic.com": 429, "generativelanguage.googleapis.com": 503}
+    transport = httpx.MockTransport(lambda request: httpx.Response(statuses[request.url.host]))
+    monkeypatch.setattr(health, "_api_key", lambda provider: "key")
+    monitor = HealthMonitor()
+    
+    async def scenario():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return dict([await monitor._probe(client, name) for name in health.PROBE_ENDPOINTS])
+    
+    results = asyncio.run(scenario())
+    
+    assert results["openai"]["status"] == "up"
+    assert results["anthropic"]["status"] == "degraded"
+    assert results["google"]["status"] == "down"
+
+
+def test_refresh_reuses_shared_result(monkeypatch):
+    """Test that a fresh probe result from another worker is reused without probing."""
+    backend = InMemoryBackend()
+    monkeypatch.setattr(health, "shared_state", backend)
+    monitor = HealthMonitor(interval=30)
+    providers = {"openai": {"status": "up", "latency_ms": 12.0}}
+    
+    async def scenario():
+        await backend.set_json(CACHE_KEY, {"checked_at": time.time(), "providers": providers})
+        await monitor.refresh()
+    
+    asyncio.run(scenario())
+    assert monitor.providers == providers
+
+
+def test_liveness_and_readiness(monkeypatch):
+    """Test that liveness is unconditional and readiness reflects saturation."""
+    for name in ("ENABLE_NER_FILTERS", "STARTUP_WARM_UP", "HEALTH_PROBE_ENABLED", "AUDIT_ENABLED"):
+        monkeypatch.setattr(health.settings, name, False)
+    # The shutdown drain must not leak into later tests
+    monkeypatch.setattr(inflight, "draining", False)
+    monkeypatch.setattr(health_monitor, "phase", health_monitor.phase)
+    
+    with TestClient(app) as client:
+        assert client.get("/api/v1/health/live").json() == {"status": "alive"}
+        assert client.get("/api/v1/health/ready").status_code == 200
+        
+        monkeypatch.setattr(health, "filter_queue_depth", lambda: 1000)
+        response = client.get("/api/v1/health/ready")
+    
+    assert response.status_code == 503
+    assert response.json()["checks"]["filter_executor"] == {"ok": False, "queued": 1000}
+
+
+def test_filter_queue_depth_counts_waiting_jobs(monkeypatch):
+    """Test that jobs beyond the worker threads are reported as queued until they finish."""
+    monkeypatch.setattr(health.settings, "FILTER_WORKER_THREADS", 2)
+    release = threading.Event()
+    manager = FilterManager()
+    manager.filter_text = lambda text: (release.wait(5), text)[1]
+    
+    async def scenario():
+        jobs = [asyncio.create_task(manager.filter_text_async("text")) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        queued = filter_queue_depth()
+        release.set()
+        await asyncio.gather(*jobs)
+        return queued
+    
+    assert asyncio.run(scenario()) == 3
+    assert filter_queue_depth() == 0
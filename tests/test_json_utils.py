@@ -0,0 +1,55 @@
+"""Fast JSON layer and response detail level tests."""
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from app.core import prompt_service as prompt_service_module
+from app.core.config import DetailLevel, Settings
+from app.filters.filter_manager import FilterManager
+from app.main import app
+from app.utils import json_utils
+
+
+def test_dumps_is_compact_and_keeps_unicode():
+    """Test that output has no whitespace and non-ASCII text is not escaped."""
+    data = json_utils.dumps({"metin": "güvenli", 1: [1, 2]})
+
+    assert data == '{"metin":"güvenli","1":[1,2]}'.encode("utf-8")
+    assert json_utils.loads(data) == {"metin": "güvenli", "1": [1, 2]}
+
+
+def test_prompt_response_detail_levels(monkeypatch):
+    """Test that texts are only echoed at the full detail level."""
+    async def generate(provider, prompt, **params):
+        return "Tamam, john@example.com adresine yazıyorum.", {"model": "gpt-4"}
+
+    monkeypatch.setattr(prompt_service_module.model_router, "generate", generate)
+    # Regex filters only (no spaCy model needed)
+    monkeypatch.setattr(prompt_service_module.settings, "ENABLE_NER_FILTERS", False)
+    manager = FilterManager()
+    monkeypatch.setattr(prompt_service_module.policy_registry, "get_manager", lambda name=None: manager)
+    client = TestClient(app)
+    payload = {"content": "Bana john@example.com adresinden ulaşın", "user_id": "json-test"}
+
+    response = client.post("/api/v1/prompt", json=payload, headers={"X-Request-ID": "req-42"})
+    summary = response.json()
+    # The id is server generated; the caller's X-Request-ID is only logged
+    assert summary["request_id"] == response.headers["X-Request-ID"] != "req-42"
+    assert summary["request_filtered"]["original_text"] is None
+    assert summary["request_filtered"]["masked_elements"] is None
+    assert summary["response_filtered"]["entity_counts"]["EMAIL"] == 1
+    assert "john@example.com" not in summary["response_content"]
+
+    full = client.post("/api/v1/prompt", json={**payload, "detail_level": "full"}).json()
+    assert full["request_filtered"]["original_text"] == payload["content"]
+    assert full["response_filtered"]["masked_elements"][0]["type"] == "EMAIL"
+
+
+def test_response_detail_level_setting_is_validated(monkeypatch):
+    """Test that an unknown default detail level fails when settings load, not per request."""
+    monkeypatch.setenv("RESPONSE_DETAIL_LEVEL", "spans")
+    assert Settings().RESPONSE_DETAIL_LEVEL is DetailLevel.SPANS
+
+    monkeypatch.setenv("RESPONSE_DETAIL_LEVEL", "compact")
+    with pytest.raises(ValidationError):
+        Settings()
@@ -0,0 +1,152 @@
+"""Application lifespan and graceful shutdown tests."""
+import asyncio
+import json
+import os
+import signal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import lifespan
+from app.core.health import health_monitor
+from app.core.inflight import InFlightTracker, inflight
+from app.main import app
+from app.prefork import bind_socket
+from app.proxy import browser_extension
+from app.server import DrainingServer, build_config
+
+
+def quiet_startup(monkeypatch):
+    """Disable background services that would touch the network or disk."""
+    for name in ("ENABLE_NER_FILTERS", "HEALTH_PROBE_ENABLED", "AUDIT_ENABLED"):
+        monkeypatch.setattr(lifespan.settings, name, False)
+    # Kapanış durumu sonraki testlere taşınmasın
+    monkeypatch.setattr(inflight, "draining", False)
+    monkeypatch.setattr(health_monitor, "phase", health_monitor.phase)
+
+
+def test_ready_only_after_warm_up(monkeypatch):
+    """Test that readiness reports starting until the warm-up phase finishes."""
+    quiet_startup(monkeypatch)
+    monkeypatch.setattr(lifespan.settings, "STARTUP_WARM_UP", True)
+    
+    release = asyncio.Event()
+    
+    async def slow_warm_up():
+        await release.wait()
+        return {"profiles": [], "models": [], "providers": [], "seconds": 0.0}
+    
+    monkeypatch.setattr(lifespan, "warm_up", slow_warm_up)
+    
+    with TestClient(app) as client:
+        response = client.get("/api/v1/health/ready")
+        assert response.status_code == 503
+        assert response.json()["checks"]["lifecycle"] == {"ok": False, "phase": "starting"}
+        
+        client.portal.call(release.set)
+        client.portal.call(asyncio.sleep, 0.05)
+        assert client.get("/api/v1/health/ready").status_code == 200
+    
+    assert health_monitor.phase == "draining"
+
+
+def test_shutdown_closes_resources(monkeypatch):
+    """Test that shutdown drains and closes the proxy connection pool."""
+    quiet_startup(monkeypatch)
+    monkeypatch.setattr(lifespan.settings, "STARTUP_WARM_UP", False)
+    closed = []
+    
+    async def close():
+        closed.append("proxy")
+    
+    monkeypatch.setattr(lifespan.proxy_server, "close", close)
+    
+    with TestClient(app):
+        assert health_monitor.phase == "ready"
+    
+    assert closed == ["proxy"]
+    assert not inflight.accepting
+
+
+def test_drain_waits_for_in_flight_work():
+    """Test that draining waits for tracked work and times out when it does not finish."""
+    tracker = InFlightTracker()
+    
+    async def scenario():
+        finished = asyncio.Event()
+        
+        async def work():
+            async with tracker.track():
+                await finished.wait()
+        
+        task = asyncio.create_task(work())
+        await asyncio.sleep(0)
+        tracker.start_draining()
+        
+        timed_out = not await tracker.wait_idle(0.01)
+        finished.set()
+        drained = await tracker.wait_idle(1.0)
+        await task
+        return timed_out, drained
+    
+    assert asyncio.run(scenario()) == (True, True)
+    assert tracker.stats() == {"active": 0, "draining": True}
+
+
+def test_sigterm_drains_before_uvicorn_closes_connections(monkeypatch):
+    """Test that a prompt running at SIGTERM is answered before uvicorn closes its WebSocket."""
+    websockets = pytest.importorskip("websockets")
+    quiet_startup(monkeypatch)
+    monkeypatch.setattr(lifespan.settings, "STARTUP_WARM_UP", False)
+    events = []
+    shutdown = lifespan.resources.shutdown
+    
+    async def recording_shutdown():
+        events.append("lifespan shutdown")
+        await shutdown()
+    
+    monkeypatch.setattr(lifespan.resources, "shutdown", recording_shutdown)
+    
+    async def scenario():
+        release = asyncio.Event()
+        
+        async def process_request(request_data, policy=None):
+            events.append("prompt started")
+            await release.wait()
+            return {"ok": True}
+        
+        monkeypatch.setattr(browser_extension.mcp_handler, "process_request", process_request)
+        sock = bind_socket("127.0.0.1", 0)
+        port = sock.getsockname()[1]
+        server = DrainingServer(build_config(app, graceful_timeout=1.0, log_level="warning"))
+        serving = asyncio.create_task(server.serve(sockets=[sock]))
+        while not server.started:
+            await asyncio.sleep(0.01)
+        
+        async with websockets.connect(f"ws://127.0.0.1:{port}/ws/drain-client") as websocket:
+            await websocket.send(json.dumps({"type": "prompt", "id": "p1", "data": {}}))
+            while "prompt started" not in events:
+                await asyncio.sleep(0.01)
+            
+            os.kill(os.getpid(), signal.SIGTERM)
+            await asyncio.sleep(0.2)
+            assert health_monitor.phase == "draining"
+            assert not server.should_exit
+            
+            # New prompts are refused while the running one may still finish
+            await websocket.send(json.dumps({"type": "prompt", "id": "p2", "data": {}}))
+            refused = json.loads(await websocket.recv())
+            release.set()
+            answered = json.loads(await websocket.recv())
+            events.append("response")
+            await websocket.wait_closed()
+        
+        await serving
+        return refused, answered, websocket.close_code
+    
+    refused, answered, close_code = asyncio.run(scenario())
+    
+    assert refused["id"] == "p2" and refused["type"] == "error"
+    assert answered == {"type": "response", "id": "p1", "data": {"ok": True}}
+    assert close_code == 1012
+    assert events == ["prompt started", "response", "lifespan shutdown"]
@@ -0,0 +1,60 @@
+"""Structured logging tests."""
+import logging
+import uuid
+
+from fastapi.testclient import TestClient
+from loguru import logger
+
+from app.core.log import SuccessSampler
+from app.main import app
+
+
+def capture():
+    """Add a loguru sink collecting records; returns (records, sink id)."""
+    records = []
+    sink_id = logger.add(lambda message: records.append(message.record), level="INFO")
+    return records, sink_id
+
+
+def test_request_id_is_generated_and_client_id_logged():
+    """Test that the response carries a server id and a valid client id is only logged."""
+    records, sink_id = capture()
+    try:
+        client = TestClient(app)
+        response = client.get("/api/v1/health/live", headers={"X-Request-ID": "abc-123"})
+        forged = client.get("/api/v1/health/live", headers={"X-Request-ID": "x" * 65})
+        logger.complete()
+    finally:
+        logger.remove(sink_id)
+    
+    request_id = response.headers["X-Request-ID"]
+    assert request_id != "abc-123"
+    assert uuid.UUID(request_id)
+    assert "X-Process-Time" in response.headers
+    access = [r for r in records if r["message"] == "request"]
+    assert access[-2]["extra"]["request_id"] == request_id
+    assert access[-2]["extra"]["client_request_id"] == "abc-123"
+    assert access[-1]["extra"]["request_id"] == forged.headers["X-Request-ID"]
+    assert "client_request_id" not in access[-1]["extra"]
+    assert access[-1]["extra"]["status"] == 200
+
+
+def test_stdlib_logging_is_routed_to_loguru():
+    """Test that stdlib logger records reach the loguru sinks."""
+    records, sink_id = capture()
+    try:
+        logging.getLogger("app.proxy.test").warning("stdlib kaydı")
+        logger.complete()
+    finally:
+        logger.remove(sink_id)
+    
+    assert any(r["message"] == "stdlib kaydı" and r["level"].name == "WARNING" for r in records)
+
+
+def test_sampler_thins_success_logs_above_threshold():
+    """Test that every request is logged below the threshold and a sample above it."""
+    sampler = SuccessSampler(threshold_rps=10, sample_rate=0.0)
+    decisions = [sampler.should_log() for _ in range(20)]
+    
+    assert decisions[:10] == [True] * 10
+    assert not any(decisions[10:])
@@ -0,0 +1,32 @@
+"""Prefork preloading tests."""
+import gc
+
+from app.core.policy_registry import policy_registry
+from app.core.preload import freeze_heap, preload_filters
+from app.prefork import bind_socket
+
+
+def test_preload_builds_every_profile():
+    """Test that preloading builds a filter engine for each policy profile."""
+    summary = preload_filters()
+    
+    assert summary["profiles"] == list(policy_registry.profiles)
+    assert {stats["profile"] for stats in policy_registry.stats()} >= set(policy_registry.profiles)
+
+
+def test_freeze_heap():
+    """Test that live objects are moved to the permanent generation."""
+    try:
+        assert freeze_heap() > 0
+    finally:
+        gc.unfreeze()
+
+
+def test_bind_socket_is_inheritable():
+    """Test that workers can inherit the listening socket."""
+    sock = bind_socket("127.0.0.1", 0)
+    try:
+        assert sock.get_inheritable()
+        assert sock.getsockname()[1] > 0
+    finally:
+        sock.close()
@@ -0,0 +1,113 @@
+"""Prompt caching hint tests."""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.services import prompt_cache as prompt_cache_module
+from app.services.llm_service import AnthropicService, OpenAIService
+from app.services.prompt_cache import PrefixTracker
+
+CONTEXT = "Şirket el kitabı bölüm 1. " * 40
+
+
+def test_prefix_becomes_stable_after_repeats():
+    """Test that a prefix is marked only once it repeats, on block boundaries."""
+    tracker = PrefixTracker(min_chars=100, block_chars=100, min_repeats=2)
+    
+    assert tracker.stable_prefix(CONTEXT + "Soru A?", "m") == (0, "")
+    stable, key = tracker.stable_prefix(CONTEXT + "Soru B?", "m")
+    
+    assert stable == len(CONTEXT) // 100 * 100
+    assert key
+    assert tracker.stable_prefix(CONTEXT + "Soru C?", "other-model")[0] == 0
+    assert tracker.stable_prefix("kısa", "m") == (0, "")
+
+
+def test_prefix_count_expires():
+    """Test that a sighting older than the TTL does not count."""
+    tracker = PrefixTracker(min_chars=100, block_chars=100, min_repeats=2, ttl=0.0)
+    tracker.stable_prefix(CONTEXT, "m")
+    
+    assert tracker._observe(next(iter(tracker._seen)), now=10**9) is False
+
+
+def test_usage_hit_rate():
+    """Test that per-response and per-provider cache hit rates are reported."""
+    tracker = PrefixTracker()
+    tokens = tracker.record_usage("anthropic", 1000, 50, cached_tokens=800, cache_creation_tokens=100)
+    
+    assert tokens["cache_hit_rate"] == 0.8
+    assert tokens["total_tokens"] == 1050
+    assert tracker.stats()["providers"]["anthropic"]["cache_hit_rate"] == 0.8
+
+
+def test_anthropic_marks_repeated_prefixes(monkeypatch):
+    """Test that repeated system prompts and context become cache_control blocks."""
+    tracker = PrefixTracker(min_chars=100, block_chars=100, min_repeats=2)
+    monkeypatch.setattr("app.services.llm_service.prompt_cache", tracker)
+    service = AnthropicService(api_key="key")
+    kwargs = {"model": "claude", "system_prompt": CONTEXT}
+    
+    first = service._create_params(CONTEXT + "Soru A?", **kwargs)
+    assert first["system"] == CONTEXT
+    
+    second = service._create_params(CONTEXT + "Soru B?", **kwargs)
+    system, content = second["system"], second["messages"][0]["content"]
+    assert system == [{"type": "text", "text": CONTEXT, "cache_control": {"type": "ephemeral"}}]
+    assert content[0]["cache_control"] == {"type": "ephemeral"}
+    assert "".join(block["text"] for block in content) == CONTEXT + "Soru B?"
+
+
+def test_openai_cache_key_and_usage(monkeypatch):
+    """Test that repeated prefixes get a stable cache key and cached tokens are read."""
+    tracker = PrefixTracker(min_chars=100, block_chars=100, min_repeats=2)
+    monkeypatch.setattr("app.services.llm_service.prompt_cache", tracker)
+    service = OpenAIService(api_key="key")
+    
+    assert service._cache_params("gpt-4", CONTEXT + "A?", None) == {}
+    key = service._cache_params("gpt-4", CONTEXT + "B?", None)["extra_body"]["prompt_cache_key"]
+    assert service._cache_params("gpt-4", CONTEXT + "C?", None)["extra_body"]["prompt_cache_key"] == key
+    
+    usage = {"prompt_tokens": 2000, "completion_tokens": 10, "prompt_tokens_details": {"cached_tokens": 1536}}
+    assert service._tokens(usage)["cache_hit_rate"] == 0.768
+
+
+def test_disabled(monkeypatch):
+    """Test that nothing is marked when prompt caching is disabled."""
+    monkeypatch.setattr(prompt_cache_module.settings, "PROMPT_CACHE_ENABLED", False)
+    tracker = PrefixTracker(min_chars=100, block_chars=100, min_repeats=1)
+    
+    assert tracker.stable_prefix(CONTEXT, "m") == (0, "")
+
+
+def test_anthropic_sdk_sends_cache_blocks_and_reads_cache_usage(monkeypatch):
+    """Test the cache_control request and cache usage response against the pinned SDK."""
+    anthropic = pytest.importorskip("anthropic")
+    tracker = PrefixTracker(min_chars=100, block_chars=100, min_repeats=1)
+    monkeypatch.setattr("app.services.llm_service.prompt_cache", tracker)
+    sent = []
+    
+    def handler(request):
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, json={
+            "id": "msg_1", "type": "message", "role": "assistant", "model": "claude-3-haiku-20240307",
+            "content": [{"type": "text", "text": "Tamam"}], "stop_reason": "end_turn", "stop_sequence": None,
+            "usage": {
+                "input_tokens": 20, "output_tokens": 5,
+                "cache_read_input_tokens": 900, "cache_creation_input_tokens": 80,
+            },
+        })
+    
+    service = AnthropicService(api_key="key")
+    service._client = anthropic.AsyncAnthropic(
+        api_key="key", max_retries=0, http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    text, metadata = asyncio.run(service.generate_response("Soru?", system_prompt=CONTEXT))
+    
+    assert text == "Tamam"
+    assert sent[0]["system"][0]["cache_control"] == {"type": "ephemeral"}
+    assert metadata["tokens"]["prompt_tokens"] == 1000
+    assert metadata["tokens"]["cached_tokens"] == 900
+    assert metadata["tokens"]["cache_creation_tokens"] == 80
@@ -0,0 +1,239 @@
+"""Rate limiting and admission control tests."""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.responses import StreamingResponse
+
+from app.api import endpoints
+from app.core import rate_limit
+from app.core.config import settings
+from app.core.rate_limit import AdmissionController, RateLimiter, RateLimitExceeded, RequestRateLimiter
+from app.core.shared_state import InMemoryBackend
+from app.main import app
+from app.proxy import browser_extension
+from app.proxy import proxy_server as proxy_server_module
+
+
+class TestRateLimiter:
+    """Test class for the token-bucket limiter."""
+
+    def test_burst_then_refill(self):
+        """Test that a key gets its burst, then tokens at the configured rate."""
+        limiter = RateLimiter(rate_per_minute=60, burst=2)
+        for _ in range(2):
+            assert limiter.wait_time("u1", now=0.0) == 0.0
+            limiter.consume("u1", now=0.0)
+        
+        assert limiter.wait_time("u1", now=0.0) == pytest.approx(1.0)
+        assert limiter.wait_time("u1", now=1.0) == 0.0
+        assert limiter.wait_time("u2", now=0.0) == 0.0
+
+    def test_idle_keys_are_evicted(self):
+        """Test that idle buckets are dropped and the key count is bounded."""
+        limiter = RateLimiter(rate_per_minute=60, burst=1, idle_ttl=10, max_keys=2)
+        limiter.wait_time("a", now=0.0)
+        limiter.wait_time("b", now=5.0)
+        limiter.wait_time("c", now=11.0)
+        
+        assert len(limiter) == 2
+        limiter.wait_time("d", now=12.0)
+        assert len(limiter) == 2
+
+    def test_rejected_request_keeps_other_tokens(self):
+        """Test that a request rejected by one limit does not consume the others."""
+        limiter = RequestRateLimiter(window=0)
+        limiter.limiters["provider"] = RateLimiter(rate_per_minute=60, burst=1)
+        asyncio.run(limiter.check(user="u1", provider="openai"))
+        
+        with pytest.raises(RateLimitExceeded) as exc:
+            asyncio.run(limiter.check(user="u2", provider="openai"))
+        
+        assert exc.value.scope == "provider"
+        assert exc.value.retry_after_header == "1"
+        assert limiter.limiters["user"].wait_time("u2") == 0.0
+        assert limiter.limiters["user"].stats()["allowed"] == 1
+
+
+class TestSharedRateLimit:
+    """Test class for the cluster-wide window counters."""
+
+    def test_workers_share_one_limit(self, monkeypatch):
+        """Test that several workers together stay within the rate plus burst per window."""
+        backend = InMemoryBackend()
+        monkeypatch.setattr(rate_limit, "shared_state", backend)
+        workers = [RequestRateLimiter(window=60) for _ in range(3)]
+        for worker in workers:
+            worker.limiters["user"] = RateLimiter(rate_per_minute=1, burst=1)
+        
+        async def scenario():
+            await workers[0].check(user="u1")
+            await workers[1].check(user="u1")
+            with pytest.raises(RateLimitExceeded) as exc:
+                await workers[2].check(user="u1")
+            return exc.value
+        
+        error = asyncio.run(scenario())
+        assert error.scope == "user"
+        assert 0 < error.retry_after <= 60
+        # The rejected request gives its local token back
+        assert workers[2].limiters["user"].wait_time("u1") == 0.0
+
+    def test_rollback_of_expired_key_expires(self, monkeypatch):
+        """Test that undoing a count on a key that just expired does not leave a permanent -1."""
+        class ExpiringBackend(InMemoryBackend):
+            async def incr(self, key, amount=1, ttl=None):
+                if amount < 0:
+                    # The window key expired between the count and the rollback
+                    await self.delete(key)
+                return await super().incr(key, amount, ttl=ttl)
+        
+        backend = ExpiringBackend()
+        monkeypatch.setattr(rate_limit, "shared_state", backend)
+        limiter = RequestRateLimiter(window=60)
+        limiter.limiters["user"] = RateLimiter(rate_per_minute=1, burst=1)
+        limiter.limiters["user"].window_limit = lambda window: 0
+        
+        with pytest.raises(RateLimitExceeded):
+            asyncio.run(limiter.check(user="u1"))
+        
+        assert backend._values
+        assert all(expires is not None for _, expires in backend._values.values())
+
+    def test_backend_outage_falls_back_to_local_limits(self, monkeypatch):
+        """Test that an unreachable backend does not fail requests."""
+        class DownBackend(InMemoryBackend):
+            async def incr(self, key, amount=1, ttl=None):
+                raise ConnectionError("redis down")
+        
+        monkeypatch.setattr(rate_limit, "shared_state", DownBackend())
+        limiter = RequestRateLimiter(window=60)
+        limiter.limiters["user"] = RateLimiter(rate_per_minute=60, burst=1)
+        
+        asyncio.run(limiter.check(user="u1"))
+        with pytest.raises(RateLimitExceeded):
+            asyncio.run(limiter.check(user="u1"))
+        assert limiter.stats()["shared_failures"] == 1
+
+
+class TestAdmissionController:
+    """Test class for concurrency-limited admission."""
+
+    def test_queue_full_is_rejected(self):
+        """Test that requests beyond the slots and queue are rejected."""
+        async def scenario():
+            controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=1.0)
+            release = asyncio.Event()
+            
+            async def hold():
+                async with controller.slot():
+                    await release.wait()
+            
+            holder = asyncio.create_task(hold())
+            waiter = asyncio.create_task(hold())
+            await asyncio.sleep(0)
+            
+            with pytest.raises(RateLimitExceeded):
+                async with controller.slot():
+                    pass
+            
+            release.set()
+            await asyncio.gather(holder, waiter)
+            assert controller.stats()["rejected"] == 1
+            assert controller.stats()["active"] == 0
+        
+        asyncio.run(scenario())
+
+
+def test_prompt_endpoint_returns_429(monkeypatch):
+    """Test that the prompt endpoint rejects a flooding user before filtering."""
+    calls = []
+    
+    async def process_prompt(request, policy=None):
+        calls.append(request.user_id)
+        raise RuntimeError("LLM unavailable")
+    
+    limiter = RequestRateLimiter()
+    limiter.limiters["user"] = RateLimiter(rate_per_minute=1, burst=1)
+    monkeypatch.setattr(endpoints, "request_rate_limiter", limiter)
+    monkeypatch.setattr(endpoints.prompt_service, "process_prompt", process_prompt)
+    
+    client = TestClient(app)
+    payload = {"content": "Merhaba", "user_id": "flooder"}
+    assert client.post("/api/v1/prompt", json=payload).status_code == 500
+    response = client.post("/api/v1/prompt", json=payload)
+    
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "60"
+    assert calls == ["flooder"]
+
+
+class TestProxyLimits:
+    """Test class for rate limiting and admission of proxy and WebSocket requests."""
+
+    @pytest.fixture
+    def limiter(self, monkeypatch):
+        """Per-worker limiter allowing one request per user."""
+        limiter = RequestRateLimiter(window=0)
+        limiter.limiters["user"] = RateLimiter(rate_per_minute=1, burst=1)
+        monkeypatch.setattr(endpoints, "request_rate_limiter", limiter)
+        monkeypatch.setattr(browser_extension, "request_rate_limiter", limiter)
+        return limiter
+
+    def test_mcp_proxy_is_keyed_by_body_user_or_api_key(self, limiter, monkeypatch):
+        """Test that MCP requests are limited per body user, and API key callers not per address."""
+        async def process_request(request_data, policy=None):
+            return {"ok": True}
+        
+        monkeypatch.setattr(proxy_server_module.mcp_handler, "process_request", process_request)
+        client = TestClient(app)
+        
+        def post(user=None, headers=None):
+            body = {"messages": [{"role": "user", "content": "Merhaba"}]}
+            if user:
+                body["user"] = user
+            return client.post("/api/v1/proxy/mcp", json=body, headers=headers).status_code
+        
+        assert post("alice") == 200
+        assert post("alice") == 429
+        assert post("bob") == 200
+        api_key = {settings.API_KEY_HEADER: "team-key"}
+        assert [post(headers=api_key) for _ in range(3)] == [200, 200, 200]
+        assert post() == 200
+        assert post() == 429
+
+    def test_streamed_proxy_response_holds_admission_slot(self, limiter, monkeypatch):
+        """Test that the admission slot is released only after a streamed body is sent."""
+        active_while_streaming = []
+        
+        async def chunks():
+            active_while_streaming.append(rate_limit.admission_controller.active)
+            yield b"data: 1\n\n"
+        
+        async def handle_request(request, body=None):
+            return StreamingResponse(chunks(), media_type="text/event-stream")
+        
+        monkeypatch.setattr(endpoints.proxy_server, "handle_request", handle_request)
+        response = TestClient(app).post("/api/v1/proxy/openai/v1/chat/completions", json={"user": "s1"})
+        
+        assert response.text == "data: 1\n\n"
+        assert active_while_streaming == [1]
+        assert rate_limit.admission_controller.active == 0
+
+    def test_websocket_prompts_are_rate_limited(self, limiter, monkeypatch):
+        """Test that WebSocket prompts go through the same user limit as HTTP requests."""
+        async def process_request(request_data, policy=None):
+            return {"ok": True}
+        
+        monkeypatch.setattr(browser_extension.mcp_handler, "process_request", process_request)
+        client = TestClient(app)
+        with client.websocket_connect("/ws/limit-client") as websocket:
+            websocket.send_json({"type": "prompt", "id": "p1", "data": {"user": "ws-user"}})
+            first = websocket.receive_json()
+            websocket.send_json({"type": "prompt", "id": "p2", "data": {"user": "ws-user"}})
+            second = websocket.receive_json()
+        
+        assert first["type"] == "response"
+        assert second["type"] == "error"
+        assert second["retry_after"] == 60
+        assert rate_limit.admission_controller.active == 0
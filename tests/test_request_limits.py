@@ -0,0 +1,77 @@
+"""Request body and field size limit tests."""
+import json
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.core.request_limits import BodySizeLimitMiddleware, RequestTooLarge, loads_limited
+from app.main import app
+
+
+def make_app(default_limit: int, route_limits=None) -> FastAPI:
+    """Small app echoing the size of the body it read."""
+    test_app = FastAPI()
+    test_app.add_middleware(BodySizeLimitMiddleware, default_limit=default_limit, route_limits=route_limits)
+
+    @test_app.post("/echo")
+    @test_app.post("/big/echo")
+    async def echo(request: Request):
+        return {"size": len(await request.body())}
+
+    return test_app
+
+
+class TestBodySizeLimit:
+    """Test class for the body size middleware."""
+
+    def test_declared_length_over_limit_is_rejected(self):
+        """Test that Content-Length over the limit gets 413 without the route running."""
+        client = TestClient(make_app(default_limit=10))
+        assert client.post("/echo", content=b"x" * 10).json() == {"size": 10}
+
+        response = client.post("/echo", content=b"x" * 11)
+        assert response.status_code == 413
+
+    def test_streamed_body_is_counted(self):
+        """Test that a chunked body without Content-Length is cut off at the limit."""
+        client = TestClient(make_app(default_limit=10))
+
+        response = client.post("/echo", content=iter([b"x" * 6, b"x" * 6]))
+        assert response.status_code == 413
+
+    def test_route_limit_overrides_default(self):
+        """Test that the longest matching path prefix sets the limit."""
+        client = TestClient(make_app(default_limit=10, route_limits={"/big": 100}))
+
+        assert client.post("/big/echo", content=b"x" * 50).json() == {"size": 50}
+        assert client.post("/echo", content=b"x" * 50).status_code == 413
+
+
+class TestFieldLimits:
+    """Test class for length-checked JSON decoding."""
+
+    def test_long_text_field_is_rejected(self):
+        """Test that an over-long nested text field aborts decoding."""
+        document = json.dumps({"messages": [{"role": "user", "content": "a" * 11}]})
+
+        with pytest.raises(RequestTooLarge):
+            loads_limited(document, max_text_length=10)
+        assert loads_limited(document, max_text_length=11)["messages"][0]["content"] == "a" * 11
+
+    def test_other_fields_are_not_limited(self):
+        """Test that only text fields are checked."""
+        document = json.dumps({"model": "m" * 20, "content": "ok"})
+
+        assert loads_limited(document, max_text_length=10)["model"] == "m" * 20
+
+    def test_proxy_rejects_long_message(self, monkeypatch):
+        """Test that the proxy answers 413 for an over-long message."""
+        monkeypatch.setattr("app.core.request_limits.settings.MAX_TEXT_LENGTH", 10)
+        client = TestClient(app)
+
+        response = client.post(
+            "/api/v1/proxy/openai/v1/chat/completions",
+            json={"model": "gpt-4", "messages": [{"role": "user", "content": "a" * 11}]},
+        )
+        assert response.status_code == 413
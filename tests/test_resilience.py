@@ -0,0 +1,136 @@
+"""Provider call resilience tests."""
+import asyncio
+
+import pytest
+
+from app.services.llm_service import OpenAIService
+from app.services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ProviderError,
+    ProviderResilience,
+    classify_exception,
+    parse_retry_after,
+)
+
+
+class FakeStatusError(Exception):
+    """SDK-style error carrying an HTTP status and response headers."""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": headers or {}})()
+
+
+def flaky(failures):
+    """Return a call that raises the given errors before succeeding."""
+    calls = []
+    
+    async def call():
+        calls.append(1)
+        if len(calls) <= len(failures):
+            raise failures[len(calls) - 1]
+        return "ok"
+    
+    return call, calls
+
+
+class TestRetries:
+    """Test class for retry behaviour."""
+
+    def test_retries_server_errors(self):
+        """Test that 5xx and 429 responses are retried until success."""
+        policy = ProviderResilience("test", max_retries=2, base_delay=0)
+        call, calls = flaky([FakeStatusError(503), FakeStatusError(429)])
+        
+        assert asyncio.run(policy.call(call)) == "ok"
+        assert len(calls) == 3
+        assert policy.stats()["retries"] == 2
+
+    def test_client_errors_are_not_retried(self):
+        """Test that a 400 fails immediately as a ProviderError."""
+        policy = ProviderResilience("test", max_retries=2, base_delay=0)
+        call, calls = flaky([FakeStatusError(400)])
+        
+        with pytest.raises(ProviderError) as exc:
+            asyncio.run(policy.call(call))
+        
+        assert exc.value.status_code == 400
+        assert len(calls) == 1
+
+    def test_long_retry_after_fails_fast(self):
+        """Test that a Retry-After beyond the limit is not waited for."""
+        policy = ProviderResilience("test", max_retries=2, max_retry_after=5)
+        call, calls = flaky([FakeStatusError(429, {"retry-after": "60"})])
+        
+        with pytest.raises(ProviderError) as exc:
+            asyncio.run(policy.call(call))
+        
+        assert exc.value.retry_after == 60
+        assert len(calls) == 1
+
+    def test_parse_retry_after(self):
+        """Test seconds, milliseconds and missing headers."""
+        assert parse_retry_after({"retry-after": "2"}) == 2.0
+        assert parse_retry_after({"retry-after-ms": "250"}) == 0.25
+        assert parse_retry_after({}) is None
+        assert classify_exception("test", TimeoutError()).retryable is True
+
+
+class TestCircuitBreaker:
+    """Test class for the per-provider circuit breaker."""
+
+    def test_opens_and_recovers(self):
+        """Test that consecutive failures open the circuit and a probe closes it."""
+        breaker = CircuitBreaker(failure_threshold=2, recovery_time=0.05)
+        policy = ProviderResilience("test", max_retries=0, breaker=breaker)
+        call, calls = flaky([FakeStatusError(503), FakeStatusError(503)])
+        
+        for _ in range(2):
+            with pytest.raises(ProviderError):
+                asyncio.run(policy.call(call))
+        with pytest.raises(CircuitOpenError):
+            asyncio.run(policy.call(call))
+        assert len(calls) == 2
+        
+        asyncio.run(asyncio.sleep(0.06))
+        assert asyncio.run(policy.call(call)) == "ok"
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+class TestHedging:
+    """Test class for request hedging."""
+
+    def test_hedged_request_wins(self):
+        """Test that a slow first attempt is raced by a hedged request after p95."""
+        policy = ProviderResilience("test", hedging=True, hedge_min_samples=1)
+        policy.latency.record(0.01)
+        delays = [1.0, 0.0]
+        
+        async def call():
+            delay = delays.pop(0)
+            await asyncio.sleep(delay)
+            return delay
+        
+        assert asyncio.run(asyncio.wait_for(policy.call(call), 0.5)) == 0.0
+        assert policy.stats()["hedged"] == 1
+
+
+def test_service_raises_instead_of_returning_error_text(monkeypatch):
+    """Test that provider failures surface as ProviderError, not as a model answer."""
+    service = OpenAIService()
+    service.resilience = ProviderResilience("openai", max_retries=1, base_delay=0)
+    
+    class Completions:
+        async def create(self, **kwargs):
+            raise FakeStatusError(500)
+    
+    client = type("Client", (), {"chat": type("Chat", (), {"completions": Completions()})()})()
+    monkeypatch.setattr(service, "_get_client", lambda: client)
+    
+    with pytest.raises(ProviderError) as exc:
+        asyncio.run(service.generate_response("Merhaba"))
+    
+    assert exc.value.status_code == 500
+    assert service.resilience.stats()["retries"] == 1
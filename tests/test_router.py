@@ -0,0 +1,121 @@
+"""Model router tests."""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.proxy.mcp_handler import mcp_handler
+from app.schemas.request import ModelProvider
+from app.services.llm_service import BaseLLMService, LLMServiceFactory
+from app.services.resilience import CircuitBreaker, ProviderError, ProviderResilience
+from app.services.router import ModelRouter
+
+
+class FakeService(BaseLLMService):
+    """Provider stub with a fixed latency or failure."""
+
+    def __init__(self, provider, latency=0.0, error=None):
+        self.provider = provider
+        self.latency = latency
+        self.error = error
+        self.calls = []
+        self.resilience = ProviderResilience(provider, max_retries=1, base_delay=0)
+
+    def is_available(self):
+        return True
+
+    async def generate_response(self, prompt, **kwargs):
+        async def call():
+            self.calls.append(kwargs["model"])
+            await asyncio.sleep(self.latency)
+            if self.error is not None:
+                raise self.error
+            return f"{self.provider}:{kwargs['model']}"
+        
+        return await self.resilience.call(call), {"model": kwargs["model"]}
+
+
+@pytest.fixture
+def services(monkeypatch):
+    """Register fake services for two regional endpoints."""
+    fakes = {
+        "eu": FakeService("openai"),
+        "us": FakeService("anthropic"),
+    }
+    monkeypatch.setitem(LLMServiceFactory._services, (ModelProvider.OPENAI, "https://eu", None), fakes["eu"])
+    monkeypatch.setitem(LLMServiceFactory._services, (ModelProvider.ANTHROPIC, "https://us", None), fakes["us"])
+    return fakes
+
+
+ROUTES = {
+    "fast": [
+        {"provider": "openai", "model": "gpt-eu", "base_url": "https://eu", "cost": 0.0},
+        {"provider": "anthropic", "model": "claude-us", "base_url": "https://us", "cost": 0.0},
+    ]
+}
+
+
+class TestModelRouter:
+    """Test class for latency-aware routing and failover."""
+
+    def test_prefers_lower_latency(self, services):
+        """Test that the target with the lower EWMA latency is chosen."""
+        router = ModelRouter(ROUTES)
+        router.routes["fast"][0].record(0.5, failed=False)
+        router.routes["fast"][1].record(0.1, failed=False)
+        
+        text, metadata = asyncio.run(router.generate(ModelProvider.OPENAI, "hi", model="fast"))
+        
+        assert text == "anthropic:claude-us"
+        assert metadata["route"] == "anthropic:claude-us@https://us"
+        assert metadata["provider"] == "anthropic"
+
+    def test_fails_over_without_retrying(self, services):
+        """Test that a failing target is not retried when another can take the request."""
+        services["eu"].error = ProviderError("openai", "unavailable", status_code=503)
+        router = ModelRouter(ROUTES)
+        
+        text, _ = asyncio.run(router.generate(ModelProvider.OPENAI, "hi", model="fast"))
+        
+        assert text == "anthropic:claude-us"
+        assert services["eu"].calls == ["gpt-eu"]
+        assert router.routes["fast"][0].failures == 1
+
+    def test_skips_open_circuit(self, services):
+        """Test that targets with an open circuit are not tried."""
+        services["eu"].resilience.breaker = CircuitBreaker(failure_threshold=1, recovery_time=60)
+        services["eu"].resilience.breaker.record_failure()
+        router = ModelRouter(ROUTES)
+        
+        assert [t.model for t in router.candidates("fast")] == ["claude-us"]
+
+    def test_invalid_request_does_not_fail_over(self, services):
+        """Test that a 400 from the chosen target is returned, not retried elsewhere."""
+        services["eu"].error = ProviderError("openai", "bad request", status_code=400)
+        router = ModelRouter(ROUTES)
+        
+        with pytest.raises(ProviderError):
+            asyncio.run(router.generate(ModelProvider.OPENAI, "hi", model="fast"))
+        assert services["us"].calls == []
+
+
+def test_unknown_mcp_provider_is_rejected():
+    """Test that unsupported providers are not silently sent to OpenAI."""
+    with pytest.raises(ValueError):
+        mcp_handler.build_prompt_request({
+            "provider": "mistral",
+            "messages": [{"role": "user", "content": "Merhaba"}],
+        })
+
+
+def test_unknown_mcp_provider_returns_400():
+    """Test that the MCP proxy answers a misrouted request with 400 instead of a 200 error body."""
+    response = TestClient(app).post("/api/v1/proxy/mcp", json={
+        "provider": "mistral",
+        "user": "router-test",
+        "messages": [{"role": "user", "content": "Merhaba"}],
+    })
+    
+    assert response.status_code == 400
+    assert "mistral" in response.json()["detail"]
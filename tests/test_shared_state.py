@@ -0,0 +1,114 @@
+"""Shared state backend tests."""
+import asyncio
+
+from app.core.shared_state import InMemoryBackend, worker_id
+from app.proxy.browser_extension import CONNECTION_DIRECTORY, BrowserExtensionManager, directory_entry
+
+
+class TestInMemoryBackend:
+    """Test class for the in-memory shared state backend."""
+
+    def test_counter_window_expires(self):
+        """Test that counters keep their creation TTL and expire as a whole."""
+        async def scenario():
+            backend = InMemoryBackend()
+            assert await backend.incr("hits", ttl=0.05) == 1
+            assert await backend.incr("hits", 2, ttl=0.05) == 3
+            await asyncio.sleep(0.06)
+            assert await backend.get("hits") is None
+            assert await backend.incr("hits") == 1
+        
+        asyncio.run(scenario())
+
+    def test_json_and_hashes(self):
+        """Test JSON values and hash fields."""
+        async def scenario():
+            backend = InMemoryBackend()
+            await backend.set_json("health", {"openai": True})
+            assert await backend.get_json("health") == {"openai": True}
+            
+            await backend.hset("dir", "a", "w1")
+            await backend.hset("dir", "b", "w2")
+            await backend.hdel("dir", "a")
+            assert await backend.hget("dir", "a") is None
+            assert await backend.hgetall("dir") == {"b": "w2"}
+        
+        asyncio.run(scenario())
+
+
+class FailingBackend(InMemoryBackend):
+    """Backend whose hash writes fail, like an unreachable Redis."""
+
+    async def hset(self, name, key, value):
+        raise ConnectionError("redis down")
+
+
+class AcceptingWebSocket:
+    """WebSocket stand-in that can be accepted and closed."""
+
+    async def accept(self):
+        pass
+
+    async def close(self, code=1000):
+        pass
+
+
+class TestConnectionDirectory:
+    """Test class for the cross-worker connection directory."""
+
+    def test_reconnect_elsewhere_keeps_entry(self, monkeypatch):
+        """Test that a disconnect does not remove a client now owned by another worker."""
+        backend = InMemoryBackend()
+        monkeypatch.setattr("app.proxy.browser_extension.shared_state", backend)
+        
+        async def scenario():
+            manager = BrowserExtensionManager()
+            await manager._forget("c1")
+            
+            await backend.hset(CONNECTION_DIRECTORY, "c1", directory_entry(worker_id(), 60))
+            assert await manager.locate("c1") == worker_id()
+            await manager._forget("c1")
+            assert await manager.locate("c1") is None
+            
+            await backend.hset(CONNECTION_DIRECTORY, "c2", directory_entry("other-host:1", 60))
+            await manager._forget("c2")
+            assert await manager.locate("c2") == "other-host:1"
+        
+        asyncio.run(scenario())
+
+    def test_stale_entries_expire_unless_refreshed(self, monkeypatch):
+        """Test that a crashed worker's entries expire and the heartbeat keeps live ones."""
+        backend = InMemoryBackend()
+        monkeypatch.setattr("app.proxy.browser_extension.shared_state", backend)
+        
+        async def scenario():
+            manager = BrowserExtensionManager()
+            await backend.hset(CONNECTION_DIRECTORY, "crashed", directory_entry("dead-host:1", -1))
+            await backend.hset(CONNECTION_DIRECTORY, "live", directory_entry(worker_id(), -1))
+            
+            assert await manager.locate("crashed") is None
+            # Reading stats does not modify the shared directory
+            assert (await manager.stats())["cluster"]["per_worker"] == {}
+            assert await backend.hget(CONNECTION_DIRECTORY, "crashed") is not None
+            
+            await manager._refresh_directory(["live"])
+            
+            assert await manager.locate("live") == worker_id()
+            assert (await manager.stats())["cluster"]["per_worker"] == {worker_id(): 1}
+            assert await backend.hget(CONNECTION_DIRECTORY, "crashed") is None
+        
+        asyncio.run(scenario())
+
+    def test_directory_outage_does_not_fail_connect(self, monkeypatch):
+        """Test that a WebSocket is still accepted when the directory write fails."""
+        monkeypatch.setattr("app.proxy.browser_extension.shared_state", FailingBackend())
+        
+        async def scenario():
+            manager = BrowserExtensionManager()
+            state = await manager.connect(AcceptingWebSocket(), "c1")
+            
+            assert state is not None
+            assert manager.registry.get("c1") is state
+            await manager.registry.stop()
+        
+        asyncio.run(scenario())
@@ -0,0 +1,33 @@
+"""Import-time budget tests."""
+import asyncio
+
+from app.core.preload import warm_up
+from scripts.profile_startup import run_probe
+
+# Soğuk başlatma bütçesi; ölçülen değer ~0.5-0.7 sn, çoğu FastAPI'nin kendisi
+IMPORT_BUDGET_SECONDS = 1.0
+
+
+def test_heavy_dependencies_load_lazily():
+    """Test that importing the app does not import NER, numpy, HTTP, SQLite or provider SDKs."""
+    summary, _ = run_probe(importtime=False)
+    assert summary["loaded"] == []
+
+
+def test_import_stays_within_budget():
+    """Test that importing the app stays within the cold start budget (best of three runs)."""
+    seconds = min(run_probe(importtime=False)[0]["seconds"] for _ in range(3))
+    assert seconds < IMPORT_BUDGET_SECONDS
+
+
+def test_warm_up_reports_loaded_dependencies(monkeypatch):
+    """Test that the warm-up phase builds the filter engines and skips unconfigured providers."""
+    monkeypatch.setattr("app.core.preload.settings.ENABLE_NER_FILTERS", False)
+    for name in ("OPENAI_API_KEY", "GOOGLE_API_KEY", "ANTHROPIC_API_KEY"):
+        monkeypatch.setattr(f"app.services.llm_service.settings.{name}", None)
+    monkeypatch.setattr("app.services.llm_service.LLMServiceFactory._services", {})
+
+    summary = asyncio.run(warm_up())
+
+    assert summary["profiles"]
+    assert summary["providers"] == []
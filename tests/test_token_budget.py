@@ -0,0 +1,186 @@
+"""Token counting, context window and token budget tests."""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import prompt_service as prompt_service_module
+from app.core import token_budget
+from app.core.prompt_service import PromptService
+from app.core.rate_limit import RateLimitExceeded
+from app.core.shared_state import InMemoryBackend
+from app.core.token_budget import ContextLengthExceeded, TokenUsageAccumulator
+from app.filters.filter_manager import FilterManager
+from app.main import app
+from app.schemas.request import PromptRequest
+from app.services import tokenizer
+from app.services.tokenizer import TokenCounter
+
+
+@pytest.fixture
+def estimated(monkeypatch):
+    """Count with the character estimate (4 characters per token) regardless of tiktoken."""
+    counter = TokenCounter(chars_per_token=4.0)
+    monkeypatch.setattr(counter, "_encoding", lambda model: None)
+    monkeypatch.setattr(prompt_service_module, "token_counter", counter)
+    monkeypatch.setattr(tokenizer.settings, "DEFAULT_CONTEXT_WINDOW", 100)
+    monkeypatch.setattr(tokenizer.settings, "MODEL_CONTEXT_WINDOWS", {"big-": 1000, "big-small": 50})
+    monkeypatch.setattr(tokenizer.settings, "TOKEN_MIN_OUTPUT", 20)
+    return counter
+
+
+def test_counts_are_cached_and_truncation_keeps_the_tail(estimated):
+    """Test that repeated texts hit the count cache and truncation keeps the end."""
+    assert estimated.count("x" * 40) == 10
+    assert estimated.count("x" * 40) == 10
+    assert (estimated.hits, estimated.misses) == (1, 1)
+    assert estimated.truncate("a" * 40 + "SORU", 2) == "aaaaSORU"
+
+
+def test_tokenizer_cache_is_keyed_by_encoding():
+    """Test that client-chosen model names do not grow the tokenizer cache."""
+    counter = TokenCounter()
+    for i in range(100):
+        counter.count("Merhaba", f"bogus-model-{i}")
+    
+    assert tokenizer.encoding_name("bogus-model-1") == tokenizer.DEFAULT_ENCODING
+    assert tokenizer.load_encoding.cache_info().currsize <= 4
+
+
+def test_context_window_longest_prefix(estimated):
+    """Test that the longest matching prefix and the smallest routed window win."""
+    assert TokenCounter.context_window(["big-model"]) == 1000
+    assert TokenCounter.context_window(["big-small-1"]) == 50
+    assert TokenCounter.context_window(["unknown"]) == 100
+    assert TokenCounter.context_window(["big-model", "unknown"]) == 100
+
+
+def test_over_long_prompt_is_rejected_or_truncated(estimated, monkeypatch):
+    """Test reject mode, max_tokens clamping and prompt truncation."""
+    request = PromptRequest(content="x" * 320, model="unknown", max_tokens=50)
+    
+    with pytest.raises(ContextLengthExceeded):
+        PromptService._fit_to_context(request, request.content)
+    
+    monkeypatch.setattr(prompt_service_module.settings, "TOKEN_LIMIT_ACTION", "truncate")
+    prompt, params, tokens = PromptService._fit_to_context(request, request.content)
+    assert (prompt, tokens, params["max_tokens"]) == (request.content, 80, 20)
+    
+    long_request = PromptRequest(content="x" * 396 + "SORU", model="unknown", max_tokens=50)
+    prompt, params, tokens = PromptService._fit_to_context(long_request, long_request.content)
+    assert prompt.endswith("SORU")
+    assert tokens == 80
+    assert params["max_tokens"] == 20
+
+
+def test_budget_and_flush():
+    """Test that usage is enforced locally and flushed to the shared counters."""
+    backend = InMemoryBackend()
+    accumulator = TokenUsageAccumulator(budget=100, window=3600)
+    
+    accumulator.record("ayse", 60, 20)
+    accumulator.check("ayse", 20)
+    with pytest.raises(RateLimitExceeded) as error:
+        accumulator.check("ayse", 21)
+    assert error.value.scope == "token_budget"
+    accumulator.check(None, 10**6)
+    
+    async def scenario():
+        original = token_budget.shared_state
+        token_budget.shared_state = backend
+        try:
+            await accumulator.flush()
+            accumulator.record("ayse", 5, 5)
+            await accumulator.flush()
+        finally:
+            token_budget.shared_state = original
+        return await backend.get(f"tokens:{accumulator._window_id}:ayse")
+    
+    assert asyncio.run(scenario()) == "90"
+    assert accumulator.used("ayse") == 90
+    assert accumulator.stats()["pending_users"] == 0
+
+
+def test_prompt_endpoint_enforces_limits(estimated, monkeypatch):
+    """Test 413 for over-long prompts and 429 once the user's token budget is spent."""
+    async def generate(provider, prompt, **params):
+        return "Tamam", {"model": "unknown"}
+    
+    monkeypatch.setattr(prompt_service_module.model_router, "generate", generate)
+    monkeypatch.setattr(prompt_service_module.settings, "ENABLE_NER_FILTERS", False)
+    manager = FilterManager()
+    monkeypatch.setattr(prompt_service_module.policy_registry, "get_manager", lambda name=None: manager)
+    monkeypatch.setattr(prompt_service_module, "token_usage", TokenUsageAccumulator(budget=50))
+    client = TestClient(app)
+    payload = {"content": "x" * 80, "model": "unknown", "max_tokens": 10, "user_id": "budget-test"}
+    
+    response = client.post("/api/v1/prompt", json={**payload, "content": "x" * 400})
+    assert response.status_code == 413
+    
+    response = client.post("/api/v1/prompt", json=payload)
+    assert response.status_code == 200
+    assert response.json()["tokens_used"] == {
+        "prompt_tokens": 20, "completion_tokens": 2, "total_tokens": 22, "estimated": 1
+    }
+    
+    assert client.post("/api/v1/prompt", json=payload).status_code == 200
+    response = client.post("/api/v1/prompt", json=payload)
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+
+def test_mcp_proxy_enforces_limits(estimated, monkeypatch):
+    """Test that the MCP proxy returns the same 413 and 429 as /prompt instead of 200 error bodies."""
+    async def generate(provider, prompt, **params):
+        return "Tamam", {"model": "unknown"}
+    
+    monkeypatch.setattr(prompt_service_module.model_router, "generate", generate)
+    monkeypatch.setattr(prompt_service_module.settings, "ENABLE_NER_FILTERS", False)
+    manager = FilterManager()
+    monkeypatch.setattr(prompt_service_module.policy_registry, "get_manager", lambda name=None: manager)
+    monkeypatch.setattr(prompt_service_module, "token_usage", TokenUsageAccumulator(budget=50))
+    client = TestClient(app)
+    payload = {
+        "messages": [{"role": "user", "content": "x" * 80}],
+        "provider": "openai", "model": "unknown", "max_tokens": 10, "user": "mcp-budget-test",
+    }
+    
+    response = client.post("/api/v1/proxy/mcp", json={**payload, "max_tokens": 9000})
+    assert response.status_code == 413
+    
+    assert client.post("/api/v1/proxy/mcp", json=payload).status_code == 200
+    assert client.post("/api/v1/proxy/mcp", json=payload).status_code == 200
+    response = client.post("/api/v1/proxy/mcp", json=payload)
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
+
+
+def test_streamed_and_plain_responses_count_the_same_tokens(estimated, monkeypatch):
+    """Test that completion tokens are counted on the provider's text, not the masked output."""
+    text = "Bana ayse.yilmaz@example.com adresinden ulaşabilirsiniz."
+    
+    async def generate(provider, prompt, **params):
+        return text, {"model": "unknown"}
+    
+    async def stream(provider, prompt, metadata=None, **params):
+        metadata["model"] = "unknown"
+        for i in range(0, len(text), 7):
+            yield text[i:i + 7]
+    
+    monkeypatch.setattr(prompt_service_module.model_router, "generate", generate)
+    monkeypatch.setattr(prompt_service_module.model_router, "stream", stream)
+    monkeypatch.setattr(prompt_service_module.settings, "ENABLE_NER_FILTERS", False)
+    manager = FilterManager()
+    monkeypatch.setattr(prompt_service_module.policy_registry, "get_manager", lambda name=None: manager)
+    service = PromptService()
+    request = PromptRequest(content="İletişim bilgin nedir?", model="unknown", max_tokens=20)
+    
+    async def scenario():
+        streamed = [item async for item in service.stream_prompt(request)][-1]
+        return await service.process_prompt(request), streamed
+    
+    plain, streamed = asyncio.run(scenario())
+    
+    assert streamed.response_content == plain.response_content != text
+    assert streamed.tokens_used == plain.tokens_used
+    assert plain.tokens_used["completion_tokens"] == estimated.count(text)